@@ -0,0 +1,236 @@
+"""Streaming session analytics with O(1) amortized work per punch.
+
+SessionAnalytics keeps rolling means and variances over time windows, a
+compact quantile sketch per metric, punches per minute, a per-minute
+fatigue curve over the last CURVE_POINTS minutes and a fatigue flag, so
+the UI and exporters can query them without rescanning the punch history.
+"""
+import math
+from collections import deque
+
+# Rolling windows in seconds
+WINDOWS = (10.0, 60.0, 300.0)
+# Window whose mean is compared against its best level to detect fatigue
+FATIGUE_WINDOW = 60.0
+# Relative drop from the best windowed mean that counts as fatigue
+FATIGUE_DROP = 0.2
+# Punches the fatigue window must hold before its mean is trusted
+FATIGUE_MIN_PUNCHES = 10
+# Width of one point of the fatigue curve in seconds
+CURVE_INTERVAL = 60.0
+# Curve points kept and sent in every snapshot: two hours at one a minute
+CURVE_POINTS = 120
+# Quantile sketch accuracy: reported values are within 1% of the true ones
+SKETCH_ACCURACY = 0.01
+SKETCH_MAX_BUCKETS = 1024
+PERCENTILES = (50, 90, 99)
+
+
+class RunningMoments:
+    """Welford mean/variance that also supports removing a previously added value."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x):
+        if self.count <= 1:
+            self.__init__()
+            return
+        mean = (self.count * self.mean - x) / (self.count - 1)
+        self.m2 = max(self.m2 - (x - self.mean) * (x - mean), 0.0)
+        self.mean = mean
+        self.count -= 1
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+class RollingWindow:
+    """Speed and force moments over the punches of the last `seconds`."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.punches = deque()
+        self.speed = RunningMoments()
+        self.force = RunningMoments()
+
+    def add(self, timestamp, speed, force):
+        self.punches.append((timestamp, speed, force))
+        self.speed.add(speed)
+        self.force.add(force)
+        self.expire(timestamp)
+
+    def expire(self, now):
+        """Drops punches older than the window; each punch is dropped once."""
+        cutoff = now - self.seconds
+        while self.punches and self.punches[0][0] <= cutoff:
+            _, speed, force = self.punches.popleft()
+            self.speed.remove(speed)
+            self.force.remove(force)
+
+    def snapshot(self) -> dict:
+        return {
+            'count': self.speed.count,
+            'speed_mean': self.speed.mean, 'speed_std': self.speed.std,
+            'force_mean': self.force.mean, 'force_std': self.force.std,
+        }
+
+
+class QuantileSketch:
+    """Log-bucketed quantile sketch with bounded relative error (DDSketch style).
+
+    Values fall into buckets whose bounds grow by a factor gamma, so every
+    quantile is reported within SKETCH_ACCURACY of its true value using a
+    few hundred counters regardless of how many values were added.
+    """
+
+    def __init__(self, relative_accuracy: float = SKETCH_ACCURACY,
+                 max_buckets: int = SKETCH_MAX_BUCKETS):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.counts = {}
+        # Values too small for a bucket, e.g. a punch without force
+        self.zero_count = 0
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, x):
+        self.count += 1
+        self.max = max(self.max, x)
+        if x <= 1e-9:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(x) / self.log_gamma)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if len(self.counts) > self.max_buckets:
+            # Fold the lowest bucket into the next; only tiny values lose accuracy
+            lowest, second = sorted(self.counts)[:2]
+            self.counts[second] += self.counts.pop(lowest)
+
+    def quantile(self, q) -> float:
+        """Approximate q-th quantile, q in [0, 1]."""
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen > rank:
+                return min(2 * self.gamma ** key / (self.gamma + 1), self.max)
+        return self.max
+
+
+class SessionAnalytics:
+    """Rolling statistics, percentiles, punch rate and fatigue for one stream of punches."""
+
+    def __init__(self, windows=WINDOWS, fatigue_window: float = FATIGUE_WINDOW,
+                 fatigue_drop: float = FATIGUE_DROP):
+        self.window_seconds = tuple(windows)
+        self.fatigue_window = fatigue_window
+        self.fatigue_drop = fatigue_drop
+        self.reset()
+
+    def reset(self):
+        self.windows = {seconds: RollingWindow(seconds) for seconds in self.window_seconds}
+        if self.fatigue_window not in self.windows:
+            self.windows[self.fatigue_window] = RollingWindow(self.fatigue_window)
+        self.speed = RunningMoments()
+        self.force = RunningMoments()
+        self.speed_sketch = QuantileSketch()
+        self.force_sketch = QuantileSketch()
+        self.first = None
+        self.last = None
+        # Best trusted mean of the fatigue window so far
+        self.best_speed = 0.0
+        self.best_force = 0.0
+        # Most recent closed fatigue curve points and the one being filled
+        self.curve = deque(maxlen=CURVE_POINTS - 1)
+        self.curve_point = None
+
+    def add(self, timestamp, speed, force):
+        if self.first is None:
+            self.first = timestamp
+        self.last = timestamp
+        self.speed.add(speed)
+        self.force.add(force)
+        self.speed_sketch.add(speed)
+        self.force_sketch.add(force)
+        for window in self.windows.values():
+            window.add(timestamp, speed, force)
+
+        fatigue = self.windows[self.fatigue_window]
+        if fatigue.speed.count >= FATIGUE_MIN_PUNCHES:
+            self.best_speed = max(self.best_speed, fatigue.speed.mean)
+            self.best_force = max(self.best_force, fatigue.force.mean)
+
+        start = self.first + (timestamp - self.first) // CURVE_INTERVAL * CURVE_INTERVAL
+        if self.curve_point is None or self.curve_point['start'] != start:
+            if self.curve_point is not None:
+                self.curve.append(self.curve_point)
+            self.curve_point = {'start': start, 'count': 0,
+                                'speed_mean': 0.0, 'force_mean': 0.0}
+        point = self.curve_point
+        point['count'] += 1
+        point['speed_mean'] += (speed - point['speed_mean']) / point['count']
+        point['force_mean'] += (force - point['force_mean']) / point['count']
+
+    def punches_per_minute(self, now=None) -> float:
+        """Rate over the last minute, or over the session while it is shorter."""
+        if self.first is None:
+            return 0.0
+        now = self.last if now is None else now
+        window = self.windows.get(60.0)
+        if window is not None and now - self.first >= 60.0:
+            window.expire(now)
+            return float(window.speed.count)
+        elapsed = now - self.first
+        return (self.speed.count - 1) / elapsed * 60 if elapsed > 0 else 0.0
+
+    def fatigue(self) -> dict:
+        """Decay of the fatigue window's mean speed and force from their best level."""
+        window = self.windows[self.fatigue_window]
+        trusted = window.speed.count >= FATIGUE_MIN_PUNCHES
+        speed_decay = 1 - window.speed.mean / self.best_speed if trusted and self.best_speed else 0.0
+        force_decay = 1 - window.force.mean / self.best_force if trusted and self.best_force else 0.0
+        return {
+            'speed_decay': speed_decay,
+            'force_decay': force_decay,
+            'fatigued': max(speed_decay, force_decay) >= self.fatigue_drop,
+        }
+
+    def snapshot(self, now=None) -> dict:
+        """All aggregates as plain values; windows are aged to now (default: last punch)."""
+        now = self.last if now is None else now
+        if now is not None:
+            for window in self.windows.values():
+                window.expire(now)
+        return {
+            'punches': self.speed.count,
+            'duration_s': (self.last - self.first) if self.first is not None else 0.0,
+            'punches_per_minute': self.punches_per_minute(now),
+            'speed': self.metric_summary(self.speed, self.speed_sketch),
+            'force': self.metric_summary(self.force, self.force_sketch),
+            'windows': {f"{seconds:g}s": window.snapshot()
+                        for seconds, window in self.windows.items()},
+            'fatigue': self.fatigue(),
+            'curve': list(self.curve) + ([dict(self.curve_point)] if self.curve_point else []),
+        }
+
+    @staticmethod
+    def metric_summary(moments: RunningMoments, sketch: QuantileSketch) -> dict:
+        summary = {'mean': moments.mean, 'std': moments.std, 'max': sketch.max}
+        for percentile in PERCENTILES:
+            summary[f"p{percentile}"] = sketch.quantile(percentile / 100)
+        return summary
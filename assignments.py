@@ -0,0 +1,14 @@
+"""Glove address -> athlete/hand assignments, shared by the live app and the exporter."""
+import json
+import os
+
+# Optional mapping of glove address -> {"athlete": ..., "hand": ...}
+GLOVE_ASSIGNMENTS_FILE = "gloves.json"
+
+
+def load_glove_assignments(path: str) -> dict:
+    """Loads the glove address -> athlete/hand mapping, if the file exists."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,282 @@
+"""Benchmarks for the ingest -> process -> render path.
+
+Runs headless with the Agg backend and the simulated glove source, and
+writes the results as JSON so runs can be compared. Besides the end-to-end
+pipeline, the steady-state pass times single-punch frames at each history
+size:
+
+    python benchmarks/bench_pipeline.py --output bench.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import queue
+import statistics
+import struct
+import sys
+import threading
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import main
+from gloves import BLEManager
+from ingest import run_ble_operations
+from pipeline import PipelineStats, UIChannel
+from punch_classifier import labelled_features, synthetic_session, train_synthetic
+from punch_store import PunchStore
+from session_log import KIND_SPEED
+from graphs import ForceGraph, SpeedGraph
+
+HISTORY_SIZES = [10, 100, 1000, 10000, 100000]
+# Single-punch frames timed per history size in the steady-state pass
+STEADY_FRAMES = 200
+CLASSIFY_BATCH_SIZES = [1, 8, 32, 128]
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(q / 100 * len(values)), len(values) - 1)]
+
+
+class AggDashboard:
+    """The Visualizer's graphs on an off-screen Agg canvas."""
+
+    def __init__(self):
+        self.store = PunchStore()
+        self.speed_graph = SpeedGraph(*self.figure(), self.store, '#88C0D0')
+        self.force_graph = ForceGraph(*self.figure(), self.store,
+                                      ('#A3BE8C', '#EBCB8B', '#BF616A'))
+        self.speed_graph.canvas.draw()
+        self.force_graph.canvas.draw()
+
+    @staticmethod
+    def figure():
+        figure = Figure(figsize=(5, 4), dpi=100)
+        ax = figure.add_subplot(111)
+        return figure, ax, FigureCanvasAgg(figure)
+
+    def render(self, punches):
+        for punch in punches:
+            self.store.append(*punch)
+        self.speed_graph.append(len(punches))
+        self.force_graph.append(len(punches))
+
+
+class BenchSink:
+    """Drains the UI channel in batches like Visualizer.update_ui and renders each batch."""
+
+    def __init__(self, ui_channel: UIChannel, dashboard: AggDashboard):
+        self.ui_channel = ui_channel
+        self.dashboard = dashboard
+        self.latencies = []
+        self.frame_times = []
+        self._wakeup = threading.Event()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def drain(self):
+        punches = []
+        origins = []
+        try:
+            while True:
+                (key, value), t_origin = self.ui_channel.get_with_origin_nowait()
+                if key == 'punch':
+                    punches.append(value)
+                    origins.append(t_origin)
+        except queue.Empty:
+            pass
+        if not punches:
+            return
+        start = time.perf_counter()
+        self.dashboard.render(punches)
+        end = time.perf_counter()
+        self.frame_times.append(end - start)
+        self.latencies.extend(end - t_origin for t_origin in origins)
+
+    def run(self, future):
+        while not future.done():
+            self._wakeup.wait(0.1)
+            self._wakeup.clear()
+            self.drain()
+        self.drain()
+
+
+def bench_decode(count: int) -> dict:
+    """Cost of the BLEManager notification callbacks alone."""
+    manager = BLEManager("BENCH", asyncio.Queue(), "BENCH")
+    speed = manager.protocol.by_record[KIND_SPEED]
+    payloads = [struct.pack('<f', i % 1000 * 0.01) for i in range(count)]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for payload in payloads:
+            manager.on_notify(speed, speed.uuid, payload)
+        elapsed = time.perf_counter() - start
+    return {'events': count, 'events_per_sec': count / elapsed,
+            'us_per_event': elapsed / count * 1e6}
+
+
+def bench_classify(punches: int) -> dict:
+    """Punch-type inference cost per punch at several batch sizes."""
+    model = train_synthetic()
+    features, _ = labelled_features(*synthetic_session(punches, seed=1))
+    results = {}
+    for batch_size in CLASSIFY_BATCH_SIZES:
+        start = time.perf_counter()
+        for i in range(0, len(features), batch_size):
+            model.predict(features[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        results[batch_size] = {'punches': len(features),
+                               'us_per_punch': elapsed / len(features) * 1e6,
+                               'punches_per_sec': len(features) / elapsed}
+    return results
+
+
+def bench_frames(history: int, frames: int = STEADY_FRAMES) -> dict:
+    """Per-frame render cost once the graphs already hold history punches.
+
+    The pipeline pass at --rate 0 renders a whole history in a handful of
+    large batches; this one fills the store first and then times frames
+    of one punch each, as a live session renders them.
+    """
+    dashboard = AggDashboard()
+    dashboard.render([(float(i), 1.0 + i % 7 * 0.5, 50.0 + i % 11 * 30.0, 'A')
+                      for i in range(history)])
+    graphs = (dashboard.speed_graph, dashboard.force_graph)
+    redraws = sum(graph.full_redraws for graph in graphs)
+    times = []
+    for i in range(history, history + frames):
+        start = time.perf_counter()
+        dashboard.render([(float(i), 1.0 + i % 7 * 0.5, 50.0 + i % 11 * 30.0, 'A')])
+        times.append(time.perf_counter() - start)
+    redraws = sum(graph.full_redraws for graph in graphs) - redraws
+    return {
+        'history': history,
+        'frames': frames,
+        'median_ms': statistics.median(times) * 1000,
+        'p99_ms': percentile(times, 99) * 1000,
+        'max_ms': max(times) * 1000,
+        # Full redraws per frame across both graphs; the rest are blits
+        'full_redraw_rate': redraws / (frames * len(graphs)),
+    }
+
+
+def run_pipeline(punches: int, gloves: int, trace_memory: bool = False) -> dict:
+    """Streams punches through BLEManager -> DataProcessor -> Agg graphs."""
+    args = main.parse_args(['--simulate', str(gloves), '--punches', str(punches // gloves),
+                            '--rate', '0', '--no-record', '--headless'])
+    stats = PipelineStats()
+    ui_channel = UIChannel(stats)
+    dashboard = AggDashboard()
+    sink = BenchSink(ui_channel, dashboard)
+    ui_channel.set_waker(sink.wake)
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=main.start_asyncio_loop, args=(loop,), daemon=True)
+    if trace_memory:
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+    thread.start()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        future = asyncio.run_coroutine_threadsafe(
+            run_ble_operations(ui_channel, asyncio.Queue(), stats, args), loop)
+        sink.run(future)
+        elapsed = time.perf_counter() - start
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+    result = {
+        'punches': dashboard.store.total,
+        'gloves': gloves,
+        'elapsed_s': elapsed,
+        'events_per_sec': stats.events_in / elapsed,
+        'punches_per_sec': dashboard.store.total / elapsed,
+        'latency_ms': {
+            'p50': percentile(sink.latencies, 50) * 1000,
+            'p99': percentile(sink.latencies, 99) * 1000,
+            'max': max(sink.latencies, default=0.0) * 1000,
+        },
+        'frame_ms': {
+            'frames': len(sink.frame_times),
+            'mean': statistics.fmean(sink.frame_times) * 1000 if sink.frame_times else 0.0,
+            'p99': percentile(sink.frame_times, 99) * 1000,
+            'max': max(sink.frame_times, default=0.0) * 1000,
+        },
+        'full_redraws': (dashboard.speed_graph.full_redraws
+                         + dashboard.force_graph.full_redraws),
+        'store_bytes': dashboard.store.nbytes(),
+    }
+    if trace_memory:
+        growth = sum(stat.size_diff for stat in
+                     tracemalloc.take_snapshot().compare_to(baseline, 'filename'))
+        result['memory_growth_bytes'] = growth
+        result['memory_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=HISTORY_SIZES,
+                        help="history sizes (punches) to benchmark")
+    parser.add_argument('--gloves', type=int, default=1)
+    parser.add_argument('--decode-events', type=int, default=100000)
+    parser.add_argument('--classify-punches', type=int, default=1000)
+    parser.add_argument('--frames', type=int, default=STEADY_FRAMES,
+                        help="single-punch frames timed per history size")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="skip the tracemalloc pass, which roughly doubles run time")
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args(argv)
+
+    results = {
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'decode': bench_decode(args.decode_events),
+        'classify': bench_classify(args.classify_punches),
+        'pipeline': [],
+        'frames': [],
+    }
+    print(f"decode: {results['decode']['events_per_sec']:.0f} events/s")
+    for batch_size, result in results['classify'].items():
+        print(f"classify batch {batch_size:>3}: {result['us_per_punch']:.1f} us/punch")
+    for size in args.sizes:
+        result = run_pipeline(size, args.gloves)
+        if not args.no_memory:
+            result['memory'] = run_pipeline(size, args.gloves, trace_memory=True)
+            result['memory'] = {key: result['memory'][key]
+                                for key in ('memory_growth_bytes', 'memory_peak_bytes')}
+        results['pipeline'].append(result)
+        print(f"{size:>7} punches: {result['events_per_sec']:.0f} events/s, "
+              f"latency p50 {result['latency_ms']['p50']:.2f} ms "
+              f"p99 {result['latency_ms']['p99']:.2f} ms, "
+              f"frame mean {result['frame_ms']['mean']:.2f} ms "
+              f"over {result['frame_ms']['frames']} frames")
+    for size in args.sizes:
+        result = bench_frames(size, args.frames)
+        results['frames'].append(result)
+        print(f"{size:>7} punches: frame median {result['median_ms']:.2f} ms "
+              f"p99 {result['p99_ms']:.2f} ms, "
+              f"{result['full_redraw_rate']:.1%} full redraws")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main_bench()
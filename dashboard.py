@@ -0,0 +1,409 @@
+"""Headless multi-client dashboard served over HTTP with server-sent events.
+
+DashboardServer stands in for the UIChannel: DataProcessor calls put() on
+the asyncio thread, messages are collected into batches of at most one per
+frame, and every batch is encoded once and fanned out to all viewers.
+Each viewer has a bounded queue; a viewer that falls behind is disconnected
+instead of slowing ingest down, and its browser reconnects and resyncs from
+a snapshot. Only the standard library is used.
+
+    python main.py --serve            # http://127.0.0.1:8765/
+    python main.py --serve 9000 --host 0.0.0.0 --simulate 2
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from metrics import NULL_METRICS, STAGE_UI
+
+DASHBOARD_HOST = "127.0.0.1"
+DASHBOARD_PORT = 8765
+# Batches are published at most this many times per second
+MAX_BATCHES_PER_SEC = 30
+# Batches a viewer may have queued before it is dropped
+CLIENT_QUEUE_SIZE = 64
+# Punches included in the snapshot sent to new viewers
+RECENT_PUNCHES = 500
+# Idle viewers get a comment line this often so dead connections are noticed
+KEEPALIVE_INTERVAL = 15.0
+# Limits for the request line and headers of incoming requests
+REQUEST_TIMEOUT = 10.0
+MAX_HEADERS = 64
+
+
+class DashboardState:
+    """What a new viewer needs to catch up: totals, maxima and recent punches."""
+
+    def __init__(self):
+        self.punches = deque(maxlen=RECENT_PUNCHES)
+        self.reset()
+
+    def reset(self):
+        self.punch_count = 0
+        self.values = {'previous_max_speed': 0.0, 'previous_max_force': 0.0,
+                       'historical_max_speed': 0.0, 'historical_max_force': 0.0}
+        self.punches.clear()
+        self.analytics = None
+        self.punch_type = None
+        # Per-glove, per-athlete and per-hand stats from DataProcessor.summary()
+        self.summary = None
+
+    def apply(self, key, value):
+        if key == 'reset':
+            self.reset()
+        elif key == 'punch':
+            self.punch_count += 1
+            self.punches.append(value)
+        elif key == 'analytics':
+            self.analytics = value
+        elif key == 'punch_type':
+            self.punch_type = value
+        elif key == 'summary':
+            self.summary = value
+        elif key in self.values:
+            self.values[key] = value
+
+    def snapshot(self) -> dict:
+        return {'punch_count': self.punch_count, **self.values, 'analytics': self.analytics,
+                'punch_type': self.punch_type, 'summary': self.summary,
+                'punches': list(self.punches)}
+
+
+class DashboardClient:
+    """One connected viewer: its pending batches and the task serving it."""
+
+    def __init__(self, peer):
+        self.peer = peer
+        self.queue = asyncio.Queue(CLIENT_QUEUE_SIZE)
+        self.task = asyncio.current_task()
+        self.dropped = False
+
+
+class DashboardServer:
+    """Publishes DataProcessor output to any number of browsers.
+
+    put() must be called on the loop the server runs on.
+    """
+
+    def __init__(self, command_queue: asyncio.Queue, host: str = DASHBOARD_HOST,
+                 port: int = DASHBOARD_PORT, stats=None, metrics=NULL_METRICS):
+        self.command_queue = command_queue
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self.metrics = metrics
+        self.state = DashboardState()
+        self.clients = set()
+        self.server = None
+        # Messages and BLE arrival times collected since the last flush
+        self.pending = []
+        self.pending_origins = []
+        self.flush_handle = None
+        self.last_flush = 0.0
+        self.batches = 0
+        self.viewers_served = 0
+        self.viewers_dropped = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        # Port 0 picks a free port; report the real one
+        self.port = self.server.sockets[0].getsockname()[1]
+        print(f"Dashboard at http://{self.host}:{self.port}/")
+
+    async def close(self):
+        if self.flush_handle:
+            self.flush_handle.cancel()
+            self.flush()
+        if self.server:
+            self.server.close()
+        for client in list(self.clients):
+            client.task.cancel()
+        if self.server:
+            await self.server.wait_closed()
+
+    def put(self, item, t_origin=None):
+        """Queues one message; the first put after a flush schedules the next one."""
+        self.pending.append(item)
+        if t_origin is not None:
+            self.pending_origins.append(t_origin)
+        if self.flush_handle is None:
+            loop = asyncio.get_running_loop()
+            wait = self.last_flush + 1.0 / MAX_BATCHES_PER_SEC - time.perf_counter()
+            if wait > 0:
+                self.flush_handle = loop.call_later(wait, self.flush)
+            else:
+                # Still let the rest of the current burst join this batch
+                self.flush_handle = loop.call_soon(self.flush)
+
+    def flush(self):
+        """Encodes the pending batch once and hands it to every viewer."""
+        self.flush_handle = None
+        self.last_flush = time.perf_counter()
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        for key, value in batch:
+            self.state.apply(key, value)
+        payload = f"data: {json.dumps(batch, separators=(',', ':'))}\n\n".encode()
+        for client in list(self.clients):
+            try:
+                client.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self.drop(client)
+        self.batches += 1
+
+        now = time.perf_counter()
+        for t_origin in self.pending_origins:
+            if self.stats is not None:
+                self.stats.end_to_end.add(now - t_origin)
+            if self.metrics.enabled:
+                self.metrics.observe(STAGE_UI, now - t_origin)
+        self.pending_origins = []
+        if self.metrics.enabled:
+            self.metrics.depth('viewers', len(self.clients))
+
+    def drop(self, client: DashboardClient):
+        """Disconnects a viewer that cannot keep up; EventSource reconnects on its own."""
+        client.dropped = True
+        self.clients.discard(client)
+        self.viewers_dropped += 1
+        self.metrics.drop('slow_viewer')
+        client.task.cancel()
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter):
+        try:
+            method, path = await asyncio.wait_for(self.read_request(reader), REQUEST_TIMEOUT)
+            if method == 'GET' and path == '/':
+                await self.respond(writer, 200, 'text/html; charset=utf-8', DASHBOARD_HTML)
+            elif method == 'GET' and path == '/summary':
+                await self.respond(writer, 200, 'application/json',
+                                   json.dumps(self.state.snapshot()).encode())
+            elif method == 'POST' and path == '/reset':
+                self.command_queue.put_nowait(('reset', None))
+                await self.respond(writer, 204)
+            elif method == 'GET' and path == '/events':
+                await self.stream_events(writer)
+            else:
+                await self.respond(writer, 404, 'text/plain', b"Not found\n")
+        except (asyncio.TimeoutError, ValueError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Dropped viewer or server shutdown
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def read_request(reader: asyncio.StreamReader):
+        """Returns (method, path) and skips the headers; bodies are not used."""
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise ValueError("Malformed request line")
+        for _ in range(MAX_HEADERS):
+            if (await reader.readline()) in (b'\r\n', b'\n', b''):
+                break
+        else:
+            raise ValueError("Too many headers")
+        method, target, _ = request_line
+        return method, target.split('?', 1)[0]
+
+    @staticmethod
+    async def respond(writer, status, content_type=None, body=b""):
+        reason = {200: 'OK', 204: 'No Content', 404: 'Not Found'}[status]
+        headers = f"HTTP/1.1 {status} {reason}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n"
+        if content_type:
+            headers += f"Content-Type: {content_type}\r\n"
+        writer.write(headers.encode() + b"\r\n" + body)
+        await writer.drain()
+
+    async def stream_events(self, writer: asyncio.StreamWriter):
+        client = DashboardClient(writer.get_extra_info('peername'))
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n"
+                     b"retry: 1000\n")
+        # The snapshot and the registration happen together on the loop, so
+        # the viewer sees every batch after the snapshot exactly once
+        snapshot = json.dumps(self.state.snapshot(), separators=(',', ':'))
+        writer.write(f"event: snapshot\ndata: {snapshot}\n\n".encode())
+        self.clients.add(client)
+        self.viewers_served += 1
+        try:
+            # wait_for can swallow drop()'s cancel when the get has just
+            # completed, so the flag is checked too
+            while not client.dropped:
+                try:
+                    payload = await asyncio.wait_for(client.queue.get(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    payload = b": keepalive\n\n"
+                if client.dropped:
+                    break
+                writer.write(payload)
+                await writer.drain()
+        finally:
+            self.clients.discard(client)
+
+    def run(self, loop: asyncio.AbstractEventLoop, future):
+        """Serves from loop (running in another thread) until future completes."""
+        asyncio.run_coroutine_threadsafe(self.start(), loop).result()
+        try:
+            while not future.done():
+                time.sleep(0.1)
+        finally:
+            asyncio.run_coroutine_threadsafe(self.close(), loop).result()
+
+    def report(self):
+        print(f"Dashboard: {self.batches} batches to {self.viewers_served} viewers, "
+              f"{self.viewers_dropped} dropped for falling behind")
+
+
+DASHBOARD_HTML = b"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Smart Boxing Gloves</title>
+<style>
+  body { background: #2E3440; color: #ECEFF4; font-family: "Segoe UI", sans-serif; margin: 20px; }
+  h1 { color: #88C0D0; margin: 0 0 10px; }
+  .stats { display: flex; gap: 40px; flex-wrap: wrap; }
+  .stats h2 { color: #81A1C1; font-size: 1.1em; margin: 10px 0 4px; }
+  .graphs { display: flex; gap: 20px; flex-wrap: wrap; margin-top: 20px; }
+  canvas { background: #3B4252; width: 100%; max-width: 600px; height: 300px; }
+  button { background: #2E3440; color: #88C0D0; border: 1px solid #88C0D0; padding: 6px 14px; }
+  #status { color: #81A1C1; font-size: 0.9em; }
+  #athletes td { padding: 2px 12px 2px 0; }
+</style>
+</head>
+<body>
+<h1>Punch Count: <span id="count">0</span></h1>
+<button onclick="fetch('/reset', {method: 'POST'})">Reset</button>
+<span id="status">connecting</span>
+<div class="stats">
+  <div><h2>Latest Stats</h2>
+    <div>Speed: <span id="previous_max_speed">0.00</span> m/s</div>
+    <div>Force: <span id="previous_max_force">0.00</span> N</div></div>
+  <div><h2>Maximum Stats</h2>
+    <div>Speed: <span id="historical_max_speed">0.00</span> m/s</div>
+    <div>Force: <span id="historical_max_force">0.00</span> N</div></div>
+  <div><h2>Session Stats</h2>
+    <div>Rate: <span id="rate">0</span> punches/min</div>
+    <div>Fatigue: <span id="fatigue">-</span></div>
+    <div>Last punch: <span id="punch_type">-</span></div></div>
+  <div><h2>Athletes</h2><table id="athletes"></table></div>
+</div>
+<div class="graphs">
+  <canvas id="speed" width="600" height="300"></canvas>
+  <canvas id="force" width="600" height="300"></canvas>
+</div>
+<script>
+const RECENT = 200;
+let punches = [];
+let dirty = false;
+
+function setValue(key, value) {
+  const el = document.getElementById(key);
+  if (el) el.textContent = key === 'count' ? value : value.toFixed(2);
+}
+
+function showAnalytics(a) {
+  document.getElementById('rate').textContent = a ? a.punches_per_minute.toFixed(0) : '0';
+  if (!a) { document.getElementById('fatigue').textContent = '-'; return; }
+  const decay = Math.max(a.fatigue.speed_decay, a.fatigue.force_decay);
+  document.getElementById('fatigue').textContent =
+    (a.fatigue.fatigued ? 'fatigued' : 'fresh') + ' (' + (decay * 100).toFixed(0) + '% drop)';
+}
+
+function showPunchType(p) {
+  document.getElementById('punch_type').textContent =
+    p ? p[1] + ' (' + (p[2] * 100).toFixed(0) + '%)' : '-';
+}
+
+function showSummary(s) {
+  const table = document.getElementById('athletes');
+  table.replaceChildren();
+  for (const [athlete, a] of Object.entries(s ? s.athletes : {})) {
+    for (const [hand, g] of Object.entries(a.hands)) {
+      const row = table.insertRow();
+      for (const text of [athlete, hand, g.punch_count + ' punches',
+                          g.historical_max_speed.toFixed(2) + ' m/s',
+                          g.historical_max_force.toFixed(2) + ' N']) {
+        row.insertCell().textContent = text;
+      }
+    }
+  }
+}
+
+function apply(key, value) {
+  if (key === 'analytics') { showAnalytics(value); return; }
+  if (key === 'summary') { showSummary(value); return; }
+  if (key === 'punch_type') { showPunchType(value); return; }
+  if (key === 'reset') {
+    punches = [];
+    showAnalytics(null);
+    showPunchType(null);
+    showSummary(null);
+    setValue('count', 0);
+    for (const k of ['previous_max_speed', 'previous_max_force',
+                     'historical_max_speed', 'historical_max_force']) setValue(k, 0);
+  } else if (key === 'punch') {
+    punches.push(value);
+    if (punches.length > RECENT) punches.splice(0, punches.length - RECENT);
+    setValue('count', Number(document.getElementById('count').textContent) + 1);
+  } else {
+    setValue(key, value);
+  }
+  dirty = true;
+}
+
+function forceColor(force) {
+  return force < 100 ? '#A3BE8C' : force < 300 ? '#EBCB8B' : '#BF616A';
+}
+
+function plot(id, index, bars) {
+  const canvas = document.getElementById(id);
+  const ctx = canvas.getContext('2d');
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  if (!punches.length) return;
+  const top = Math.max(...punches.map(p => p[index])) * 1.25 || 1;
+  const step = canvas.width / RECENT;
+  const y = v => canvas.height * (1 - v / top);
+  ctx.beginPath();
+  punches.forEach((p, i) => {
+    if (bars) {
+      ctx.fillStyle = forceColor(p[index]);
+      ctx.fillRect(i * step, y(p[index]), Math.max(step * 0.8, 1), canvas.height - y(p[index]));
+    } else if (i) {
+      ctx.lineTo(i * step, y(p[index]));
+    } else {
+      ctx.moveTo(0, y(p[index]));
+    }
+  });
+  if (!bars) { ctx.strokeStyle = '#88C0D0'; ctx.lineWidth = 2; ctx.stroke(); }
+}
+
+function render() {
+  if (dirty) { plot('speed', 1, false); plot('force', 2, true); dirty = false; }
+  requestAnimationFrame(render);
+}
+
+const events = new EventSource('/events');
+events.addEventListener('snapshot', e => {
+  const state = JSON.parse(e.data);
+  punches = state.punches.slice(-RECENT);
+  setValue('count', state.punch_count);
+  for (const k of ['previous_max_speed', 'previous_max_force',
+                   'historical_max_speed', 'historical_max_force']) setValue(k, state[k]);
+  showAnalytics(state.analytics);
+  showPunchType(state.punch_type);
+  showSummary(state.summary);
+  dirty = true;
+  document.getElementById('status').textContent = 'live';
+});
+events.onmessage = e => { for (const [key, value] of JSON.parse(e.data)) apply(key, value); };
+events.onerror = () => { document.getElementById('status').textContent = 'reconnecting'; };
+requestAnimationFrame(render);
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,12 @@
+"""Display constants shared by the Tk window and its matplotlib graphs.
+
+Kept free of imports so the headless benchmark can load the graphs without
+tkinter, and the window can load these without matplotlib.
+"""
+
+# Upper bound on UI renders per second; bursts are coalesced into one frame
+MAX_FPS = 30
+# Render budget for a single graph update
+FRAME_BUDGET = 1.0 / MAX_FPS
+# Force (N) at which bars turn from low to medium and from medium to high intensity
+FORCE_LEVELS = (100.0, 300.0)
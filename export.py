@@ -0,0 +1,290 @@
+"""Exports recorded sessions, filtered by athlete, glove and date range.
+
+    python export.py --athlete alice --since 2024-05-06 --until 2024-05-12 -o week.csv
+    python export.py --glove AA:BB:CC:DD:EE:FF --format jsonl
+    python export.py --records -o all.parquet
+
+Punches (a speed notification and the force notification that follows it)
+are exported by default; --records exports the raw notifications. Records
+are read through the (device, timestamp) session index in bounded chunks,
+so memory use does not depend on how much is exported. Rows are grouped by
+session and glove, in time order within each group. Parquet output needs
+pyarrow.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+import numpy as np
+from assignments import GLOVE_ASSIGNMENTS_FILE, load_glove_assignments
+from session_index import CHUNK_RECORDS, SessionIndex
+from session_log import KIND_FORCE, KIND_SPEED, SESSION_DIR, device_id, load_devices
+
+FORMATS = ('csv', 'json', 'jsonl', 'parquet')
+KIND_NAMES = {KIND_SPEED: 'speed', KIND_FORCE: 'force'}
+
+
+def parse_time(text: str, end: bool = False) -> float:
+    """Unix seconds from a number or an ISO date/datetime in local time.
+
+    A bare date used as an end bound means the end of that day.
+    """
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    moment = datetime.fromisoformat(text)
+    if end and len(text) == 10:
+        moment += timedelta(days=1)
+    return moment.timestamp()
+
+
+def select_devices(known: set, addresses: dict, assignments: dict,
+                   athletes=None, gloves=None):
+    """Device ids matching the athlete and glove filters, or None for no filter."""
+    if not athletes and not gloves:
+        return None
+    selected = set()
+    for device in known:
+        address = addresses.get(device, f"{device:08x}")
+        assignment = assignments.get(address, {})
+        # Unassigned gloves are their own athlete, as in the live view
+        athlete = assignment.get('athlete') or address
+        if athletes and athlete in athletes:
+            selected.add(device)
+        if gloves and (address in gloves or f"{device:08x}" in gloves):
+            selected.add(device)
+    # Gloves given by address may not be in devices.json yet
+    selected.update(device_id(glove) for glove in gloves or () if device_id(glove) in known)
+    return selected
+
+
+def pair_punches(records: np.ndarray):
+    """Pairs one glove's time-ordered records into (timestamp, speed, force) arrays.
+
+    Mirrors GloveStats.update: a speed without a following force is a punch
+    with zero force, and a force without a preceding speed has zero speed.
+    """
+    kind = records['kind']
+    value = records['value']
+    is_speed = kind == KIND_SPEED
+    has_force = np.zeros(len(records), dtype=bool)
+    has_force[:-1] = is_speed[:-1] & (kind[1:] == KIND_FORCE)
+    claimed = np.concatenate(([False], has_force[:-1]))
+    rows = is_speed | ((kind == KIND_FORCE) & ~claimed)
+    next_value = np.append(value[1:], 0.0)
+    speed = np.where(is_speed, value, 0.0)[rows]
+    force = np.where(is_speed, np.where(has_force, next_value, 0.0), value)[rows]
+    return records['timestamp'][rows], speed, force
+
+
+def plain_floats(values: np.ndarray) -> list:
+    """float32 values as the shortest floats that print the same, e.g. 5.1 not 5.099999904."""
+    return np.asarray(values, dtype=np.float32).astype(str).astype(np.float64).tolist()
+
+
+def iso_times(timestamps: np.ndarray) -> list:
+    """ISO 8601 UTC strings, converted without a Python loop per row."""
+    micros = (np.asarray(timestamps) * 1e6).astype('datetime64[us]')
+    return np.char.add(np.datetime_as_string(micros, unit='ms'), 'Z').tolist()
+
+
+class CsvExporter:
+    def __init__(self, out):
+        self.writer = csv.writer(out)
+        self.header = False
+
+    def write(self, columns: dict):
+        if not self.header:
+            self.writer.writerow(columns)
+            self.header = True
+        self.writer.writerows(zip(*columns.values()))
+
+    def close(self):
+        pass
+
+
+class JsonLinesExporter:
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, columns: dict):
+        names = list(columns)
+        for row in zip(*columns.values()):
+            self.out.write(json.dumps(dict(zip(names, row))) + "\n")
+
+    def close(self):
+        pass
+
+
+class JsonExporter(JsonLinesExporter):
+    """A single JSON array, written row by row."""
+
+    def __init__(self, out):
+        super().__init__(out)
+        self.rows = 0
+        out.write("[")
+
+    def write(self, columns: dict):
+        names = list(columns)
+        for row in zip(*columns.values()):
+            self.out.write(("\n" if not self.rows else ",\n") + json.dumps(dict(zip(names, row))))
+            self.rows += 1
+
+    def close(self):
+        self.out.write("\n]\n")
+
+
+class ParquetExporter:
+    """One Parquet row group per chunk."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("Parquet export needs pyarrow: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.writer = None
+
+    def write(self, columns: dict):
+        table = self.pa.table(columns)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_exporter(fmt: str, output: str):
+    """Returns (exporter, file to close or None)."""
+    if fmt == 'parquet':
+        if output == '-':
+            raise SystemExit("Parquet cannot be written to stdout; use --output.")
+        return ParquetExporter(output), None
+    out = sys.stdout if output == '-' else open(output, 'w', newline='')
+    exporter = {'csv': CsvExporter, 'json': JsonExporter, 'jsonl': JsonLinesExporter}[fmt](out)
+    return exporter, (None if out is sys.stdout else out)
+
+
+def export(index: SessionIndex, exporter, devices=None, since=None, until=None,
+           addresses=None, assignments=None, records_only=False,
+           chunk_records=CHUNK_RECORDS) -> int:
+    """Streams the selected data to exporter and returns the number of rows written."""
+    addresses = addresses or {}
+    assignments = assignments or {}
+    rows = 0
+    group = None
+    carry = None
+    for session, device, records in index.select(devices, since, until, chunk_records):
+        if not records_only:
+            if (session, device) != group:
+                if carry is not None:
+                    # A speed at the end of a group never got its force
+                    rows += write_rows(exporter, *group, carry, addresses, assignments)
+                    carry = None
+                group = (session, device)
+            elif carry is not None:
+                records = np.concatenate((carry, records))
+                carry = None
+            # Keep a trailing speed until the chunk holding its force arrives
+            if len(records) and records['kind'][-1] == KIND_SPEED:
+                carry, records = records[-1:], records[:-1]
+        rows += write_rows(exporter, session, device, records, addresses, assignments,
+                           records_only)
+    if carry is not None:
+        rows += write_rows(exporter, *group, carry, addresses, assignments)
+    return rows
+
+
+def write_rows(exporter, session, device, records, addresses, assignments,
+               records_only=False) -> int:
+    """Writes one chunk of a single glove's records as punches or raw records."""
+    if not len(records):
+        return 0
+    address = addresses.get(device, f"{device:08x}")
+    assignment = assignments.get(address, {})
+    if records_only:
+        timestamps = records['timestamp']
+        columns = {'kind': [KIND_NAMES.get(int(kind), str(kind)) for kind in records['kind']],
+                   'value': plain_floats(records['value'])}
+    else:
+        timestamps, speed, force = pair_punches(records)
+        columns = {'speed': plain_floats(speed), 'force': plain_floats(force)}
+    count = len(timestamps)
+    exporter.write({
+        'timestamp': timestamps.tolist(),
+        'time': iso_times(timestamps),
+        'session': [session] * count,
+        'glove': [address] * count,
+        'athlete': [assignment.get('athlete') or address] * count,
+        'hand': [assignment.get('hand', "unknown")] * count,
+        **columns,
+    })
+    return count
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dir', default=SESSION_DIR, help="session log directory")
+    parser.add_argument('--assignments', default=GLOVE_ASSIGNMENTS_FILE,
+                        help="JSON file mapping glove addresses to athlete and hand")
+    parser.add_argument('--athlete', action='append',
+                        help="only this athlete (repeatable)")
+    parser.add_argument('--glove', action='append',
+                        help="only this glove address or device id (repeatable)")
+    parser.add_argument('--since', help="start date/time (ISO, local) or unix time")
+    parser.add_argument('--until', help="end date/time (ISO, local; a date includes that day) "
+                                        "or unix time")
+    parser.add_argument('--records', action='store_true',
+                        help="export raw notifications instead of punches")
+    parser.add_argument('--format', choices=FORMATS,
+                        help="output format (default: from the output extension, else csv)")
+    parser.add_argument('-o', '--output', default='-', help="output file, - for stdout")
+    parser.add_argument('--chunk', type=int, default=CHUNK_RECORDS,
+                        help="records read per chunk")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    fmt = args.format
+    if fmt is None:
+        extension = os.path.splitext(args.output)[1].lstrip('.')
+        fmt = extension if extension in FORMATS else 'csv'
+    since = parse_time(args.since) if args.since else None
+    until = parse_time(args.until, end=True) if args.until else None
+
+    if not os.path.isdir(args.dir):
+        print(f"No session directory {args.dir}.", file=sys.stderr)
+        return 1
+    index = SessionIndex(args.dir)
+    addresses = load_devices(args.dir)
+    assignments = load_glove_assignments(args.assignments)
+    devices = select_devices(index.devices(), addresses, assignments, args.athlete, args.glove)
+    if devices is not None and not devices:
+        print("No recorded glove matches the athlete/glove filters.", file=sys.stderr)
+        return 1
+
+    exporter, out = open_exporter(fmt, args.output)
+    try:
+        rows = export(index, exporter, devices, since, until, addresses, assignments,
+                      args.records, args.chunk)
+        exporter.close()
+    finally:
+        if out:
+            out.close()
+    what = "records" if args.records else "punches"
+    print(f"Exported {rows} {what} to {args.output if args.output != '-' else 'stdout'}.",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""BLE connections to the gloves: one BLEManager per glove, GloveHub for several.
+
+BLEManager decodes notifications through the protocol registry and hands
+them to the DataProcessor's raw queue from the bleak callbacks; supervise()
+keeps the link up with jittered exponential backoff.
+"""
+import asyncio
+import functools
+import logging
+import random
+import struct
+import time
+from metrics import NULL_METRICS, Metrics
+from pipeline import LatencyStats
+from protocol import Protocol, RateLimitedLog, load_protocol
+from raw_stream import RawSampleBuffer
+from session_log import SessionWriter
+from startup import STARTUP
+
+# Upper bound on gloves being connected at the same time
+MAX_PARALLEL_CONNECTS = 3
+
+# Reconnect policy: the first retry is immediate, later ones back off
+# exponentially with jitter up to RECONNECT_BACKOFF_MAX seconds
+CONNECT_TIMEOUT = 3.0
+SCAN_TIMEOUT = 5.0
+# How long the initial scan waits for --gloves gloves before connecting to fewer
+SCAN_WINDOW = 10.0
+RECONNECT_BACKOFF_BASE = 0.25
+RECONNECT_BACKOFF_MAX = 5.0
+# Direct reconnects to the cached address before falling back to a scan
+CACHED_ADDRESS_ATTEMPTS = 2
+
+
+def bleak():
+    """The bleak module, imported on first use so it does not delay the window."""
+    return STARTUP.import_module('bleak')
+
+
+class BLEManager:
+    def __init__(self, device_name: str, raw_queue: asyncio.Queue, device_address: str = None,
+                 recorder: SessionWriter = None, metrics: Metrics = NULL_METRICS,
+                 raw_stream: bool = False, protocol: Protocol = None):
+        self.device_name = device_name
+        self.device_address = device_address
+        self.metrics = metrics
+        self.protocol = protocol or load_protocol()
+        # Per-notification logging, limited so it cannot slow the callbacks down
+        self.log = RateLimitedLog()
+        # High-rate raw IMU/FSR samples, if the firmware streams them
+        self.raw_samples = RawSampleBuffer() if raw_stream else None
+        self.client = None
+        # Raw samples are handed to the DataProcessor through raw_queue
+        self.raw_queue = raw_queue
+        # Optional session log; record() only enqueues, so it is safe here
+        self.recorder = recorder
+        # Connection supervision
+        self.closing = False
+        self.lost = asyncio.Event()
+        self.disconnected_at = None
+        self.disconnected_time = 0.0
+        self.reconnects = 0
+        self.reconnect_latency = LatencyStats()
+        # Managers of the other gloves in the session; set by GloveHub
+        self.peers = ()
+
+    def peer_addresses(self) -> set:
+        """Addresses owned by the other gloves, which a scan must not rebind to."""
+        return {peer.device_address for peer in self.peers if peer is not self}
+
+    async def find_device_address(self) -> str:
+        """Scans for the target device, returning as soon as it is seen.
+
+        Gloves of the same model advertise the same name, so addresses owned
+        by the other managers in the session are skipped.
+        """
+        attempt = 0
+        while True:
+            print("Scanning for BLE devices...")
+            taken = self.peer_addresses()
+            device = await bleak().BleakScanner.find_device_by_filter(
+                lambda d, adv: (self.device_name in (d.name, adv.local_name)
+                                and d.address not in taken),
+                timeout=SCAN_TIMEOUT)
+            if device is not None:
+                print(f"Found device: {self.device_name} with address {device.address}")
+                return device.address
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    async def connect(self):
+        if self.device_address is None:
+            self.device_address = await self.find_device_address()
+        if self.device_address is None:
+            raise ConnectionError(f"Device {self.device_name} not found.")
+        self.client = bleak().BleakClient(self.device_address, disconnected_callback=self.on_disconnected,
+                                  timeout=CONNECT_TIMEOUT)
+        await self.client.connect()
+        if not self.client.is_connected:
+            raise ConnectionError(f"Failed to connect to {self.device_name}.")
+        print(f"Connected to {self.device_name} ({self.device_address}).")
+        self.lost.clear()
+
+        started = []
+        for characteristic in self.protocol.characteristics:
+            if characteristic.decoder == 'raw_samples' and self.raw_samples is None:
+                continue
+            try:
+                await self.client.start_notify(
+                    characteristic.uuid, functools.partial(self.on_notify, characteristic))
+            except Exception as e:
+                if not characteristic.optional:
+                    raise
+                # Older firmware lacks some characteristics, e.g. raw samples
+                print(f"{characteristic.name} notifications unavailable: {e}")
+                if characteristic.decoder == 'raw_samples':
+                    self.raw_samples = None
+                continue
+            started.append(characteristic.name)
+        print(f"Started notifications for {', '.join(started)}.")
+
+    def on_disconnected(self, client):
+        print(f"Device {self.device_name} ({self.device_address}) disconnected.")
+        if not self.closing:
+            self.disconnected_at = time.monotonic()
+            self.lost.set()
+
+    async def supervise(self):
+        """Reconnects whenever the link drops, until disconnect() is called.
+
+        The cached address is tried first; if that keeps failing, a filtered
+        scan looks the glove up again in case its address changed, never
+        taking over the address of another glove in the session. Pipeline
+        state lives in the DataProcessor, so nothing is lost on this side.
+        """
+        while not self.closing:
+            await self.lost.wait()
+            attempt = 0
+            while not self.closing:
+                try:
+                    if attempt >= CACHED_ADDRESS_ATTEMPTS and attempt % CACHED_ADDRESS_ATTEMPTS == 0:
+                        self.device_address = await self.find_device_address()
+                    await self.connect()
+                except Exception as e:
+                    print(f"Reconnect to {self.device_name} failed: {e}")
+                    await asyncio.sleep(backoff_delay(attempt))
+                    attempt += 1
+                    continue
+                latency = time.monotonic() - self.disconnected_at
+                self.disconnected_time += latency
+                self.reconnect_latency.add(latency)
+                self.reconnects += 1
+                if self.raw_samples is not None:
+                    # The firmware restarts its packet sequence on a new connection
+                    self.raw_samples.reset_sequence()
+                print(f"Reconnected to {self.device_name} after {latency:.2f} s.")
+                break
+
+    def connection_stats(self) -> dict:
+        down = self.disconnected_time
+        if self.lost.is_set() and self.disconnected_at is not None:
+            down += time.monotonic() - self.disconnected_at
+        return {
+            'reconnects': self.reconnects,
+            'disconnected_s': down,
+            'reconnect_latency': self.reconnect_latency.snapshot(),
+        }
+
+    def on_notify(self, characteristic, sender, data):
+        """Synchronous callback shared by every characteristic: decode, validate, dispatch."""
+        t_arrival = time.perf_counter()
+        if characteristic.decoder == 'raw_samples':
+            try:
+                count = self.raw_samples.decode(data)
+            except ValueError as e:
+                self.log.log(logging.WARNING, 'raw_decode', "Error decoding raw samples: %s", e)
+                self.metrics.drop('raw_decode')
+                return
+            if self.recorder and count:
+                # Kept so detection can be re-tuned and re-run on the recording
+                self.recorder.record_raw(self.raw_samples.samples(count), self.device_address)
+            return
+        try:
+            event = characteristic.decode(data)
+        except struct.error as e:
+            self.log.log(logging.WARNING, ('decode', characteristic.name),
+                         "Error unpacking %s data: %s", characteristic.name, e)
+            self.metrics.drop('decode')
+            return
+        except ValueError as e:
+            self.log.log(logging.WARNING, ('invalid', characteristic.name),
+                         "Rejected %s notification: %s", characteristic.name, e)
+            self.metrics.drop('invalid')
+            return
+        self.log.log(logging.DEBUG, characteristic.name, "%s notification from %s: %s",
+                     characteristic.name, self.device_address, event)
+        value = characteristic.value(event)
+        if self.recorder and characteristic.record_kind is not None:
+            self.recorder.record(characteristic.record_kind, value, self.device_address)
+        self.raw_queue.put_nowait((characteristic.event, value, t_arrival, self.device_address))
+
+    async def disconnect(self):
+        """Disconnects from the BLE device."""
+        self.closing = True
+        self.lost.set()
+        if self.client:
+            await self.client.disconnect()
+            print(f"Disconnected from {self.device_name} ({self.device_address}).")
+
+
+def backoff_delay(attempt: int) -> float:
+    """Jittered exponential backoff; the first retry is immediate."""
+    if attempt == 0:
+        return 0.0
+    delay = min(RECONNECT_BACKOFF_BASE * 2 ** (attempt - 1), RECONNECT_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class GloveHub:
+    """Scans once and runs sessions with several gloves concurrently on one event loop."""
+
+    def __init__(self, device_name: str, raw_queue: asyncio.Queue,
+                 max_parallel_connects: int = MAX_PARALLEL_CONNECTS,
+                 recorder: SessionWriter = None, metrics: Metrics = NULL_METRICS,
+                 raw_stream: bool = False, protocol: Protocol = None):
+        self.device_name = device_name
+        self.raw_queue = raw_queue
+        self.protocol = protocol
+        self.max_parallel_connects = max_parallel_connects
+        self.recorder = recorder
+        self.metrics = metrics
+        self.raw_stream = raw_stream
+        self.managers = []
+
+    async def scan(self, min_gloves: int = 1, window: float = SCAN_WINDOW) -> list:
+        """Scans until min_gloves gloves are seen, or for window seconds, and returns their addresses.
+
+        If fewer gloves are found within the window, the scan stops as soon as
+        there is at least one, so missing gloves do not hold up the session.
+        """
+        found = {}
+        enough = asyncio.Event()
+        any_found = asyncio.Event()
+
+        def on_detection(device, adv):
+            if self.device_name in (device.name, adv.local_name) and device.address not in found:
+                print(f"Found device: {self.device_name} with address {device.address}")
+                found[device.address] = device
+                any_found.set()
+                if len(found) >= min_gloves:
+                    enough.set()
+
+        print("Scanning for BLE devices...")
+        async with bleak().BleakScanner(detection_callback=on_detection):
+            try:
+                await asyncio.wait_for(enough.wait(), window)
+            except asyncio.TimeoutError:
+                if not found:
+                    print(f"No {self.device_name} found yet; still scanning...")
+                await any_found.wait()
+                print(f"Found {len(found)} of {min_gloves} gloves; connecting to those.")
+        return list(found)
+
+    async def connect_all(self, addresses):
+        """Connects to every address, with at most max_parallel_connects in flight."""
+        semaphore = asyncio.Semaphore(self.max_parallel_connects)
+
+        async def connect_one(address):
+            manager = BLEManager(self.device_name, self.raw_queue, address, self.recorder,
+                                 self.metrics, self.raw_stream, self.protocol)
+            async with semaphore:
+                await manager.connect()
+            return manager
+
+        results = await asyncio.gather(*(connect_one(address) for address in addresses),
+                                       return_exceptions=True)
+        for address, result in zip(addresses, results):
+            if isinstance(result, Exception):
+                print(f"Failed to connect to {address}: {result}")
+            else:
+                self.managers.append(result)
+        for manager in self.managers:
+            manager.peers = self.managers
+        if not self.managers:
+            raise ConnectionError(f"No {self.device_name} could be connected.")
+
+    async def wait_finished(self):
+        """Keeps every glove connected until the operations task is cancelled."""
+        await asyncio.gather(*(manager.supervise() for manager in self.managers))
+
+    def connection_stats(self) -> dict:
+        return {manager.device_address: manager.connection_stats() for manager in self.managers}
+
+    async def disconnect_all(self):
+        await asyncio.gather(*(manager.disconnect() for manager in self.managers),
+                             return_exceptions=True)
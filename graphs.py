@@ -0,0 +1,297 @@
+"""Matplotlib graphs of the punch history, kept out of visualization.py so the
+window can appear before matplotlib is imported."""
+from abc import ABC, abstractmethod
+from collections import deque
+import time
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
+from matplotlib.lines import Line2D
+from matplotlib.patches import Rectangle
+from matplotlib.transforms import Bbox
+from display import FORCE_LEVELS, FRAME_BUDGET
+from lod import MIN_BUCKET_WIDTH
+from punch_store import PunchStore
+
+# Growth factor applied to an axis when new data leaves the current limits
+AXIS_HEADROOM = 1.25
+# Most recent punches always drawn individually; older ones are bucketed
+RAW_WINDOW = 256
+
+
+class BlitGraph(ABC):
+    """Retained-mode graph: artists are built once, appended to in place and
+    only the region covering the new data is blitted to the screen.
+
+    The x axis is the punch number and always spans the whole session. The
+    most recent punches (RAW_WINDOW to RAW_WINDOW + MIN_BUCKET_WIDTH of them)
+    are drawn one artist per punch from a PunchStore column; everything older
+    is folded into the store's summaries and drawn as at most MAX_BUCKETS
+    min/max/mean buckets, so render cost does not grow with session length.
+    """
+
+    def __init__(self, figure, ax, canvas, store: PunchStore, field: str,
+                 xlim=(-0.5, 10.5), ylim=(0.0, 1.0)):
+        self.figure = figure
+        self.ax = ax
+        self.canvas = canvas
+        self.store = store
+        self.field = field
+        # First punch number drawn raw; older punches are drawn as buckets
+        self.raw_start = 0
+        self.initial_xlim = xlim
+        self.initial_ylim = ylim
+        self.frame_times = deque(maxlen=240)
+        self.frames = 0
+        self.frames_over_budget = 0
+        self.full_redraws = 0
+        self.ax.set_xlim(*xlim)
+        self.ax.set_ylim(*ylim)
+        self.ax.set_autoscale_on(False)
+
+    @property
+    def values(self) -> np.ndarray:
+        """Zero-copy view of the retained values, oldest first."""
+        return self.store.window()[self.field]
+
+    @property
+    def lod(self):
+        """The store's min/max/mean buckets of this graph's field."""
+        return self.store.summaries[self.field]
+
+    def append(self, count: int):
+        """Renders the newest count punches of the store, touching only what changed."""
+        if count <= 0:
+            return
+        start = time.perf_counter()
+        first = self.store.total - count
+        # Folding in steps of MIN_BUCKET_WIDTH bounds the raw artists while
+        # keeping the full redraws it needs (a blit cannot erase raw artists)
+        # to one per MIN_BUCKET_WIDTH punches
+        fold_upto = self.store.total - RAW_WINDOW
+        if fold_upto - self.store.folded >= MIN_BUCKET_WIDTH:
+            self.store.fold(fold_upto)
+        # The other graph on the same store, or eviction, may have folded too
+        fold = self.store.folded != self.raw_start
+        if self.grow_limits(first) or fold:
+            self.raw_start = self.store.folded
+            self.update_buckets()
+            self.trim_artists(self.raw_start)
+            self.extend_artists(first)
+            self.redraw()
+        else:
+            self.extend_artists(first)
+            self.canvas.blit(self.draw_new(first))
+        self.record_frame(time.perf_counter() - start)
+
+    def reset(self):
+        """Drops all artists and restores the initial axis limits; the store is cleared first."""
+        self.raw_start = self.store.folded
+        self.clear_artists()
+        self.update_buckets()
+        self.ax.set_xlim(*self.initial_xlim)
+        self.ax.set_ylim(*self.initial_ylim)
+        self.redraw()
+
+    def redraw(self):
+        """Full redraw, used only when the limits or buckets change or on reset."""
+        self.full_redraws += 1
+        self.canvas.draw()
+
+    def grow_limits(self, first: int) -> bool:
+        """Grows the axes when new data leaves them. Returns True if changed."""
+        changed = False
+        x_max = self.store.total - 0.5
+        x_low, x_high = self.ax.get_xlim()
+        if x_max > x_high:
+            # Doubling keeps the number of full redraws logarithmic in history;
+            # a burst may need several doublings to fit in one frame
+            width = x_high - x_low
+            while x_low + width < x_max:
+                width *= 2
+            self.ax.set_xlim(x_low, x_low + width)
+            changed = True
+        y_max = float(np.max(self.store.since(first)[self.field]))
+        y_low, y_high = self.ax.get_ylim()
+        if y_max > y_high:
+            self.ax.set_ylim(y_low, y_max * AXIS_HEADROOM)
+            changed = True
+        return changed
+
+    def data_region(self, x0, x1, y0, y1, pad):
+        """Display-space bounding box of a data rectangle, padded and clipped to the axes."""
+        (dx0, dy0), (dx1, dy1) = self.ax.transData.transform([(x0, y0), (x1, y1)])
+        box = Bbox.from_extents(min(dx0, dx1) - pad, min(dy0, dy1) - pad,
+                                max(dx0, dx1) + pad, max(dy0, dy1) + pad)
+        return Bbox.intersection(box, self.ax.bbox)
+
+    def record_frame(self, elapsed):
+        self.frames += 1
+        self.frame_times.append(elapsed)
+        if elapsed > FRAME_BUDGET:
+            self.frames_over_budget += 1
+
+    def frame_stats(self) -> dict:
+        """Frame counts, and render times in milliseconds over the recent frames."""
+        times = self.frame_times or (0.0,)
+        return {
+            'frames': self.frames,
+            'last_ms': times[-1] * 1000,
+            'mean_ms': sum(times) / len(times) * 1000,
+            'max_ms': max(times) * 1000,
+            'over_budget': self.frames_over_budget,
+            'full_redraws': self.full_redraws,
+            'buckets': self.lod.closed,
+            'bucket_width': self.lod.width,
+        }
+
+    @abstractmethod
+    def extend_artists(self, first):
+        """Brings the raw artists up to date with punches raw_start.. of the store."""
+
+    @abstractmethod
+    def trim_artists(self, start):
+        """Releases raw artists for punches before start, which are now bucketed."""
+
+    @abstractmethod
+    def update_buckets(self):
+        """Rebuilds the bucket artists from self.lod; cost is bounded by MAX_BUCKETS."""
+
+    @abstractmethod
+    def draw_new(self, first):
+        """Draws punches first.. onto the current frame and returns the dirty region."""
+
+    @abstractmethod
+    def clear_artists(self):
+        """Removes every raw artist."""
+
+
+class SpeedGraph(BlitGraph):
+    """Line graph of speed per punch, with a min/max band and mean line for older punches."""
+
+    def __init__(self, figure, ax, canvas, store, color):
+        super().__init__(figure, ax, canvas, store, 'speed', ylim=(0.0, 5.0))
+        style = dict(color=color, linewidth=2, marker='o', linestyle='-')
+        # Holds the raw window and is drawn on full redraws
+        self.line = Line2D([], [], **style)
+        # Holds only the newest segment; drawn on top of the existing frame
+        self.tail = Line2D([], [], animated=True, **style)
+        # Bucket means, and the min/max range of each bucket as one polygon
+        self.mean_line = Line2D([], [], color=color, linewidth=1.5)
+        self.band = PolyCollection([], facecolors=color, alpha=0.3, linewidths=0)
+        self.ax.add_collection(self.band)
+        self.ax.add_line(self.mean_line)
+        self.ax.add_line(self.line)
+        self.ax.add_line(self.tail)
+        self.pad = (self.tail.get_markersize() + self.tail.get_linewidth()) * figure.dpi / 72
+
+    def extend_artists(self, first):
+        ys = self.store.since(self.raw_start)[self.field]
+        xs = np.arange(self.store.total - len(ys), self.store.total)
+        if self.raw_start:
+            # Start from the last bucket mean so the raw line joins the buckets
+            xs = np.append(self.mean_line.get_xdata()[-1:], xs)
+            ys = np.append(self.mean_line.get_ydata()[-1:], ys)
+        self.line.set_data(xs, ys)
+
+    def trim_artists(self, start):
+        # extend_artists always rebuilds the line from raw_start
+        pass
+
+    def update_buckets(self):
+        starts, widths, mins, maxs, means = self.lod.buckets()
+        centers = starts + (widths - 1) / 2
+        self.mean_line.set_data(centers, means)
+        if not len(centers):
+            self.band.set_verts([])
+            return
+        outline = np.concatenate((np.column_stack((centers, maxs)),
+                                  np.column_stack((centers[::-1], mins[::-1]))))
+        self.band.set_verts([outline])
+
+    def draw_new(self, first):
+        # Start at the previous point so the connecting segment is drawn too
+        start = max(first - 1, 0)
+        ys = self.store.since(start)[self.field]
+        xs = np.arange(self.store.total - len(ys), self.store.total)
+        self.tail.set_data(xs, ys)
+        self.ax.draw_artist(self.tail)
+        return self.data_region(xs[0], xs[-1], ys.min(), ys.max(), self.pad)
+
+    def clear_artists(self):
+        self.line.set_data([], [])
+        self.tail.set_data([], [])
+
+
+class ForceGraph(BlitGraph):
+    """Bar graph of force per punch, colored by intensity.
+
+    Older punches are drawn as one bar per bucket at the bucket mean, colored
+    by that mean, with a whisker spanning the bucket's min and max force.
+    """
+
+    def __init__(self, figure, ax, canvas, store, palette):
+        super().__init__(figure, ax, canvas, store, 'force', ylim=(0.0, 100.0))
+        # One color per FORCE_LEVELS band: low, medium, high
+        self.palette = np.array([to_rgba(color) for color in palette])
+        # Bars for punch numbers bars_start, bars_start + 1, ...
+        self.bars = deque()
+        self.bars_start = 0
+        self.bucket_bars = PolyCollection([], linewidths=0)
+        self.bucket_range = LineCollection([], colors=palette[-1], linewidths=1, alpha=0.6)
+        self.ax.add_collection(self.bucket_bars)
+        self.ax.add_collection(self.bucket_range)
+
+    def colors(self, forces) -> np.ndarray:
+        """RGBA rows for an array of forces, picked without a Python loop."""
+        return self.palette[force_levels(forces)]
+
+    def extend_artists(self, first):
+        if not self.bars:
+            self.bars_start = max(self.raw_start, self.store.total - len(self.store))
+        first_new = self.bars_start + len(self.bars)
+        forces = self.store.since(first_new)[self.field]
+        for x, force, color in zip(range(first_new, self.store.total), forces,
+                                   self.colors(forces)):
+            bar = Rectangle((x - 0.4, 0.0), 0.8, force, color=color)
+            self.ax.add_patch(bar)
+            self.bars.append(bar)
+
+    def trim_artists(self, start):
+        while self.bars and self.bars_start < start:
+            self.bars.popleft().remove()
+            self.bars_start += 1
+
+    def update_buckets(self):
+        starts, widths, mins, maxs, means = self.lod.buckets()
+        left = starts - 0.4
+        right = starts + widths - 0.6
+        zeros = np.zeros_like(means)
+        # (n, 4, 2) rectangle corners built in one go
+        verts = np.stack((np.column_stack((left, zeros)), np.column_stack((left, means)),
+                          np.column_stack((right, means)), np.column_stack((right, zeros))),
+                         axis=1)
+        self.bucket_bars.set_verts(verts)
+        self.bucket_bars.set_facecolor(self.colors(means))
+        centers = starts + (widths - 1) / 2
+        self.bucket_range.set_segments(
+            np.stack((np.column_stack((centers, mins)), np.column_stack((centers, maxs))),
+                     axis=1))
+
+    def draw_new(self, first):
+        # Indexing from the right end of a deque is cheap
+        for i in range(first - self.bars_start, len(self.bars)):
+            self.ax.draw_artist(self.bars[i])
+        forces = self.store.since(first)[self.field]
+        return self.data_region(first - 0.4, self.store.total - 0.6, 0.0, forces.max(), 1)
+
+    def clear_artists(self):
+        for bar in self.bars:
+            bar.remove()
+        self.bars.clear()
+        self.bars_start = 0
+
+
+def force_levels(forces) -> np.ndarray:
+    """Index into FORCE_LEVELS bands (0 low, 1 medium, 2 high) for each force."""
+    return np.digitize(forces, FORCE_LEVELS)
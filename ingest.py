@@ -0,0 +1,345 @@
+"""The ingest side of the app: per-glove stats, the DataProcessor and the BLE operations.
+
+run_ble_operations() connects the gloves (or a simulated source) and runs
+the DataProcessor until cancelled, publishing to whatever UI channel it is
+given. main.py runs it on a thread of the UI process, isolation.py in a
+separate ingest process.
+"""
+import argparse
+import asyncio
+import logging
+import time
+from analytics import SessionAnalytics
+from assignments import load_glove_assignments
+from gloves import GloveHub
+from metrics import NULL_METRICS, STAGE_PROCESS, STAGE_QUEUE, Metrics
+from pipeline import PipelineStats, UIChannel
+from protocol import load_protocol
+from punch_classifier import PunchTypeClassifier, load_model
+from session_log import SessionWriter
+from startup import STARTUP
+
+# Minimum interval between analytics snapshots published to the UI
+ANALYTICS_INTERVAL = 1.0
+
+
+class GloveStats:
+    """Per-glove punch statistics."""
+
+    def __init__(self, address: str, athlete: str = None, hand: str = "unknown"):
+        self.address = address
+        # Unassigned gloves are reported as their own athlete
+        self.athlete = athlete or address
+        self.hand = hand
+        self.punch_count = 0
+        self.previous_max_speed = 0.0
+        self.previous_max_force = 0.0
+        self.historical_max_speed = 0.0
+        self.historical_max_force = 0.0
+        # Speed of the current punch, waiting for its force notification
+        self.pending_speed = None
+        self.analytics = SessionAnalytics()
+        # Punch type -> count, from --classify
+        self.punch_types = {}
+
+    def update(self, key, value):
+        """Updates the stats; returns (speed, force) when a punch is complete."""
+        if key == 'previous_max_speed':
+            self.punch_count += 1
+            self.previous_max_speed = value
+            self.historical_max_speed = max(self.historical_max_speed, value)
+            punch = None
+            if self.pending_speed is not None:
+                # The force notification of the previous punch never arrived
+                punch = (self.pending_speed, 0.0)
+            self.pending_speed = value
+            return punch
+        elif key == 'previous_max_force':
+            self.previous_max_force = value
+            self.historical_max_force = max(self.historical_max_force, value)
+            speed = self.pending_speed if self.pending_speed is not None else 0.0
+            self.pending_speed = None
+            return (speed, value)
+        return None
+
+    def snapshot(self) -> dict:
+        return {
+            'athlete': self.athlete,
+            'hand': self.hand,
+            'punch_count': self.punch_count,
+            'previous_max_speed': self.previous_max_speed,
+            'previous_max_force': self.previous_max_force,
+            'historical_max_speed': self.historical_max_speed,
+            'historical_max_force': self.historical_max_force,
+            'analytics': self.analytics.snapshot(),
+            'punch_types': dict(self.punch_types),
+        }
+
+
+class DataProcessor:
+    def __init__(self, raw_queue: asyncio.Queue, ui_channel: UIChannel,
+                 command_queue: asyncio.Queue, stats: PipelineStats = None,
+                 assignments: dict = None, metrics: Metrics = NULL_METRICS):
+        self.raw_queue = raw_queue
+        self.ui_channel = ui_channel
+        self.command_queue = command_queue
+        self.stats = stats or PipelineStats()
+        self.assignments = assignments or {}
+        self.metrics = metrics
+        self.gloves = {}
+        self.punch_count = 0
+        self.previous_max_speed = 0.0
+        self.previous_max_force = 0.0
+        self.historical_max_speed = 0.0
+        self.historical_max_force = 0.0
+        # Session-wide aggregates; per-glove ones live in GloveStats
+        self.analytics = SessionAnalytics()
+        self.last_analytics = 0.0
+        # Send scheduled for the end of the interval when one was throttled
+        self.trailing_analytics = None
+
+    async def process_commands(self):
+        """Waits for commands sent from the UI thread."""
+        while True:
+            command, _ = await self.command_queue.get()
+            try:
+                if command == 'reset':
+                    print("Received reset command.")
+                    self.reset()
+            except Exception as e:
+                print(f"Error processing commands: {e}")
+
+    def reset(self):
+        """Resets internal state and sends reset message to UI."""
+        self.punch_count = 0
+        self.previous_max_speed = 0.0
+        self.previous_max_force = 0.0
+        self.historical_max_speed = 0.0
+        self.historical_max_force = 0.0
+        self.gloves.clear()
+        self.analytics.reset()
+
+        # Send reset message to UI
+        self.ui_channel.put(('reset', None))
+        print("Internal state has been reset.")
+
+    def glove(self, address: str) -> GloveStats:
+        stats = self.gloves.get(address)
+        if stats is None:
+            assignment = self.assignments.get(address, {})
+            stats = GloveStats(address, assignment.get('athlete'),
+                               assignment.get('hand', "unknown"))
+            self.gloves[address] = stats
+        return stats
+
+    def summary(self) -> dict:
+        """Per-glove stats plus the same stats grouped by athlete and hand."""
+        athletes = {}
+        for glove in self.gloves.values():
+            athlete = athletes.setdefault(glove.athlete, {
+                'punch_count': 0, 'historical_max_speed': 0.0,
+                'historical_max_force': 0.0, 'hands': {}})
+            athlete['punch_count'] += glove.punch_count
+            athlete['historical_max_speed'] = max(athlete['historical_max_speed'],
+                                                  glove.historical_max_speed)
+            athlete['historical_max_force'] = max(athlete['historical_max_force'],
+                                                  glove.historical_max_force)
+            athlete['hands'][glove.hand] = glove.snapshot()
+        return {
+            'gloves': {address: glove.snapshot() for address, glove in self.gloves.items()},
+            'athletes': athletes,
+            'session': self.analytics.snapshot(),
+        }
+
+    def report(self):
+        """Prints the per-athlete and per-hand summary of the session."""
+        summary = self.summary()
+        for athlete, stats in summary['athletes'].items():
+            print(f"{athlete}: {stats['punch_count']} punches, "
+                  f"max speed {stats['historical_max_speed']:.2f} m/s, "
+                  f"max force {stats['historical_max_force']:.2f} N")
+            for hand, glove in stats['hands'].items():
+                speed = glove['analytics']['speed']
+                types = ', '.join(f"{name} {count}" for name, count
+                                  in sorted(glove['punch_types'].items()))
+                print(f"  {hand}: {glove['punch_count']} punches, "
+                      f"speed mean {speed['mean']:.2f} / p90 {speed['p90']:.2f} m/s, "
+                      f"max force {glove['historical_max_force']:.2f} N"
+                      + (f", {types}" if types else ""))
+
+    def handle_sample(self, key, value, t_arrival, device=None):
+        """Updates state for one raw sample and publishes the result to the UI."""
+        glove = self.glove(device)
+        punch = glove.update(key, value)
+        if punch is not None:
+            # Firmware sends speed then force; the pair is one punch record
+            speed, force = punch
+            timestamp = time.time()
+            self.ui_channel.put(('punch', (timestamp, speed, force, device)), t_arrival)
+            glove.analytics.add(timestamp, speed, force)
+            self.analytics.add(timestamp, speed, force)
+            self.publish_analytics()
+        if key == 'previous_max_speed':
+            self.previous_max_speed = value
+            if self.previous_max_speed > self.historical_max_speed:
+                self.historical_max_speed = self.previous_max_speed
+            self.ui_channel.put(('previous_max_speed', self.previous_max_speed), t_arrival)
+            self.ui_channel.put(('historical_max_speed', self.historical_max_speed), t_arrival)
+
+        elif key == 'previous_max_force':
+            self.previous_max_force = value
+            if self.previous_max_force > self.historical_max_force:
+                self.historical_max_force = self.previous_max_force
+            self.ui_channel.put(('previous_max_force', self.previous_max_force), t_arrival)
+            self.ui_channel.put(('historical_max_force', self.historical_max_force), t_arrival)
+
+    def publish_analytics(self):
+        """Sends the analytics and summary snapshots at most once per ANALYTICS_INTERVAL.
+
+        A throttled send becomes one trailing send at the end of the interval,
+        so the UI always ends up with the latest state.
+        """
+        if self.trailing_analytics is not None:
+            return
+        wait = self.last_analytics + ANALYTICS_INTERVAL - time.perf_counter()
+        if wait > 0:
+            self.trailing_analytics = asyncio.get_running_loop().call_later(
+                wait, self.send_analytics)
+        else:
+            self.send_analytics()
+
+    def send_analytics(self):
+        self.trailing_analytics = None
+        self.last_analytics = time.perf_counter()
+        self.ui_channel.put(('analytics', self.analytics.snapshot()))
+        self.ui_channel.put(('summary', self.summary()))
+
+    def handle_punch_type(self, device, punch_type, confidence, punch=None):
+        """Counts and publishes one punch classified from the raw stream."""
+        glove = self.glove(device)
+        glove.punch_types[punch_type] = glove.punch_types.get(punch_type, 0) + 1
+        self.ui_channel.put(('punch_type', (time.time(), punch_type, confidence, device)))
+
+    async def process_data(self):
+        """Main loop: waits for raw samples from the BLE callbacks."""
+        try:
+            while True:
+                key, value, t_arrival, device = await self.raw_queue.get()
+                self.stats.events_in += 1
+                self.stats.max_raw_depth = max(self.stats.max_raw_depth, self.raw_queue.qsize() + 1)
+                t_dequeued = time.perf_counter()
+                self.stats.ingest.add(t_dequeued - t_arrival)
+                try:
+                    self.handle_sample(key, value, t_arrival, device)
+                except Exception as e:
+                    print(f"Error processing data: {e}")
+                    self.metrics.drop('process')
+                finally:
+                    self.raw_queue.task_done()
+                if self.metrics.enabled:
+                    self.metrics.observe(STAGE_QUEUE, t_dequeued - t_arrival)
+                    self.metrics.observe(STAGE_PROCESS, time.perf_counter() - t_dequeued)
+                    self.metrics.depth('raw', self.raw_queue.qsize())
+        except asyncio.CancelledError:
+            print("Data processing task was cancelled.")
+
+    async def run(self):
+        """Runs the data and command stages until cancelled."""
+        command_task = asyncio.create_task(self.process_commands())
+        try:
+            await self.process_data()
+        finally:
+            command_task.cancel()
+            if self.trailing_analytics is not None:
+                self.trailing_analytics.cancel()
+
+
+async def run_ble_operations(ui_channel: UIChannel, command_queue: asyncio.Queue,
+                             stats: PipelineStats, args: argparse.Namespace,
+                             recorder: SessionWriter = None, metrics: Metrics = NULL_METRICS):
+    """Connects to the gloves, and processes their data until cancelled."""
+    # Raw samples flow BLE callbacks -> raw_queue -> DataProcessor -> ui_channel
+    raw_queue = asyncio.Queue()
+    protocol = load_protocol(args.protocol)
+    if args.simulate or args.replay:
+        from simulator import SimulatedHub
+        if args.replay:
+            hub = SimulatedHub.replay(protocol.device_name, raw_queue, args.replay, args.rate,
+                                      recorder, metrics, protocol)
+        else:
+            hub = SimulatedHub.synthetic(protocol.device_name, raw_queue, args.simulate,
+                                         args.punches, args.punch_rate, args.rate,
+                                         recorder=recorder, metrics=metrics, protocol=protocol,
+                                         raw_stream=args.raw)
+    else:
+        hub = GloveHub(protocol.device_name, raw_queue, args.max_connects, recorder, metrics,
+                       args.raw, protocol)
+    data_processor = DataProcessor(raw_queue, ui_channel, command_queue, stats,
+                                   load_glove_assignments(args.assignments), metrics)
+    metrics_task = None
+    if metrics.enabled:
+        metrics_task = asyncio.create_task(metrics.write_periodically(args.metrics_file))
+
+    # Connect to all gloves found by a single scan
+    try:
+        STARTUP.mark('scan started')
+        await hub.connect_all(await hub.scan(args.gloves, args.scan_window))
+        STARTUP.mark('gloves connected')
+    except ConnectionError as e:
+        print(e)
+        if metrics_task:
+            metrics_task.cancel()
+        return
+
+    # Start processing data
+    data_task = asyncio.create_task(data_processor.run())
+    classifier = classifier_task = None
+
+    try:
+        if args.classify:
+            # Training the fallback model takes a moment; keep the loop free meanwhile
+            model = await asyncio.get_running_loop().run_in_executor(
+                None, load_model, args.classify, bool(args.simulate))
+            classifier = PunchTypeClassifier(model, data_processor.handle_punch_type,
+                                             args.classify_workers, metrics=metrics)
+            classifier_task = asyncio.create_task(classifier.run(hub.managers))
+        await hub.wait_finished()
+        if classifier:
+            # Classify the punches at the end of a simulation too
+            classifier.poll(hub.managers)
+            await classifier.drain()
+        # Let the processor drain what the source already sent
+        await raw_queue.join()
+        data_task.cancel()
+        await data_task
+    except asyncio.CancelledError:
+        print("BLE operations task was cancelled.")
+    except Exception as e:
+        print(f"An error occurred during BLE operations: {e}")
+    finally:
+        data_task.cancel()
+        if metrics_task:
+            metrics_task.cancel()
+        if classifier:
+            classifier_task.cancel()
+            classifier.close()
+            classifier.report()
+        await hub.disconnect_all()
+        data_processor.report()
+        for address, connection in hub.connection_stats().items():
+            print(f"{address}: {connection['reconnects']} reconnects, "
+                  f"{connection['disconnected_s']:.1f} s disconnected, "
+                  f"mean reconnect {connection['reconnect_latency']['mean_ms']:.0f} ms")
+
+
+def setup_logging(args: argparse.Namespace):
+    logging.basicConfig(format="%(message)s")
+    # Only this app's loggers follow --log-level, not asyncio's or bleak's
+    logging.getLogger('strike_stats').setLevel(args.log_level.upper())
+
+
+def create_recorder(args: argparse.Namespace):
+    """Session log writer for a live run, or None."""
+    # Replays are already on disk and simulations are not worth keeping
+    record = not (args.no_record or args.replay or args.simulate)
+    return SessionWriter(args.record_dir, raw=args.raw) if record else None
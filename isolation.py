@@ -0,0 +1,317 @@
+"""Runs BLE ingest and the DataProcessor in a separate process from the UI.
+
+The ingest process publishes the UI messages into a shared-memory byte ring
+that the UI process reads at its own pace, so neither a slow canvas.draw()
+nor a paused window can hold the GIL or the event loop of the process that
+services the BLE callbacks. The ring never blocks the writer: when it is
+full the overflow policy drops either the oldest unread messages or the
+new one, and both are counted in shared counters the UI reports as drops.
+
+    python main.py --isolate
+    python main.py --isolate --overflow drop-newest --ring-size 1048576
+"""
+import asyncio
+import multiprocessing
+import pickle
+import queue
+import struct
+import threading
+from collections import deque
+from multiprocessing import shared_memory
+from metrics import NULL_METRICS, Metrics
+from pipeline import PipelineStats, UIChannel
+
+# Bytes of message data the ring holds
+RING_SIZE = 4 * 1024 * 1024
+OVERFLOW_POLICIES = ('drop-oldest', 'drop-newest')
+# head, tail (bytes, only grow), messages written, messages removed (read or
+# discarded), messages dropped by the overflow policy, messages too large
+RING_HEADER = struct.Struct('<6Q')
+RING_HEADER_SIZE = 64
+LENGTH = struct.Struct('<I')
+# How long shutdown waits for the ingest process before terminating it
+STOP_TIMEOUT = 5.0
+# Interval at which the reader's wake thread rechecks whether it should stop
+WAKE_POLL = 0.5
+
+
+class SharedRing:
+    """Single-producer, single-consumer ring of length-prefixed messages in shared memory.
+
+    Only the writer moves head and only the reader moves tail, except that
+    the drop-oldest policy lets the writer advance tail; the lock serializes
+    that with the reader.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, lock, overflow: str = 'drop-oldest'):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow!r}")
+        self.shm = shm
+        self.lock = lock
+        self.overflow = overflow
+        self.buf = shm.buf
+        self.capacity = shm.size - RING_HEADER_SIZE
+
+    @classmethod
+    def create(cls, size: int, lock, overflow: str = 'drop-oldest'):
+        shm = shared_memory.SharedMemory(create=True, size=RING_HEADER_SIZE + size)
+        RING_HEADER.pack_into(shm.buf, 0, 0, 0, 0, 0, 0, 0)
+        return cls(shm, lock, overflow)
+
+    @classmethod
+    def attach(cls, name: str, lock, overflow: str = 'drop-oldest'):
+        return cls(shared_memory.SharedMemory(name=name), lock, overflow)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def counters(self) -> dict:
+        head, tail, written, removed, dropped, oversize = RING_HEADER.unpack_from(self.buf, 0)
+        return {'bytes_used': head - tail, 'written': written, 'pending': written - removed,
+                'dropped': dropped, 'oversize': oversize}
+
+    def _set(self, field: int, value: int):
+        struct.pack_into('<Q', self.buf, field * 8, value)
+
+    def _get(self, field: int) -> int:
+        return struct.unpack_from('<Q', self.buf, field * 8)[0]
+
+    def _copy_in(self, position: int, data: bytes):
+        start = position % self.capacity
+        first = min(len(data), self.capacity - start)
+        base = RING_HEADER_SIZE
+        self.buf[base + start:base + start + first] = data[:first]
+        if first < len(data):
+            self.buf[base:base + len(data) - first] = data[first:]
+
+    def _copy_out(self, position: int, length: int) -> bytes:
+        start = position % self.capacity
+        first = min(length, self.capacity - start)
+        base = RING_HEADER_SIZE
+        data = bytes(self.buf[base + start:base + start + first])
+        if first < length:
+            data += bytes(self.buf[base:base + length - first])
+        return data
+
+    def write(self, payload: bytes) -> bool:
+        """Appends one message; returns False if it was dropped. Never blocks on the reader."""
+        need = LENGTH.size + len(payload)
+        if need > self.capacity:
+            self._set(5, self._get(5) + 1)
+            return False
+        head = self._get(0)
+        if need > self.capacity - (head - self._get(1)):
+            if self.overflow == 'drop-newest':
+                self._set(4, self._get(4) + 1)
+                return False
+            with self.lock:
+                # Discard unread messages from the tail until the new one fits
+                tail = self._get(1)
+                dropped = 0
+                while need > self.capacity - (head - tail):
+                    length, = LENGTH.unpack(self._copy_out(tail, LENGTH.size))
+                    tail += LENGTH.size + length
+                    dropped += 1
+                self._set(1, tail)
+                self._set(3, self._get(3) + dropped)
+                self._set(4, self._get(4) + dropped)
+        self._copy_in(head, LENGTH.pack(len(payload)) + payload)
+        # Publishing head last makes the message visible only once complete
+        self._set(2, self._get(2) + 1)
+        self._set(0, head + need)
+        return True
+
+    def read_all(self) -> list:
+        """Removes and returns every complete message, oldest first."""
+        with self.lock:
+            head = self._get(0)
+            tail = self._get(1)
+            data = self._copy_out(tail, head - tail)
+            self._set(1, head)
+            messages = []
+            offset = 0
+            while offset < len(data):
+                length, = LENGTH.unpack_from(data, offset)
+                messages.append(data[offset + LENGTH.size:offset + LENGTH.size + length])
+                offset += LENGTH.size + length
+            self._set(3, self._get(3) + len(messages))
+        return messages
+
+    def close(self, unlink: bool = False):
+        self.buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class RingWriter:
+    """Ingest-side stand-in for the UIChannel: DataProcessor.put() lands in the ring."""
+
+    def __init__(self, ring: SharedRing, data_ready):
+        self.ring = ring
+        self.data_ready = data_ready
+
+    def put(self, item, t_origin=None):
+        self.ring.write(pickle.dumps((item, t_origin), protocol=pickle.HIGHEST_PROTOCOL))
+        if not self.data_ready.is_set():
+            self.data_ready.set()
+
+
+class RingReader(UIChannel):
+    """UI-side channel that pulls messages from the ring only when the UI asks for them.
+
+    Nothing is buffered beyond the batch being consumed, so a UI that stops
+    reading leaves the ring to fill up and apply its overflow policy.
+    """
+
+    def __init__(self, ring: SharedRing, data_ready, stats=None, metrics=NULL_METRICS):
+        super().__init__(stats, metrics)
+        self.ring = ring
+        self.data_ready = data_ready
+        self.batch = deque()
+        self.drops_reported = 0
+        self.stopping = False
+        self._wake_thread = threading.Thread(target=self._wake_loop, name="ring-wake",
+                                             daemon=True)
+        self._wake_thread.start()
+
+    def _wake_loop(self):
+        """Turns the writer's data_ready event into coalesced waker calls."""
+        while not self.stopping:
+            if not self.data_ready.wait(WAKE_POLL):
+                continue
+            self.data_ready.clear()
+            with self._lock:
+                if self._wake_pending or self.waker is None:
+                    continue
+                self._wake_pending = True
+            self.waker()
+
+    def put(self, item, t_origin=None):
+        raise TypeError("RingReader is read-only; the ingest process writes to the ring")
+
+    def get_with_origin_nowait(self):
+        with self._lock:
+            self._wake_pending = False
+        if not self.batch:
+            self.batch.extend(self.ring.read_all())
+            self.report_drops()
+            if not self.batch:
+                raise queue.Empty
+        item, t_origin = pickle.loads(self.batch.popleft())
+        self.observe(t_origin)
+        return item, t_origin
+
+    def report_drops(self):
+        counters = self.ring.counters()
+        dropped = counters['dropped'] + counters['oversize']
+        if dropped > self.drops_reported:
+            self.metrics.drop('ring_overflow', dropped - self.drops_reported)
+            self.drops_reported = dropped
+
+    def qsize(self) -> int:
+        counters = self.ring.counters()
+        return len(self.batch) + counters['pending']
+
+    def stop(self):
+        self.stopping = True
+        self._wake_thread.join()
+
+
+def forward_commands(commands, loop: asyncio.AbstractEventLoop, command_queue: asyncio.Queue):
+    """Moves commands from the UI process onto the ingest loop until None arrives."""
+    while True:
+        command = commands.get()
+        if command is None:
+            break
+        loop.call_soon_threadsafe(command_queue.put_nowait, command)
+
+
+async def run_ingest(args, ring: SharedRing, data_ready, commands, stop, stats, recorder, metrics):
+    from ingest import run_ble_operations
+    loop = asyncio.get_running_loop()
+    command_queue = asyncio.Queue()
+    threading.Thread(target=forward_commands, args=(commands, loop, command_queue),
+                     name="commands", daemon=True).start()
+    operations = asyncio.create_task(run_ble_operations(
+        RingWriter(ring, data_ready), command_queue, stats, args, recorder, metrics))
+    stopped = loop.run_in_executor(None, stop.wait)
+    await asyncio.wait((operations, stopped), return_when=asyncio.FIRST_COMPLETED)
+    # Releases the executor thread waiting on stop when the source finished first
+    stop.set()
+    if not operations.done():
+        operations.cancel()
+        await asyncio.gather(operations, return_exceptions=True)
+
+
+def ingest_main(args, ring_name, overflow, lock, data_ready, commands, stop):
+    """Entry point of the ingest process."""
+    from ingest import create_recorder, setup_logging
+    setup_logging(args)
+    ring = SharedRing.attach(ring_name, lock, overflow)
+    stats = PipelineStats()
+    metrics = Metrics() if args.metrics or args.overlay else NULL_METRICS
+    recorder = create_recorder(args)
+    try:
+        asyncio.run(run_ingest(args, ring, data_ready, commands, stop, stats, recorder, metrics))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # The command forwarder blocks on the queue; a sentinel lets it exit
+        commands.put(None)
+        if recorder:
+            recorder.close()
+            print(f"Recorded {recorder.records_written} notifications to {recorder.path}")
+            if recorder.raw_path:
+                print(f"Recorded {recorder.raw_samples_written} raw samples to {recorder.raw_path}")
+        print("Ingest process:", end=" ")
+        stats.report()
+        if metrics.enabled:
+            metrics.write(args.metrics_file)
+            print(f"Metrics written to {args.metrics_file}")
+        ring.close()
+        # Shared memory is unlinked by the UI process that created it
+        data_ready.set()
+
+
+class IngestProcess:
+    """UI-side handle of the ingest process: its ring reader, command queue and lifetime."""
+
+    def __init__(self, args, stats=None, metrics=NULL_METRICS, ring_size: int = RING_SIZE,
+                 overflow: str = 'drop-oldest'):
+        # Spawned, not forked: the UI process already runs threads
+        context = multiprocessing.get_context('spawn')
+        lock = context.Lock()
+        self.ring = SharedRing.create(ring_size, lock, overflow)
+        self.data_ready = context.Event()
+        self.stop_event = context.Event()
+        # UI -> ingest commands; Visualizer only needs put()
+        self.commands = context.Queue()
+        self.channel = RingReader(self.ring, self.data_ready, stats, metrics)
+        self.process = context.Process(
+            target=ingest_main, name="ingest",
+            args=(args, self.ring.name, overflow, lock, self.data_ready, self.commands,
+                  self.stop_event))
+
+    def start(self):
+        self.process.start()
+
+    def done(self) -> bool:
+        """True once the ingest process has exited, e.g. at the end of a simulation."""
+        return not self.process.is_alive()
+
+    def stop(self):
+        self.stop_event.set()
+        self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            print("Ingest process did not stop in time; terminating it.")
+            self.process.terminate()
+            self.process.join()
+        self.channel.stop()
+        self.channel.report_drops()
+        counters = self.ring.counters()
+        print(f"Ring: {counters['written']} messages written, "
+              f"{counters['dropped']} dropped ({self.ring.overflow}), "
+              f"{counters['oversize']} too large")
+        self.ring.close(unlink=True)
@@ -0,0 +1,86 @@
+import numpy as np
+
+# Older punches are shown as at most this many buckets
+MAX_BUCKETS = 256
+# Punches per bucket before any merging
+MIN_BUCKET_WIDTH = 16
+
+
+class LodBuckets:
+    """Incremental min/max/mean buckets over an append-only series.
+
+    Values are added in order and folded into fixed-width buckets. When all
+    MAX_BUCKETS slots are used, neighbouring buckets are merged pairwise and
+    the width doubles, so memory and render cost stay constant while the
+    buckets always cover the series from punch 0.
+    """
+
+    def __init__(self, max_buckets: int = MAX_BUCKETS, min_width: int = MIN_BUCKET_WIDTH):
+        if max_buckets % 2:
+            raise ValueError("max_buckets must be even")
+        self.max_buckets = max_buckets
+        self.min_width = min_width
+        self.mins = np.empty(max_buckets, dtype=np.float64)
+        self.maxs = np.empty(max_buckets, dtype=np.float64)
+        self.sums = np.empty(max_buckets, dtype=np.float64)
+        self.clear()
+
+    def clear(self):
+        self.width = self.min_width
+        self.closed = 0
+        # Index of the next value to be added
+        self.next_index = 0
+        self._reset_open()
+
+    def _reset_open(self):
+        self.open_count = 0
+        self.open_min = np.inf
+        self.open_max = -np.inf
+        self.open_sum = 0.0
+
+    def extend(self, values: np.ndarray):
+        """Adds values in O(len(values) / width) vectorized steps."""
+        i = 0
+        while i < len(values):
+            chunk = values[i:i + self.width - self.open_count]
+            self.open_min = min(self.open_min, float(chunk.min()))
+            self.open_max = max(self.open_max, float(chunk.max()))
+            self.open_sum += float(chunk.sum())
+            self.open_count += len(chunk)
+            i += len(chunk)
+            if self.open_count == self.width:
+                self._close()
+        self.next_index += len(values)
+
+    def _close(self):
+        self.mins[self.closed] = self.open_min
+        self.maxs[self.closed] = self.open_max
+        self.sums[self.closed] = self.open_sum
+        self.closed += 1
+        self._reset_open()
+        if self.closed == self.max_buckets:
+            half = self.max_buckets // 2
+            self.mins[:half] = np.minimum(self.mins[0::2], self.mins[1::2])
+            self.maxs[:half] = np.maximum(self.maxs[0::2], self.maxs[1::2])
+            self.sums[:half] = self.sums[0::2] + self.sums[1::2]
+            self.closed = half
+            self.width *= 2
+
+    def nbytes(self) -> int:
+        return self.mins.nbytes + self.maxs.nbytes + self.sums.nbytes
+
+    def buckets(self):
+        """(starts, widths, mins, maxs, means) of all buckets, the partial open one last.
+
+        starts and widths are in punch numbers.
+        """
+        n = self.closed
+        starts = np.arange(n + 1) * self.width
+        widths = np.full(n + 1, self.width)
+        mins = np.append(self.mins[:n], self.open_min)
+        maxs = np.append(self.maxs[:n], self.open_max)
+        means = np.append(self.sums[:n] / self.width, self.open_sum / max(self.open_count, 1))
+        if not self.open_count:
+            return starts[:n], widths[:n], mins[:n], maxs[:n], means[:n]
+        widths[n] = self.open_count
+        return starts, widths, mins, maxs, means
@@ -1,206 +1,152 @@
+from startup import STARTUP
+import argparse
 import asyncio
-import struct
+import os
 import threading
-import queue
-from bleak import BleakScanner, BleakClient
-from visualization import Visualizer
-
-# BLE device and characteristic UUIDs
-DEVICE_NAME = "Smart Boxing Gloves"
-IMU_SERVICE_UUID = "119"
-SPEED_CHARACTERISTIC_UUID = "77777777-7777-7777-7777-a77777777777"
-FORCE_CHARACTERISTIC_UUID = "77777777-7777-7777-7777-b77777777777"
-
-class BLEManager:
-    def __init__(self, device_name: str, update_queue: queue.Queue):
-        self.device_name = device_name
-        self.device_address = None
-        self.client = None
-        # Store the update_queue for use in callbacks
-        self.update_queue = update_queue
-
-    async def find_device_address(self) -> str:
-        """Scans for BLE devices and returns the address of the target device."""
-        while True:
-            print("Scanning for BLE devices...")
-            devices = await BleakScanner.discover()
-            for device in devices:
-                if device.name == self.device_name:
-                    print(f"Found device: {self.device_name} with address {device.address}")
-                    return device.address
-            await asyncio.sleep(5)
-
-    async def connect(self):
-        self.device_address = await self.find_device_address()
-        if self.device_address is None:
-            raise ConnectionError(f"Device {self.device_name} not found.")
-        self.client = BleakClient(self.device_address)
-        await self.client.connect()
-        if not self.client.is_connected:
-            raise ConnectionError(f"Failed to connect to {self.device_name}.")
-        print(f"Connected to {self.device_name}.")
-
-        # Register callbacks for notifications
-        self.client.set_disconnected_callback(self.on_disconnected)
-
-        await self.client.start_notify(SPEED_CHARACTERISTIC_UUID, self.on_speed_notify)
-        await self.client.start_notify(FORCE_CHARACTERISTIC_UUID, self.on_force_notify)
-        print("Started notifications for speed and force.")
-
-    def on_disconnected(self, client):
-        print(f"Device {self.device_name} disconnected.")
-
-    def on_speed_notify(self, sender, data):
-        """Synchronous callback for speed notifications."""
-        try:
-            # float32 ?
-            max_speed = struct.unpack('<f', data)[0]
-            print(f"Speed Notification: {max_speed} m/s")
-            self.update_queue.put(('previous_max_speed', max_speed))
-        except struct.error as e:
-            print(f"Error unpacking speed data: {e}")
-
-    def on_force_notify(self, sender, data):
-        """Synchronous callback for force notifications."""
-        try:
-            max_force = struct.unpack('<f', data)[0]
-            print(f"Force Notification: {max_force} N")
-            self.update_queue.put(('previous_max_force', max_force))
-        except struct.error as e:
-            print(f"Error unpacking force data: {e}")
-
-    async def disconnect(self):
-        """Disconnects from the BLE device."""
-        if self.client:
-            await self.client.disconnect()
-            print(f"Disconnected from {self.device_name}.")
-
-class DataProcessor:
-    def __init__(self, update_queue: queue.Queue, command_queue: queue.Queue):
-        self.update_queue = update_queue
-        self.command_queue = command_queue
-        self.punch_count = 0
-        self.previous_max_speed = 0.0
-        self.previous_max_force = 0.0
-        self.historical_max_speed = 0.0
-        self.historical_max_force = 0.0
-
-    async def process_commands(self):
-        """Processes incoming commands from the command queue."""
-        try:
-            while True:
-                command, _ = self.command_queue.get_nowait()
-                if command == 'reset':
-                    print("Received reset command.")
-                    self.reset()
-        except queue.Empty:
-            pass
-        except Exception as e:
-            print(f"Error processing commands: {e}")
-
-    def reset(self):
-        """Resets internal state and sends reset message to UI."""
-        self.punch_count = 0
-        self.previous_max_speed = 0.0
-        self.previous_max_force = 0.0
-        self.historical_max_speed = 0.0
-        self.historical_max_force = 0.0
-
-        # Send reset message to UI
-        self.update_queue.put(('reset', None))
-        print("Internal state has been reset.")
-
-    async def process_data(self):
-        """Main loop to process data from update_queue."""
-        try:
-            while True:
-                await self.process_commands()
-
-                try:
-                    # Non-blocking get from the queue
-                    data = self.update_queue.get_nowait()
-                    key, value = data
-
-                    if key == 'previous_max_speed':
-                        self.previous_max_speed = value
-                        if self.previous_max_speed > self.historical_max_speed:
-                            self.historical_max_speed = self.previous_max_speed
-                        self.update_queue.put(('previous_max_speed', self.previous_max_speed))
-                        self.update_queue.put(('historical_max_speed', self.historical_max_speed))
-                        # self.punch_count += 1
-                        # self.update_queue.put(('count', self.punch_count))
-
-                    elif key == 'previous_max_force':
-                        self.previous_max_force = value
-                        if self.previous_max_force > self.historical_max_force:
-                            self.historical_max_force = self.previous_max_force
-                        self.update_queue.put(('previous_max_force', self.previous_max_force))
-                        self.update_queue.put(('historical_max_force', self.historical_max_force))
-
-                except queue.Empty:
-                    pass
-                except Exception as e:
-                    print(f"Error processing data: {e}")
-
-                await asyncio.sleep(0.05)  # Adjust sleep time as needed
-        except asyncio.CancelledError:
-            print("Data processing task was cancelled.")
+from assignments import GLOVE_ASSIGNMENTS_FILE
+from dashboard import DASHBOARD_HOST, DASHBOARD_PORT, DashboardServer
+from gloves import MAX_PARALLEL_CONNECTS, SCAN_WINDOW
+from ingest import create_recorder, run_ble_operations, setup_logging
+from isolation import OVERFLOW_POLICIES, RING_SIZE, IngestProcess
+from metrics import METRICS_FILE, NULL_METRICS, Metrics
+from pipeline import HeadlessSink, LoopChannel, PipelineStats, UIChannel
+from protocol import load_protocol
+from punch_classifier import CLASSIFY_WORKERS, MODEL_FILE, missing_model_message
+from session_log import SESSION_DIR
+
+STARTUP.mark('main imports')
+
+# Device name, UUIDs and payload formats come from the protocol (see protocol.py)
+LOG_LEVELS = ('debug', 'info', 'warning', 'error')
 
 def start_asyncio_loop(loop):
     """Starts the asyncio event loop."""
     asyncio.set_event_loop(loop)
     loop.run_forever()
 
-async def run_ble_operations(update_queue: queue.Queue, command_queue: queue.Queue):
-    """Initializes BLEManager and DataProcessor, connects to BLE device, and starts processing data."""
-    # Initialize BLE Manager and Data Processor
-    ble_manager = BLEManager(DEVICE_NAME, update_queue)
-    data_processor = DataProcessor(update_queue, command_queue)
-
-    # Connect to BLE device
-    try:
-        await ble_manager.connect()
-    except ConnectionError as e:
-        print(e)
-        return
-
-    # Start processing data
-    data_task = asyncio.create_task(data_processor.process_data())
-
-    try:
-        await data_task
-    except asyncio.CancelledError:
-        print("BLE operations task was cancelled.")
-    except Exception as e:
-        print(f"An error occurred during BLE operations: {e}")
-    finally:
-        await ble_manager.disconnect()
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Smart Boxing Gloves visualization")
+    parser.add_argument('--gloves', type=int, default=1,
+                        help="number of gloves to wait for before connecting")
+    parser.add_argument('--scan-window', type=float, default=SCAN_WINDOW,
+                        help="seconds to wait for --gloves gloves before connecting to "
+                             "those found")
+    parser.add_argument('--max-connects', type=int, default=MAX_PARALLEL_CONNECTS,
+                        help="maximum number of gloves connecting at the same time")
+    parser.add_argument('--assignments', default=GLOVE_ASSIGNMENTS_FILE,
+                        help="JSON file mapping glove addresses to athlete and hand")
+    parser.add_argument('--protocol', metavar='FILE',
+                        help="JSON protocol description for other firmware (see protocol.py)")
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default='info',
+                        help="'debug' logs decoded notifications, at most one a second each")
+    parser.add_argument('--raw', action='store_true',
+                        help="subscribe to the high-rate raw IMU/FSR sample stream")
+    parser.add_argument('--classify', nargs='?', const=MODEL_FILE, metavar='MODEL',
+                        help="classify punch types from the raw stream (needs --raw; "
+                             f"default model {MODEL_FILE})")
+    parser.add_argument('--classify-workers', type=int, default=CLASSIFY_WORKERS,
+                        help="threads used for punch detection and classification")
+    parser.add_argument('--record-dir', default=SESSION_DIR,
+                        help="directory for recorded session logs")
+    parser.add_argument('--no-record', action='store_true',
+                        help="do not record notifications to a session log")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--simulate', type=int, metavar='GLOVES', default=0,
+                        help="stream synthetic punches from this many simulated gloves")
+    source.add_argument('--replay', metavar='DIR',
+                        help="replay the session logs recorded in DIR")
+    parser.add_argument('--punches', type=int, default=100,
+                        help="punches per simulated glove")
+    parser.add_argument('--punch-rate', type=float, default=1.0,
+                        help="mean punches per second per simulated glove")
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help="playback speed: 1 is real time, 10 is 10x, 0 is as fast as possible")
+    parser.add_argument('--headless', action='store_true',
+                        help="run without the Tk window and report throughput at the end")
+    parser.add_argument('--serve', type=int, nargs='?', const=DASHBOARD_PORT, metavar='PORT',
+                        help="serve a browser dashboard instead of the Tk window "
+                             f"(default port {DASHBOARD_PORT})")
+    parser.add_argument('--host', default=DASHBOARD_HOST,
+                        help="interface the dashboard listens on; 0.0.0.0 for other devices")
+    parser.add_argument('--isolate', action='store_true',
+                        help="run BLE ingest and processing in a separate process from the UI")
+    parser.add_argument('--overflow', choices=OVERFLOW_POLICIES, default='drop-oldest',
+                        help="what --isolate does when the UI falls behind and the ring is full")
+    parser.add_argument('--ring-size', type=int, default=RING_SIZE,
+                        help="bytes of shared memory between the processes with --isolate")
+    parser.add_argument('--metrics', action='store_true',
+                        help="collect per-stage latency metrics and write them to --metrics-file")
+    parser.add_argument('--metrics-file', default=METRICS_FILE,
+                        help="file the live metrics are written to every second")
+    parser.add_argument('--overlay', action='store_true',
+                        help="show live metrics in the window (implies --metrics)")
+    parser.add_argument('--startup-report', metavar='FILE',
+                        help="write startup phase timings as JSON to FILE")
+    args = parser.parse_args(argv)
+    if args.isolate and args.serve is not None:
+        # The dashboard is fed on the ingest loop, so it already never blocks ingest
+        parser.error("--isolate cannot be combined with --serve")
+    if args.classify and not args.raw:
+        parser.error("--classify needs the raw sample stream; add --raw")
+    if args.classify and not args.simulate and not os.path.exists(args.classify):
+        # A model trained on synthetic punches would mislabel real gloves
+        parser.error(missing_model_message(args.classify))
+    if args.protocol:
+        # Fail before connecting rather than on the asyncio thread
+        try:
+            load_protocol(args.protocol)
+        except (OSError, ValueError) as e:
+            parser.error(f"invalid protocol file: {e}")
+    return args
 
 def main():
-    # Create thread-safe queues for communication
-    update_queue = queue.Queue()
-    command_queue = queue.Queue()
-
-    # Initialize the Visualizer (Tkinter runs in the main thread)
-    visualizer = Visualizer(update_queue, command_queue)
+    args = parse_args()
+    setup_logging(args)
+
+    # Channels between the asyncio thread and the Tk thread
+    stats = PipelineStats()
+    metrics = Metrics() if args.metrics or args.overlay else NULL_METRICS
+    if args.isolate:
+        # BLE ingest, processing and recording move to a child process; this
+        # one only renders what it reads from the shared-memory ring
+        ingest = IngestProcess(args, stats, metrics, args.ring_size, args.overflow)
+        ingest.start()
+        try:
+            run_ui(args, ingest.channel, ingest.commands, ingest, metrics)
+        finally:
+            ingest.stop()
+            finish(args, None, stats, metrics, ui_only=True)
+        return
 
     # Create a new asyncio event loop
     loop = asyncio.new_event_loop()
+    ui_channel = UIChannel(stats, metrics)
+    command_queue = asyncio.Queue()
+    recorder = create_recorder(args)
+    if args.serve is not None:
+        # The dashboard lives on the asyncio loop and replaces the UI channel
+        ui_channel = DashboardServer(command_queue, args.host, args.serve, stats, metrics)
 
     # Start the asyncio loop in a separate thread
     asyncio_thread = threading.Thread(target=start_asyncio_loop, args=(loop,), daemon=True)
     asyncio_thread.start()
 
-    # Schedule the BLE operations coroutine
+    # Schedule the BLE operations coroutine before building the window, so
+    # scanning runs while tkinter and matplotlib load
     ble_operations_future = asyncio.run_coroutine_threadsafe(
-        run_ble_operations(update_queue, command_queue), loop
+        run_ble_operations(ui_channel, command_queue, stats, args, recorder, metrics), loop
     )
 
-    # Start the Tkinter main loop
     try:
-        visualizer.start()
-    except KeyboardInterrupt:
-        print("Program interrupted by user.")
+        if args.serve is not None:
+            try:
+                ui_channel.run(loop, ble_operations_future)
+            except KeyboardInterrupt:
+                print("Program interrupted by user.")
+            ui_channel.report()
+        else:
+            run_ui(args, ui_channel, LoopChannel(loop, command_queue), ble_operations_future,
+                   metrics)
     finally:
         # Cancel the BLE operations task
         ble_operations_future.cancel()
@@ -208,6 +154,48 @@ def main():
         # Stop the asyncio loop
         loop.call_soon_threadsafe(loop.stop)
         asyncio_thread.join()
+        finish(args, recorder, stats, metrics)
+
+def run_ui(args, ui_channel, commands, producer, metrics):
+    """Runs the Tk window, or drains ui_channel without one, until the user or producer stops."""
+    try:
+        if args.headless:
+            sink = HeadlessSink(ui_channel)
+            ui_channel.set_waker(sink.wake)
+            sink.run(producer)
+            sink.report()
+        else:
+            # Initialize the Visualizer (Tkinter runs in the main thread)
+            Visualizer = STARTUP.import_module('visualization').Visualizer
+            with STARTUP.phase('create window'):
+                visualizer = Visualizer(ui_channel, commands, metrics, args.overlay)
+            ui_channel.set_waker(visualizer.wake)
+            visualizer.start()
+            visualizer.report()
+    except KeyboardInterrupt:
+        print("Program interrupted by user.")
+
+def finish(args, recorder, stats, metrics, ui_only=False):
+    """Closes the recording and prints the end-of-run reports."""
+    if recorder:
+        recorder.close()
+        print(f"Recorded {recorder.records_written} notifications to {recorder.path}")
+        if recorder.raw_path:
+            print(f"Recorded {recorder.raw_samples_written} raw samples to {recorder.raw_path}")
+    if ui_only:
+        print("UI process:", end=" ")
+    stats.report()
+    if metrics.enabled:
+        # The ingest process writes args.metrics_file; the UI side gets its own file
+        path = args.metrics_file
+        if ui_only:
+            base, extension = os.path.splitext(path)
+            path = f"{base}.ui{extension}"
+        metrics.write(path)
+        print(f"Metrics written to {path}")
+    STARTUP.report()
+    if args.startup_report:
+        STARTUP.write(args.startup_report)
 
 if __name__ == "__main__":
     main()
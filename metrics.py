@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import time
+
+# Histogram buckets are powers of two in microseconds: [0, 1), [1, 2), [2, 4) ...
+HISTOGRAM_BUCKETS = 32
+# Default file the live metrics are written to
+METRICS_FILE = "metrics.json"
+METRICS_INTERVAL = 1.0
+
+# Latency stages, all measured from the BLE callback timestamp except 'process'
+STAGE_QUEUE = 'queue_wait'     # BLE callback -> DataProcessor dequeue
+STAGE_PROCESS = 'process'      # DataProcessor handling time
+STAGE_UI = 'to_ui'             # BLE callback -> Tk thread dequeue
+STAGE_SCREEN = 'to_screen'     # BLE callback -> end of the frame that shows it
+STAGE_CLASSIFY = 'classify'    # raw samples taken -> punch type known (with --classify)
+STAGES = (STAGE_QUEUE, STAGE_PROCESS, STAGE_UI, STAGE_SCREEN, STAGE_CLASSIFY)
+
+
+class LatencyHistogram:
+    """Log2-bucketed latency histogram with O(1) inserts and fixed memory."""
+
+    def __init__(self):
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        bucket = int(seconds * 1e6).bit_length()
+        self.counts[min(bucket, HISTOGRAM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q) -> float:
+        """Upper edge of the bucket holding the q-th percentile, in seconds."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.percentile(50) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+class Metrics:
+    """Per-stage latency histograms, queue depths and drop counters."""
+
+    enabled = True
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages = {stage: LatencyHistogram() for stage in STAGES}
+        self.depths = {}
+        self.max_depths = {}
+        self.dropped = {}
+        # Frame rate and graph frame times, published by the Tk thread
+        self.render = {}
+
+    def observe(self, stage, seconds):
+        self.stages[stage].add(seconds)
+
+    def depth(self, name, depth):
+        self.depths[name] = depth
+        if depth > self.max_depths.get(name, 0):
+            self.max_depths[name] = depth
+
+    def drop(self, reason, count=1):
+        self.dropped[reason] = self.dropped.get(reason, 0) + count
+
+    def set_render(self, render: dict):
+        self.render = render
+
+    def snapshot(self) -> dict:
+        return {
+            'uptime_s': time.time() - self.started,
+            'stages': {stage: histogram.snapshot() for stage, histogram in self.stages.items()},
+            'queue_depth': dict(self.depths),
+            'max_queue_depth': dict(self.max_depths),
+            'dropped': dict(self.dropped),
+            'render': self.render,
+        }
+
+    def overlay_text(self) -> str:
+        """One-line summary for the on-screen overlay."""
+        screen = self.stages[STAGE_SCREEN]
+        queue_wait = self.stages[STAGE_QUEUE]
+        depth = ' '.join(f"{name}={value}" for name, value in self.depths.items())
+        return (f"screen p50 {screen.percentile(50) * 1000:.1f} ms "
+                f"p99 {screen.percentile(99) * 1000:.1f} ms | "
+                f"queue p99 {queue_wait.percentile(99) * 1000:.1f} ms | "
+                f"depth {depth or '-'} | dropped {sum(self.dropped.values())}")
+
+    def write(self, path: str):
+        """Atomically replaces path with the current snapshot."""
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
+
+    async def write_periodically(self, path: str = METRICS_FILE, interval: float = METRICS_INTERVAL):
+        """Keeps path up to date until cancelled; the file I/O runs off the loop."""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.write, path)
+
+
+class NullMetrics:
+    """Disabled metrics. Hot paths check `enabled` before taking timestamps."""
+
+    enabled = False
+
+    def observe(self, stage, seconds):
+        pass
+
+    def depth(self, name, depth):
+        pass
+
+    def drop(self, reason, count=1):
+        pass
+
+    def set_render(self, render: dict):
+        pass
+
+    def snapshot(self) -> dict:
+        return {}
+
+    def overlay_text(self) -> str:
+        return ""
+
+
+NULL_METRICS = NullMetrics()
@@ -0,0 +1,160 @@
+import asyncio
+import queue
+import threading
+import time
+from metrics import NULL_METRICS, STAGE_UI
+
+
+class LatencyStats:
+    """Running count/mean/max of a latency in seconds."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def snapshot(self) -> dict:
+        mean = self.total / self.count if self.count else 0.0
+        return {'count': self.count, 'mean_ms': mean * 1000, 'max_ms': self.max * 1000}
+
+
+class PipelineStats:
+    """End-to-end counters for the BLE -> DataProcessor -> UI pipeline."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.events_in = 0
+        self.max_raw_depth = 0
+        # BLE callback -> DataProcessor
+        self.ingest = LatencyStats()
+        # BLE callback -> UI thread
+        self.end_to_end = LatencyStats()
+
+    def snapshot(self) -> dict:
+        wall = time.perf_counter() - self.started
+        cpu = time.process_time() - self.cpu_started
+        return {
+            'events_in': self.events_in,
+            'events_per_sec': self.events_in / wall if wall else 0.0,
+            'max_raw_depth': self.max_raw_depth,
+            'cpu_percent': 100 * cpu / wall if wall else 0.0,
+            'ingest': self.ingest.snapshot(),
+            'end_to_end': self.end_to_end.snapshot(),
+        }
+
+    def report(self):
+        snap = self.snapshot()
+        print(f"Pipeline: {snap['events_in']} events "
+              f"({snap['events_per_sec']:.1f}/s, CPU {snap['cpu_percent']:.1f}%), "
+              f"ingest mean {snap['ingest']['mean_ms']:.2f} ms, "
+              f"end-to-end mean {snap['end_to_end']['mean_ms']:.2f} ms "
+              f"/ max {snap['end_to_end']['max_ms']:.2f} ms")
+
+
+class LoopChannel:
+    """Thread-safe producer side of an asyncio.Queue owned by another thread's loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, target: asyncio.Queue):
+        self.loop = loop
+        self.target = target
+
+    def put(self, item):
+        self.loop.call_soon_threadsafe(self.target.put_nowait, item)
+
+
+class UIChannel:
+    """Output channel from the asyncio thread to the Tk thread.
+
+    Producers call put(); the first put after the consumer has drained the
+    channel invokes the waker, so the UI is woken once per burst instead of
+    polling on a timer.
+    """
+
+    def __init__(self, stats: PipelineStats = None, metrics=NULL_METRICS):
+        self.queue = queue.Queue()
+        self.stats = stats
+        self.metrics = metrics
+        self.waker = None
+        self._lock = threading.Lock()
+        self._wake_pending = False
+
+    def set_waker(self, waker):
+        self.waker = waker
+
+    def put(self, item, t_origin=None):
+        self.queue.put((item, t_origin))
+        with self._lock:
+            if self._wake_pending or self.waker is None:
+                return
+            self._wake_pending = True
+        self.waker()
+
+    def get_nowait(self):
+        return self.get_with_origin_nowait()[0]
+
+    def get_with_origin_nowait(self):
+        """Returns (item, t_origin), where t_origin is the BLE arrival time if known."""
+        with self._lock:
+            # Anything put from now on needs a fresh wake-up
+            self._wake_pending = False
+        item, t_origin = self.queue.get_nowait()
+        self.observe(t_origin)
+        return item, t_origin
+
+    def observe(self, t_origin):
+        """Records the BLE -> consumer latency of one dequeued message."""
+        if t_origin is not None:
+            if self.stats is not None:
+                self.stats.end_to_end.add(time.perf_counter() - t_origin)
+            if self.metrics.enabled:
+                self.metrics.observe(STAGE_UI, time.perf_counter() - t_origin)
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+
+class HeadlessSink:
+    """Consumes the UI channel without a window, for simulations and load tests."""
+
+    def __init__(self, ui_channel: UIChannel):
+        self.ui_channel = ui_channel
+        self.punches = 0
+        self.messages = 0
+        self.started = None
+        self.finished = None
+        self._wakeup = threading.Event()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def drain(self):
+        try:
+            while True:
+                key, _ = self.ui_channel.get_nowait()
+                self.messages += 1
+                if key == 'punch':
+                    self.punches += 1
+        except queue.Empty:
+            pass
+
+    def run(self, future):
+        """Drains the channel until the producer future completes."""
+        self.started = time.perf_counter()
+        while not future.done():
+            self._wakeup.wait(0.1)
+            self._wakeup.clear()
+            self.drain()
+        self.drain()
+        self.finished = time.perf_counter()
+
+    def report(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        rate = self.punches / elapsed if elapsed else 0.0
+        print(f"Headless: {self.punches} punches in {elapsed:.2f} s ({rate:.1f} punches/s)")
@@ -0,0 +1,184 @@
+"""Declarative description of the gloves' BLE protocol.
+
+Every characteristic is declared once: its UUID, the struct format of its
+payload, the named fields it carries with their valid ranges, and what the
+decoded event feeds (a DataProcessor key, a session log kind). BLEManager
+subscribes to all of them through one callback that unpacks with a
+precompiled struct.Struct, validates and dispatches, so a new
+characteristic or a firmware variant with other UUIDs, names or formats is
+a protocol file rather than new code:
+
+    python main.py --protocol gloves_v2.json
+
+A protocol file is JSON shaped like DEFAULT_PROTOCOL. Fields are unpacked
+in order and must be numbers (no 's', 'p' or 'c' codes); "min" and "max"
+are inclusive and non-finite floats are always rejected. A characteristic
+with "decoder": "raw_samples" is handed to the raw IMU/FSR buffer instead
+and only subscribed with --raw. "optional" characteristics may be missing
+from the firmware. Only characteristics with exactly one field can be
+"record"ed in the session log.
+"""
+import json
+import logging
+import math
+import re
+import struct
+import time
+from collections import namedtuple
+from session_log import KIND_FORCE, KIND_SPEED
+
+DEFAULT_PROTOCOL = {
+    'device_name': "Smart Boxing Gloves",
+    'characteristics': [
+        {'name': 'speed', 'uuid': "77777777-7777-7777-7777-a77777777777", 'format': '<f',
+         'fields': [{'name': 'speed', 'unit': 'm/s', 'min': 0.0, 'max': 100.0}],
+         'event': 'previous_max_speed', 'record': 'speed'},
+        {'name': 'force', 'uuid': "77777777-7777-7777-7777-b77777777777", 'format': '<f',
+         'fields': [{'name': 'force', 'unit': 'N', 'min': 0.0, 'max': 20000.0}],
+         'event': 'previous_max_force', 'record': 'force'},
+        {'name': 'raw', 'uuid': "77777777-7777-7777-7777-c77777777777",
+         'decoder': 'raw_samples', 'optional': True},
+    ],
+}
+DECODERS = ('struct', 'raw_samples')
+# struct codes that unpack to numbers the range check can compare; 'x' is padding
+NUMERIC_CODES = set('bBhHiIlLqQnNefd?x')
+# Session log kinds a characteristic's value can be recorded as
+RECORD_KINDS = {'speed': KIND_SPEED, 'force': KIND_FORCE}
+# Per-notification log lines get through at most once per interval per key
+LOG_INTERVAL = 1.0
+
+log = logging.getLogger('strike_stats.protocol')
+
+
+class Field:
+    def __init__(self, name: str, unit: str = "", minimum: float = None, maximum: float = None):
+        self.name = name
+        self.unit = unit
+        self.minimum = -math.inf if minimum is None else minimum
+        self.maximum = math.inf if maximum is None else maximum
+
+
+class Characteristic:
+    """One notifying characteristic: how to decode it and where its events go."""
+
+    def __init__(self, name: str, uuid: str, format: str = None, fields=(), event: str = None,
+                 record: str = None, decoder: str = 'struct', optional: bool = False):
+        if decoder not in DECODERS:
+            raise ValueError(f"{name}: unknown decoder {decoder!r}")
+        if record is not None and record not in RECORD_KINDS:
+            raise ValueError(f"{name}: cannot record as {record!r}")
+        if record is not None and (decoder != 'struct' or len(fields) != 1):
+            # Session log records hold one float each
+            raise ValueError(f"{name}: only a single-field characteristic can be recorded")
+        self.name = name
+        self.uuid = uuid.lower()
+        self.decoder = decoder
+        self.optional = optional
+        # DataProcessor key the value is delivered under
+        self.event = event or name
+        self.record_kind = RECORD_KINDS[record] if record else None
+        self.fields = list(fields)
+        self.struct = None
+        if decoder == 'struct':
+            if format is None:
+                raise ValueError(f"{name}: a struct characteristic needs a format")
+            try:
+                self.struct = struct.Struct(format)
+            except struct.error as e:
+                raise ValueError(f"{name}: bad format {format!r}: {e}")
+            codes = set(re.sub(r'[\d\s@=<>!]', '', format))
+            if not codes <= NUMERIC_CODES:
+                raise ValueError(f"{name}: format {format!r} has non-numeric codes "
+                                 f"{''.join(sorted(codes - NUMERIC_CODES))!r}")
+            count = len(self.struct.unpack(bytes(self.struct.size)))
+            if count != len(self.fields):
+                raise ValueError(f"{name}: format {format!r} has {count} values "
+                                 f"but {len(self.fields)} fields are declared")
+            self.event_type = namedtuple(f"{name.title().replace('_', '')}Event",
+                                         [field.name for field in self.fields])
+
+    @classmethod
+    def from_dict(cls, spec: dict):
+        fields = [Field(field['name'], field.get('unit', ""), field.get('min'), field.get('max'))
+                  for field in spec.get('fields', ())]
+        return cls(spec['name'], spec['uuid'], spec.get('format'), fields, spec.get('event'),
+                   spec.get('record'), spec.get('decoder', 'struct'), spec.get('optional', False))
+
+    def decode(self, data):
+        """Unpacks and validates one payload into a typed event.
+
+        Raises struct.error for a payload of the wrong size and ValueError
+        for a value outside its field's range.
+        """
+        values = self.struct.unpack(data)
+        for value, field in zip(values, self.fields):
+            if not (field.minimum <= value <= field.maximum and math.isfinite(value)):
+                raise ValueError(f"{self.name}.{field.name} = {value} is outside "
+                                 f"[{field.minimum}, {field.maximum}]")
+        return self.event_type._make(values)
+
+    def value(self, event):
+        """What is queued for the DataProcessor: the value itself for single-field events."""
+        return event[0] if len(event) == 1 else event
+
+
+class Protocol:
+    """A firmware's advertised name and characteristics, indexed by UUID."""
+
+    def __init__(self, device_name: str, characteristics):
+        self.device_name = device_name
+        self.characteristics = list(characteristics)
+        self.by_uuid = {}
+        for characteristic in self.characteristics:
+            if characteristic.uuid in self.by_uuid:
+                raise ValueError(f"Characteristic {characteristic.uuid} declared twice")
+            self.by_uuid[characteristic.uuid] = characteristic
+        self.by_record = {c.record_kind: c for c in self.characteristics
+                          if c.record_kind is not None}
+
+    @classmethod
+    def from_dict(cls, spec: dict):
+        return cls(spec['device_name'],
+                   [Characteristic.from_dict(c) for c in spec['characteristics']])
+
+
+def load_protocol(path: str = None) -> Protocol:
+    """The protocol described by a JSON file, or the stock firmware's if path is None."""
+    if path is None:
+        return Protocol.from_dict(DEFAULT_PROTOCOL)
+    with open(path) as f:
+        spec = json.load(f)
+    try:
+        return Protocol.from_dict(spec)
+    except KeyError as e:
+        raise ValueError(f"{path}: missing {e}")
+
+
+class RateLimitedLog:
+    """Leveled logging that lets at most one line per key through per interval.
+
+    Suppressed lines are counted and the count is appended to the next line
+    for the same key, so a flood of identical warnings costs one line a second.
+    """
+
+    def __init__(self, logger: logging.Logger = log, interval: float = LOG_INTERVAL):
+        self.logger = logger
+        self.interval = interval
+        self.last = {}
+        self.suppressed = {}
+
+    def log(self, level: int, key, message: str, *args):
+        # Cheap enough for the notification hot path when the level is off
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        if now - self.last.get(key, -math.inf) < self.interval:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return
+        self.last[key] = now
+        skipped = self.suppressed.pop(key, 0)
+        if skipped:
+            message += " (%d similar suppressed)"
+            args += (skipped,)
+        self.logger.log(level, message, *args)
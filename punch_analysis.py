@@ -0,0 +1,308 @@
+"""Host-side punch segmentation and speed/force extraction over raw samples.
+
+Segmentation follows the firmware: acceleration is cleansed and scaled the
+same way, a punch is a run of samples whose magnitude exceeds
+MOTION_ACCEL_THRESHOLD, and runs closer than MOTION_SUSTAIN are one punch.
+Speed is integrated from the signed, gravity-removed acceleration over the
+punch plus the MOTION_SUSTAIN of stillness after it, with a linear drift
+correction that brings velocity back to zero at both ends, instead of the
+firmware's per-sample Euler sum of cleansed values. Everything is
+vectorized over the whole input.
+
+Sessions recorded with --raw keep their raw samples, so detection can be
+re-tuned and re-run over them and compared with what the firmware reported:
+
+    python punch_analysis.py sessions --threshold 6 --sustain 0.4 -o punches.csv
+    python punch_analysis.py sessions --session session-20240506-180000.sslog \
+        --glove AA:BB:CC:DD:EE:FF --save-samples glove.npz
+"""
+import argparse
+import csv
+import os
+import sys
+import numpy as np
+from raw_stream import ACCEL_SCALE, fsr_force
+from session_log import KIND_SPEED, SESSION_DIR, SessionReader, load_devices
+
+# Defaults mirror strike_stats_arduino.ino
+MOTION_ACCEL_THRESHOLD = 8.0
+FORCE_CLEANSE_THRESHOLD = 5.0
+ACCEL_CLEANSE_THRESHOLD = 0.9
+MOTION_SUSTAIN = 0.5  # seconds
+ACCEL_GAINS = (5.0, 0.8, 0.3)
+G_VALUE = 9.80665
+
+PUNCH_RESULT_DTYPE = np.dtype([
+    ('start', 'f8'),        # time of the first motion sample (s)
+    ('end', 'f8'),          # time of the last motion sample (s)
+    ('start_index', 'i8'),
+    ('end_index', 'i8'),    # exclusive
+    ('peak_speed', 'f4'),   # m/s
+    ('peak_force', 'f4'),   # N
+])
+
+
+class AnalysisConfig:
+    """Tunable detection parameters; defaults match the firmware."""
+
+    def __init__(self, motion_threshold=MOTION_ACCEL_THRESHOLD,
+                 accel_cleanse_threshold=ACCEL_CLEANSE_THRESHOLD,
+                 force_cleanse_threshold=FORCE_CLEANSE_THRESHOLD,
+                 motion_sustain=MOTION_SUSTAIN, accel_gains=ACCEL_GAINS):
+        self.motion_threshold = motion_threshold
+        self.accel_cleanse_threshold = accel_cleanse_threshold
+        self.force_cleanse_threshold = force_cleanse_threshold
+        self.motion_sustain = motion_sustain
+        self.accel_gains = np.asarray(accel_gains, dtype=np.float32)
+
+
+DEFAULT_CONFIG = AnalysisConfig()
+
+
+def decode_samples(samples: np.ndarray):
+    """Splits RAW_SAMPLE_DTYPE rows into time (s), acceleration (n, 3) in g and force (N)."""
+    t = samples['t_ms'].astype(np.float64) / 1000
+    accel = np.column_stack((samples['ax'], samples['ay'], samples['az'])).astype(np.float32)
+    accel *= ACCEL_SCALE
+    return t, accel, fsr_force(samples['fsr'])
+
+
+def motion_magnitude(accel: np.ndarray, config: AnalysisConfig = DEFAULT_CONFIG) -> np.ndarray:
+    """The firmware's cleansed, scaled acceleration magnitude used for detection."""
+    cleansed = accel.copy()
+    cleansed[:, 2] -= 1.0
+    cleansed[cleansed < config.accel_cleanse_threshold] = 0.0
+    cleansed *= config.accel_gains
+    return np.sqrt(np.einsum('ij,ij->i', cleansed, cleansed))
+
+
+def segment(t: np.ndarray, magnitude: np.ndarray, config: AnalysisConfig = DEFAULT_CONFIG):
+    """Returns (starts, ends) index arrays of punches; ends are exclusive."""
+    motion = magnitude > config.motion_threshold
+    edges = np.diff(motion.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) < 2:
+        return starts, ends
+    # Runs separated by less than MOTION_SUSTAIN of stillness are one punch
+    gaps = t[starts[1:]] - t[ends[:-1] - 1]
+    keep = np.concatenate(([True], gaps >= config.motion_sustain))
+    return starts[keep], ends[np.concatenate((keep[1:], [True]))]
+
+
+def integrate_speed(t: np.ndarray, accel: np.ndarray, starts: np.ndarray,
+                    ends: np.ndarray) -> np.ndarray:
+    """Per-sample speed (m/s) inside punches, zero elsewhere.
+
+    Velocity is the cumulative sum of acceleration * dt restarted at every
+    punch, with a linear ramp removed so it is zero at both ends.
+    """
+    n = len(t)
+    speed = np.zeros(n, dtype=np.float32)
+    if not len(starts):
+        return speed
+    linear = accel.astype(np.float64)
+    linear[:, 2] -= 1.0
+    dt = np.diff(t, prepend=t[0])
+    step = linear * (dt * G_VALUE)[:, None]
+    step[~punch_mask(n, starts, ends)] = 0.0
+    step[starts] = 0.0  # velocity starts from rest
+    cumulative = np.cumsum(step, axis=0)
+
+    # Segment id and sample index for every sample inside a punch
+    lengths = ends - starts
+    seg = np.repeat(np.arange(len(starts)), lengths)
+    idx = _ranges(starts, lengths)
+    base = cumulative[starts]
+    velocity = cumulative[idx] - base[seg]
+
+    # Zero-velocity update: remove the drift accumulated by the end of the punch
+    drift = cumulative[ends - 1] - base
+    duration = t[ends - 1] - t[starts]
+    duration[duration == 0] = 1.0
+    fraction = (t[idx] - t[starts][seg]) / duration[seg]
+    velocity -= drift[seg] * fraction[:, None]
+    speed[idx] = np.sqrt(np.einsum('ij,ij->i', velocity, velocity))
+    return speed
+
+
+def punch_mask(n: int, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Boolean mask of the samples that belong to a punch."""
+    marks = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(marks, starts, 1)
+    np.add.at(marks, ends, -1)
+    return np.cumsum(marks[:-1]).astype(bool)
+
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(start, start + length) for every pair, vectorized."""
+    total = lengths.sum()
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + (np.arange(total) - offsets)
+
+
+def analyze(t: np.ndarray, accel: np.ndarray, force: np.ndarray,
+            config: AnalysisConfig = DEFAULT_CONFIG) -> np.ndarray:
+    """Detects punches and returns one PUNCH_RESULT_DTYPE row per punch."""
+    starts, ends = segment(t, motion_magnitude(accel, config), config)
+    results = np.zeros(len(starts), dtype=PUNCH_RESULT_DTYPE)
+    if not len(starts):
+        return results
+    # The hand is back at rest once the stillness after a punch has lasted
+    # MOTION_SUSTAIN, so that is where the zero-velocity correction applies
+    settle = np.searchsorted(t, t[ends - 1] + config.motion_sustain, side='right')
+    settle = np.minimum(settle, np.append(starts[1:], len(t)))
+    speed = integrate_speed(t, accel, starts, settle)
+    # Like the firmware, force only counts while the glove is moving
+    force = np.where((force < config.force_cleanse_threshold)
+                     | ~punch_mask(len(t), starts, ends), 0.0, force)
+    results['start'] = t[starts]
+    results['end'] = t[ends - 1]
+    results['start_index'] = starts
+    results['end_index'] = ends
+    # Values outside punches are zero, so reducing up to the next start is
+    # the same as reducing over the punch itself
+    results['peak_speed'] = np.maximum.reduceat(speed, starts)
+    results['peak_force'] = np.maximum.reduceat(force, starts)
+    return results
+
+
+def analyze_samples(samples: np.ndarray, config: AnalysisConfig = DEFAULT_CONFIG) -> np.ndarray:
+    """analyze() over RAW_SAMPLE_DTYPE rows, e.g. a whole recorded session."""
+    return analyze(*decode_samples(samples), config)
+
+
+class StreamingPunchDetector:
+    """Runs analyze() over chunks as they arrive.
+
+    Samples after the last completed punch are carried over to the next
+    chunk, so punches that straddle chunk boundaries are found exactly once.
+    A punch is complete once MOTION_SUSTAIN of stillness follows it.
+    """
+
+    def __init__(self, config: AnalysisConfig = DEFAULT_CONFIG, max_carry: int = 4096):
+        self.config = config
+        self.max_carry = max_carry
+        self.carry = None
+        # Samples the indices of the last feed()'s results refer to
+        self.analyzed = None
+
+    def feed(self, samples: np.ndarray) -> np.ndarray:
+        """Analyzes a chunk of RAW_SAMPLE_DTYPE rows and returns the punches it completed."""
+        if self.carry is not None and len(self.carry):
+            samples = np.concatenate((self.carry, samples))
+        if not len(samples):
+            return np.zeros(0, dtype=PUNCH_RESULT_DTYPE)
+        self.analyzed = samples
+        t, accel, force = decode_samples(samples)
+        results = analyze(t, accel, force, self.config)
+        done = results['end'] + self.config.motion_sustain <= t[-1]
+        complete = results[done]
+        if len(complete):
+            keep_from = int(complete['end_index'][-1])
+        else:
+            # Only the part that could still start a punch is kept
+            keep_from = max(len(samples) - self.max_carry, 0)
+            if len(results):
+                keep_from = min(keep_from, int(results['start_index'][0]))
+        self.carry = samples[keep_from:].copy()
+        return complete
+
+
+def analyze_recording(samples: np.ndarray, config: AnalysisConfig = DEFAULT_CONFIG) -> np.ndarray:
+    """analyze_samples() over one glove's recorded samples.
+
+    A glove that restarted during the session starts its clock again; each
+    run of increasing timestamps is analyzed on its own and the indices of
+    the results refer to the whole input.
+    """
+    restarts = np.flatnonzero(np.diff(samples['t_ms'].astype(np.int64)) < 0) + 1
+    parts = []
+    for start, end in zip(np.append(0, restarts), np.append(restarts, len(samples))):
+        results = analyze_samples(samples[start:end], config)
+        results['start_index'] += start
+        results['end_index'] += start
+        parts.append(results)
+    return np.concatenate(parts)
+
+
+def reprocess(directory: str, config: AnalysisConfig = DEFAULT_CONFIG,
+              session_name: str = None, glove: str = None):
+    """Yields (session, device, address, samples, punches) per glove with raw samples."""
+    devices = load_devices(directory)
+    for session in SessionReader(directory).sessions:
+        if session_name and os.path.basename(session.path) != session_name:
+            continue
+        for device in np.unique(session.raw['device']).tolist():
+            address = devices.get(device, f"{device:08x}")
+            if glove and address != glove:
+                continue
+            samples = session.raw_samples(device)
+            yield session, device, address, samples, analyze_recording(samples, config)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Re-runs punch detection over raw samples recorded with --raw")
+    parser.add_argument('directory', nargs='?', default=SESSION_DIR)
+    parser.add_argument('--session', help="only this session file, e.g. session-...sslog")
+    parser.add_argument('--glove', help="only this glove address")
+    parser.add_argument('--threshold', type=float, default=MOTION_ACCEL_THRESHOLD,
+                        help="scaled acceleration magnitude that counts as motion")
+    parser.add_argument('--sustain', type=float, default=MOTION_SUSTAIN,
+                        help="seconds of stillness that end a punch")
+    parser.add_argument('--accel-cleanse', type=float, default=ACCEL_CLEANSE_THRESHOLD,
+                        help="acceleration (g) below which an axis counts as still")
+    parser.add_argument('--force-cleanse', type=float, default=FORCE_CLEANSE_THRESHOLD,
+                        help="force (N) below which the FSR reads as zero")
+    parser.add_argument('-o', '--output', help="write the detected punches as CSV")
+    parser.add_argument('--save-samples', metavar='NPZ',
+                        help="write the samples and detected onsets of the one selected "
+                             "glove session, for labelling and punch_classifier.py")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = AnalysisConfig(args.threshold, args.accel_cleanse, args.force_cleanse,
+                            args.sustain)
+    out = open(args.output, 'w', newline='') if args.output else None
+    writer = csv.writer(out) if out else None
+    if writer:
+        writer.writerow(('session', 'glove', 'start', 'end', 'peak_speed', 'peak_force'))
+    selected = []
+    try:
+        for session, device, address, samples, punches in reprocess(
+                args.directory, config, args.session, args.glove):
+            name = os.path.basename(session.path)
+            records = session.records
+            firmware = int(np.count_nonzero((records['device'] == device)
+                                            & (records['kind'] == KIND_SPEED)))
+            print(f"{name} {address}: {len(punches)} punches detected in {len(samples)} "
+                  f"samples, firmware reported {firmware}", end="")
+            if len(punches):
+                print(f"; peak speed mean {punches['peak_speed'].mean():.2f} m/s, "
+                      f"peak force mean {punches['peak_force'].mean():.1f} N", end="")
+            print()
+            if writer:
+                rows = punches[['start', 'end', 'peak_speed', 'peak_force']].tolist()
+                writer.writerows((name, address, start, end, round(speed, 3), round(force, 2))
+                                 for start, end, speed, force in rows)
+            selected.append((samples, punches))
+    finally:
+        if out:
+            out.close()
+    if not selected:
+        print(f"No raw samples recorded in {args.directory}; record with --raw.")
+    if args.save_samples:
+        if len(selected) != 1:
+            sys.exit(f"--save-samples needs exactly one glove session; {len(selected)} match, "
+                     f"narrow them down with --session and --glove")
+        samples, punches = selected[0]
+        # Add 'labels', one per onset, before training on it
+        np.savez(args.save_samples, samples=samples, onsets=punches['start'])
+        print(f"Wrote {len(samples)} samples with {len(punches)} onsets to {args.save_samples}")
+
+
+if __name__ == '__main__':
+    main()
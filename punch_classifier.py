@@ -0,0 +1,555 @@
+"""Punch-type classification (jab, cross, hook, uppercut) from raw IMU windows.
+
+Each punch found by the host-side detector (punch_analysis) gets a window
+of gravity-removed acceleration and force resampled on a fixed time grid
+around its start. A few dozen NumPy features per window feed a multinomial
+logistic regression, small enough to train in well under a second and to
+classify a batch with one matrix product.
+
+Live, PunchTypeClassifier runs detection, feature extraction and inference
+on a thread pool, batching punches from every glove, so the event loop and
+the DataProcessor never wait for it:
+
+    python main.py --raw --classify                  # punch_model.npz
+    python main.py --simulate 2 --raw --classify     # synthetic model if none saved
+
+Offline, the same streaming path can be trained and checked against
+labelled data, either synthetic or an .npz with 'samples' (RAW_SAMPLE_DTYPE),
+'onsets' (seconds, device clock) and 'labels'. `punch_analysis.py
+--save-samples` writes the samples and onsets of a session recorded with
+--raw; the labels, one per onset, are added by hand:
+
+    python punch_classifier.py synthesize 500 -o labelled.npz
+    python punch_classifier.py train --synthetic 2000 -o punch_model.npz
+    python punch_classifier.py evaluate --data labelled.npz
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from metrics import NULL_METRICS, STAGE_CLASSIFY, LatencyHistogram
+from pipeline import LatencyStats
+from punch_analysis import MOTION_SUSTAIN, StreamingPunchDetector, analyze, decode_samples
+from raw_stream import FSR_ADC_MAX, FSR_FORCE_GAIN, FSR_V_IN, RAW_SAMPLE_DTYPE
+
+PUNCH_TYPES = ('jab', 'cross', 'hook', 'uppercut')
+MODEL_FILE = "punch_model.npz"
+
+# Window around each punch start, resampled to WINDOW_SAMPLES points
+WINDOW_BEFORE = 0.1  # seconds
+WINDOW_AFTER = 0.5   # seconds
+WINDOW_SAMPLES = 32
+
+# Softmax regression training
+FIT_ITERATIONS = 500
+LEARNING_RATE = 0.5
+L2_PENALTY = 1e-3
+
+# Live inference: punches per predict call, how long a partial batch may
+# wait for more, and how often the raw buffers are polled for new samples
+CLASSIFY_WORKERS = 2
+BATCH_SIZE = 32
+BATCH_WAIT = 0.02
+CLASSIFY_POLL = 0.05
+
+# Synthetic data: sample rate of the raw stream and per-type motion
+SAMPLE_RATE = 100.0
+SYNTHETIC_NOISE = 0.1  # g
+# Random wrist roll (radians) mixing the y and z axes of each punch
+SYNTHETIC_ROLL = 0.5
+# duration (s), (x, y, z) straight-line push-pull amplitude in g,
+# (x, y, z) arcing amplitude in g, peak force (N)
+SYNTHETIC_PROFILES = {
+    'jab': (0.22, (4.0, 0.3, 0.3), (0.0, 0.0, 0.0), 150.0),
+    'cross': (0.30, (6.0, 0.5, 0.3), (0.0, -2.0, 0.0), 300.0),
+    'hook': (0.35, (2.5, 0.5, 0.3), (0.0, 5.0, 0.5), 250.0),
+    'uppercut': (0.30, (2.5, 0.3, 1.0), (0.0, 0.5, 5.0), 200.0),
+}
+# A detected punch is matched to a labelled onset at most this far away
+MATCH_TOLERANCE = 0.2
+
+
+def extract_windows(t: np.ndarray, accel: np.ndarray, force: np.ndarray,
+                    starts: np.ndarray) -> np.ndarray:
+    """(punches, WINDOW_SAMPLES, 4) windows of ax, ay, az - 1 g and force.
+
+    Samples are linearly interpolated on a fixed time grid from
+    WINDOW_BEFORE before each start index to WINDOW_AFTER after it, so the
+    windows do not depend on the sample rate or on lost packets. Times
+    outside the samples take the value of the nearest one.
+    """
+    signal = np.column_stack((accel, force)).astype(np.float32)
+    signal[:, 2] -= 1.0
+    if len(t) < 2:
+        return np.repeat(signal[None, :1], len(starts), axis=0).repeat(WINDOW_SAMPLES, axis=1)
+    grid = np.linspace(-WINDOW_BEFORE, WINDOW_AFTER, WINDOW_SAMPLES)
+    times = t[starts][:, None] + grid
+    hi = np.clip(np.searchsorted(t, times), 1, len(t) - 1)
+    lo = hi - 1
+    span = t[hi] - t[lo]
+    span[span == 0] = 1.0
+    weight = np.clip((times - t[lo]) / span, 0.0, 1.0)[..., None].astype(np.float32)
+    return signal[lo] * (1 - weight) + signal[hi] * weight
+
+
+def window_features(windows: np.ndarray, durations: np.ndarray) -> np.ndarray:
+    """One row of features per window, computed for all windows at once."""
+    accel = windows[..., :3]
+    force = windows[..., 3]
+    count = windows.shape[1]
+    energy = np.einsum('mwi,mwi->mi', accel, accel)
+    centered = accel - accel.mean(axis=1, keepdims=True)
+    cov = np.einsum('mwi,mwj->mij', centered, centered)
+    sd = np.sqrt(np.maximum(np.diagonal(cov, axis1=1, axis2=2), 1e-12))
+    corr = cov / (sd[:, :, None] * sd[:, None, :])
+    return np.hstack((
+        accel.mean(axis=1), accel.std(axis=1), accel.max(axis=1), accel.min(axis=1),
+        accel.argmax(axis=1) / count, accel.argmin(axis=1) / count,
+        # Share of the motion along each axis
+        energy / np.maximum(energy.sum(axis=1, keepdims=True), 1e-12),
+        corr[:, (0, 0, 1), (1, 2, 2)],
+        np.sqrt(np.einsum('mwi,mwi->mw', accel, accel)).max(axis=1)[:, None],
+        force.max(axis=1)[:, None],
+        np.asarray(durations, dtype=np.float32)[:, None],
+    )).astype(np.float32)
+
+
+def punch_features(t, accel, force, punches: np.ndarray) -> np.ndarray:
+    """Features of the punches (PUNCH_RESULT_DTYPE rows) found in these samples."""
+    windows = extract_windows(t, accel, force, punches['start_index'])
+    return window_features(windows, punches['end'] - punches['start'])
+
+
+def softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    return scores / scores.sum(axis=1, keepdims=True)
+
+
+class PunchTypeModel:
+    """Multinomial logistic regression over standardized window features."""
+
+    def __init__(self, mean, scale, weights, bias, classes=PUNCH_TYPES):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.classes = tuple(classes)
+
+    @classmethod
+    def fit(cls, features: np.ndarray, labels, classes=PUNCH_TYPES,
+            iterations: int = FIT_ITERATIONS, learning_rate: float = LEARNING_RATE,
+            l2: float = L2_PENALTY):
+        """Trains by full-batch gradient descent on the cross-entropy."""
+        labels = np.asarray(labels)
+        targets = (labels[:, None] == np.asarray(classes)[None, :]).astype(np.float64)
+        if not targets.any(axis=1).all():
+            unknown = sorted(set(labels.tolist()) - set(classes))
+            raise ValueError(f"Labels not among the classes: {unknown}")
+        features = np.asarray(features, dtype=np.float64)
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0)
+        scale[scale == 0] = 1.0
+        z = (features - mean) / scale
+        weights = np.zeros((z.shape[1], len(classes)))
+        bias = np.zeros(len(classes))
+        for _ in range(iterations):
+            error = softmax(z @ weights + bias) - targets
+            weights -= learning_rate * (z.T @ error / len(z) + l2 * weights)
+            bias -= learning_rate * error.mean(axis=0)
+        return cls(mean, scale, weights, bias, classes)
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        return softmax((features - self.mean) / self.scale @ self.weights + self.bias)
+
+    def predict(self, features: np.ndarray):
+        """Returns (labels, confidences) for a batch of feature rows."""
+        proba = self.predict_proba(features)
+        best = proba.argmax(axis=1)
+        return np.asarray(self.classes)[best], proba[np.arange(len(best)), best]
+
+    def save(self, path: str):
+        np.savez(path, mean=self.mean, scale=self.scale, weights=self.weights,
+                 bias=self.bias, classes=np.asarray(self.classes))
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            return cls(data['mean'], data['scale'], data['weights'], data['bias'],
+                       data['classes'].tolist())
+
+
+def synthetic_session(punches: int = 200, seed: int = None, sample_rate: float = SAMPLE_RATE):
+    """Raw samples of a glove throwing random punch types, with the ground truth.
+
+    Returns (samples, onsets, labels). Every punch pushes along its
+    straight-line axes and brakes again, plus a one-sided arc for hooks
+    and uppercuts, with random amplitude, duration, wrist roll and sensor
+    noise, and is followed by enough stillness for the detector to
+    separate it.
+    """
+    rng = np.random.default_rng(seed)
+    labels = rng.choice(PUNCH_TYPES, punches)
+    profiles = [SYNTHETIC_PROFILES[label] for label in labels]
+    durations = np.array([profile[0] for profile in profiles]) * rng.uniform(0.8, 1.2, punches)
+    rests = rng.uniform(MOTION_SUSTAIN + 0.2, MOTION_SUSTAIN + 1.0, punches)
+    onsets = np.cumsum(rests) + np.concatenate(([0.0], np.cumsum(durations)[:-1]))
+    t = np.arange(int((onsets[-1] + durations[-1] + 1.0) * sample_rate)) / sample_rate
+    accel = rng.normal(0.0, SYNTHETIC_NOISE, (len(t), 3))
+    accel[:, 2] += 1.0
+    force = np.zeros(len(t))
+    for onset, duration, (_, straight, arc, peak) in zip(onsets, durations, profiles):
+        lo, hi = np.searchsorted(t, (onset, onset + duration))
+        u = (t[lo:hi] - onset) / duration
+        motion = (np.outer(np.sin(2 * np.pi * u), np.multiply(straight, rng.uniform(0.6, 1.4, 3)))
+                  + np.outer(np.sin(np.pi * u), np.multiply(arc, rng.uniform(0.6, 1.4, 3))))
+        roll = rng.uniform(-SYNTHETIC_ROLL, SYNTHETIC_ROLL)
+        cos, sin = np.cos(roll), np.sin(roll)
+        accel[lo:hi, 0] += motion[:, 0]
+        accel[lo:hi, 1] += cos * motion[:, 1] - sin * motion[:, 2]
+        accel[lo:hi, 2] += sin * motion[:, 1] + cos * motion[:, 2]
+        # Impact while the glove is still moving, just past the fastest point
+        force[lo:hi] = peak * rng.uniform(0.6, 1.4) * np.exp(-((u - 0.55) / 0.12) ** 2)
+
+    samples = np.zeros(len(t), dtype=RAW_SAMPLE_DTYPE)
+    samples['t_ms'] = np.round(t * 1000)
+    milli_g = np.clip(np.round(accel * 1000), -32768, 32767)
+    samples['ax'], samples['ay'], samples['az'] = milli_g.T
+    # Inverse of raw_stream.fsr_force
+    fsr = np.sqrt(force / FSR_FORCE_GAIN) * (FSR_ADC_MAX / FSR_V_IN)
+    samples['fsr'] = np.clip(np.round(fsr), 0, FSR_ADC_MAX)
+    return samples, onsets, labels
+
+
+def match_onsets(starts: np.ndarray, onsets: np.ndarray):
+    """(index, matched): the labelled onset of every detected start, if one is near."""
+    if not len(onsets):
+        return np.zeros(len(starts), dtype=np.int64), np.zeros(len(starts), dtype=bool)
+    index = np.maximum(np.searchsorted(onsets, starts + MATCH_TOLERANCE, side='right') - 1, 0)
+    return index, np.abs(starts - onsets[index]) <= MATCH_TOLERANCE
+
+
+def labelled_features(samples: np.ndarray, onsets: np.ndarray, labels: np.ndarray):
+    """Features and labels of the detected punches that match a labelled onset."""
+    t, accel, force = decode_samples(samples)
+    punches = analyze(t, accel, force)
+    index, matched = match_onsets(punches['start'], onsets)
+    return punch_features(t, accel, force, punches[matched]), labels[index[matched]]
+
+
+def load_labelled(path: str = None, synthetic: int = 0, seed: int = None):
+    """(samples, onsets, labels) from a .npz file, or a synthetic session."""
+    if path:
+        with np.load(path) as data:
+            return data['samples'], data['onsets'], data['labels'].astype(str)
+    return synthetic_session(synthetic, seed)
+
+
+def train_synthetic(punches: int = 2000, seed: int = 0) -> PunchTypeModel:
+    return PunchTypeModel.fit(*labelled_features(*synthetic_session(punches, seed)))
+
+
+def missing_model_message(path: str) -> str:
+    return (f"no punch model at {path}; train one on labelled recordings with "
+            f"`python punch_classifier.py train --data labelled.npz -o {path}`")
+
+
+def load_model(path: str = MODEL_FILE, synthetic_fallback: bool = False) -> PunchTypeModel:
+    """The model saved at path.
+
+    Without one, synthetic_fallback trains on synthetic profiles, which only
+    suits synthetic punches (simulations and offline evaluation); otherwise
+    FileNotFoundError is raised, since its labels mean nothing for real gloves.
+    """
+    if os.path.exists(path):
+        return PunchTypeModel.load(path)
+    if not synthetic_fallback:
+        raise FileNotFoundError(missing_model_message(path))
+    print(f"No punch model at {path}; using one trained on synthetic data "
+          f"(see python punch_classifier.py train).")
+    return train_synthetic()
+
+
+class GloveDetector:
+    """Streaming detector of one glove plus the samples waiting for it."""
+
+    def __init__(self):
+        self.detector = StreamingPunchDetector()
+        self.busy = False
+        self.backlog = []
+        # When the oldest sample in the backlog was taken from the buffer
+        self.backlog_since = None
+
+
+class PunchTypeClassifier:
+    """Classifies the punches in the gloves' raw streams off the event loop.
+
+    feed() and the result callback run on the event loop. Detection and
+    feature extraction for a glove run on the pool, one chunk at a time per
+    glove; punches from all gloves are then collected into batches of up to
+    batch_size, or whatever arrived within batch_wait, and each batch is one
+    predict() call on the pool. on_result(device, punch_type, confidence,
+    punch) gets every classified punch, punch being its PUNCH_RESULT_DTYPE row.
+    """
+
+    def __init__(self, model: PunchTypeModel, on_result, workers: int = CLASSIFY_WORKERS,
+                 batch_size: int = BATCH_SIZE, batch_wait: float = BATCH_WAIT,
+                 metrics=NULL_METRICS):
+        self.model = model
+        self.on_result = on_result
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.metrics = metrics
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="classify")
+        self.gloves = {}
+        # (features row, device, punch, time its samples were taken)
+        self.pending = []
+        self.flush_handle = None
+        self.in_flight = set()
+        # Raw buffer sample number each glove has been fed up to
+        self.next_index = {}
+        # Samples taken from the buffer -> result delivered, per punch
+        self.latency = LatencyHistogram()
+        # predict() time per batch
+        self.inference = LatencyStats()
+        self.punches = 0
+        self.started = time.perf_counter()
+        self.closed = False
+
+    def feed(self, device, samples: np.ndarray, t_taken: float = None):
+        """Queues a chunk of a glove's raw samples, which must not change afterwards."""
+        if self.closed:
+            return
+        if t_taken is None:
+            t_taken = time.perf_counter()
+        glove = self.gloves.get(device)
+        if glove is None:
+            glove = self.gloves[device] = GloveDetector()
+        glove.backlog.append(samples)
+        if glove.backlog_since is None:
+            glove.backlog_since = t_taken
+        if not glove.busy:
+            self._detect(device, glove)
+
+    def _detect(self, device, glove: GloveDetector):
+        samples = (glove.backlog[0] if len(glove.backlog) == 1
+                   else np.concatenate(glove.backlog))
+        t_taken = glove.backlog_since
+        glove.backlog = []
+        glove.backlog_since = None
+        glove.busy = True
+        future = asyncio.get_running_loop().run_in_executor(
+            self.executor, self._detect_chunk, glove.detector, samples)
+        self._track(future)
+        future.add_done_callback(lambda f: self._detected(device, glove, f, t_taken))
+
+    @staticmethod
+    def _detect_chunk(detector: StreamingPunchDetector, samples: np.ndarray):
+        """Worker side: the punches this chunk completed and their features."""
+        punches = detector.feed(samples)
+        if not len(punches):
+            return punches, None
+        t, accel, force = decode_samples(detector.analyzed)
+        return punches, punch_features(t, accel, force, punches)
+
+    def _detected(self, device, glove: GloveDetector, future, t_taken: float):
+        glove.busy = False
+        if self.closed or future.cancelled():
+            return
+        if glove.backlog:
+            self._detect(device, glove)
+        try:
+            punches, features = future.result()
+        except Exception as e:
+            print(f"Error detecting punches for {device}: {e}")
+            self.metrics.drop('classify')
+            return
+        for row, punch in zip(features if features is not None else (), punches):
+            self.pending.append((row, device, punch, t_taken))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.pending and self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.batch_wait, self.flush)
+
+    def flush(self):
+        """Sends the pending punches to the pool as one batch."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if not batch or self.closed:
+            return
+        features = np.stack([row for row, _, _, _ in batch])
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self._predict, features)
+        self._track(future)
+        future.add_done_callback(lambda f: self._classified(batch, f))
+
+    def _predict(self, features: np.ndarray):
+        start = time.perf_counter()
+        labels, confidences = self.model.predict(features)
+        return labels, confidences, time.perf_counter() - start
+
+    def _classified(self, batch, future):
+        if future.cancelled():
+            return
+        try:
+            labels, confidences, elapsed = future.result()
+        except Exception as e:
+            print(f"Error classifying punches: {e}")
+            self.metrics.drop('classify', len(batch))
+            return
+        self.inference.add(elapsed)
+        now = time.perf_counter()
+        for (_, device, punch, t_taken), label, confidence in zip(batch, labels, confidences):
+            self.punches += 1
+            self.latency.add(now - t_taken)
+            if self.metrics.enabled:
+                self.metrics.observe(STAGE_CLASSIFY, now - t_taken)
+            self.on_result(device, str(label), float(confidence), punch)
+
+    def _track(self, future):
+        self.in_flight.add(future)
+        future.add_done_callback(self.in_flight.discard)
+
+    async def drain(self):
+        """Waits until every chunk fed so far has been classified."""
+        while self.in_flight or self.pending:
+            if self.in_flight:
+                await asyncio.gather(*list(self.in_flight), return_exceptions=True)
+                # Done callbacks, which may start the next step, run after this
+                await asyncio.sleep(0)
+            else:
+                self.flush()
+
+    def poll(self, managers):
+        """Feeds the raw samples each manager received since the previous poll."""
+        for manager in managers:
+            buffer = manager.raw_samples
+            if buffer is None:
+                continue
+            device = manager.device_address
+            samples = buffer.since(self.next_index.get(device, 0))
+            self.next_index[device] = buffer.total
+            if len(samples):
+                # The ring is overwritten as packets arrive; workers get a copy
+                self.feed(device, samples.copy())
+
+    async def run(self, managers, interval: float = CLASSIFY_POLL):
+        """Polls the managers' raw buffers every interval until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            self.poll(managers)
+
+    def close(self):
+        self.closed = True
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def snapshot(self) -> dict:
+        inference = self.inference.snapshot()
+        busy = self.inference.total
+        return {
+            'punches': self.punches,
+            'batches': inference['count'],
+            'mean_batch': self.punches / inference['count'] if inference['count'] else 0.0,
+            'inference_us_per_punch': busy / self.punches * 1e6 if self.punches else 0.0,
+            'punches_per_sec': self.punches / (time.perf_counter() - self.started),
+            'latency': self.latency.snapshot(),
+        }
+
+    def report(self):
+        snap = self.snapshot()
+        latency = snap['latency']
+        print(f"Punch types: {snap['punches']} punches in {snap['batches']} batches "
+              f"(mean {snap['mean_batch']:.1f}), inference "
+              f"{snap['inference_us_per_punch']:.1f} us/punch, "
+              f"latency p50 {latency['p50_ms']:.1f} ms p99 {latency['p99_ms']:.1f} ms "
+              f"max {latency['max_ms']:.1f} ms")
+
+
+async def stream_labelled(model, samples, chunk: int, workers: int, batch_size: int):
+    """Streams samples through PunchTypeClassifier in chunks; returns it and its results."""
+    results = []
+    classifier = PunchTypeClassifier(
+        model, lambda device, label, confidence, punch: results.append((punch['start'], label)),
+        workers, batch_size)
+    try:
+        for start in range(0, len(samples), chunk):
+            classifier.feed('EVAL', samples[start:start + chunk])
+            # Gives the done callbacks a chance to run, as a live loop would
+            await asyncio.sleep(0)
+        await classifier.drain()
+    finally:
+        classifier.close()
+    return classifier, results
+
+
+def evaluate(model, samples, onsets, labels, chunk: int, workers: int, batch_size: int):
+    started = time.perf_counter()
+    classifier, results = asyncio.run(stream_labelled(model, samples, chunk, workers, batch_size))
+    elapsed = time.perf_counter() - started
+    starts = np.array([start for start, _ in results], dtype=np.float64)
+    index, matched = match_onsets(starts, onsets)
+    predicted = np.array([label for _, label in results], dtype=str)[matched]
+    truth = labels[index[matched]]
+    print(f"{len(results)} punches detected of {len(onsets)} labelled "
+          f"({len(truth)} matched), {len(samples)} samples in {elapsed:.2f} s")
+    accuracy = (predicted == truth).mean() if len(truth) else 0.0
+    if len(truth):
+        print(f"Accuracy: {accuracy:.1%}")
+        print("truth \\ predicted " + " ".join(f"{name:>9}" for name in model.classes))
+        for name in model.classes:
+            row = predicted[truth == name]
+            print(f"{name:>17} " + " ".join(f"{int((row == other).sum()):>9}"
+                                            for other in model.classes))
+    classifier.report()
+    return accuracy
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name in ('train', 'evaluate'):
+        command = commands.add_parser(name)
+        command.add_argument('--data', help="labelled .npz (samples, onsets, labels)")
+        command.add_argument('--synthetic', type=int, default=2000 if name == 'train' else 500,
+                             help="punches of synthetic data when --data is not given")
+        command.add_argument('--seed', type=int, default=0 if name == 'train' else 1)
+    commands.choices['train'].add_argument('-o', '--output', default=MODEL_FILE)
+    evaluate_command = commands.choices['evaluate']
+    evaluate_command.add_argument('--model', default=MODEL_FILE)
+    evaluate_command.add_argument('--workers', type=int, default=CLASSIFY_WORKERS)
+    evaluate_command.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    evaluate_command.add_argument('--chunk', type=int, default=int(SAMPLE_RATE * CLASSIFY_POLL),
+                                  help="samples fed per step, as one poll would")
+    synthesize = commands.add_parser('synthesize')
+    synthesize.add_argument('punches', type=int)
+    synthesize.add_argument('--seed', type=int)
+    synthesize.add_argument('-o', '--output', required=True)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'synthesize':
+        samples, onsets, labels = synthetic_session(args.punches, args.seed)
+        np.savez(args.output, samples=samples, onsets=onsets, labels=labels)
+        print(f"Wrote {len(samples)} samples with {args.punches} punches to {args.output}")
+    elif args.command == 'train':
+        features, labels = labelled_features(*load_labelled(args.data, args.synthetic, args.seed))
+        model = PunchTypeModel.fit(features, labels)
+        predicted, _ = model.predict(features)
+        model.save(args.output)
+        print(f"Trained on {len(labels)} punches, training accuracy "
+              f"{(predicted == labels).mean():.1%}; saved to {args.output}")
+    else:
+        model = load_model(args.model, synthetic_fallback=True)
+        evaluate(model, *load_labelled(args.data, args.synthetic, args.seed),
+                 args.chunk, args.workers, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import numpy as np
+from lod import LodBuckets
+
+# One row per punch
+PUNCH_DTYPE = np.dtype([
+    ('timestamp', 'f8'),
+    ('speed', 'f4'),
+    ('force', 'f4'),
+    ('device', 'u2'),
+])
+
+# Columns summarized into min/max/mean buckets as punches age
+SUMMARY_FIELDS = ('speed', 'force')
+
+
+class MirroredRing:
+    """Fixed-capacity ring buffer of structured rows.
+
+    Every row is written twice, at i and i + capacity, so the newest n rows
+    are always one contiguous slice and can be returned as a view.
+    """
+
+    def __init__(self, capacity: int, dtype: np.dtype):
+        self.capacity = capacity
+        self.buffer = np.zeros(2 * capacity, dtype=dtype)
+        self.total = 0
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, row):
+        pos = self.total % self.capacity
+        self.buffer[pos] = row
+        self.buffer[pos + self.capacity] = row
+        self.total += 1
+
+    def extend(self, rows: np.ndarray):
+        """Appends a block of rows with vectorized copies (at most two per half)."""
+        if len(rows) > self.capacity:
+            self.total += len(rows) - self.capacity
+            rows = rows[-self.capacity:]
+        pos = self.total % self.capacity
+        first = min(len(rows), self.capacity - pos)
+        for offset in (0, self.capacity):
+            self.buffer[offset + pos:offset + pos + first] = rows[:first]
+            self.buffer[offset:offset + len(rows) - first] = rows[first:]
+        self.total += len(rows)
+
+    def window(self, n: int = None) -> np.ndarray:
+        """Zero-copy view of the newest n rows, oldest first."""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = self.total % self.capacity + self.capacity
+        return self.buffer[end - n:end]
+
+    def clear(self):
+        self.total = 0
+
+
+class PunchStore:
+    """Bounded punch history: recent punches at full detail, older ones as bucket summaries.
+
+    Punches are folded into per-field LodBuckets in order, at the latest
+    when they are evicted from the ring; the graphs fold earlier to bound
+    the number of punches they draw individually. The buckets cover the
+    whole session from punch 0 in constant memory.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        self.recent = MirroredRing(capacity, PUNCH_DTYPE)
+        self.summaries = {field: LodBuckets() for field in SUMMARY_FIELDS}
+        self.devices = {}
+
+    @property
+    def capacity(self) -> int:
+        return self.recent.capacity
+
+    @property
+    def total(self) -> int:
+        """Number of punches appended since the last clear."""
+        return self.recent.total
+
+    @property
+    def folded(self) -> int:
+        """Punch number of the first punch not yet in the summaries."""
+        return self.summaries[SUMMARY_FIELDS[0]].next_index
+
+    def __len__(self):
+        return len(self.recent)
+
+    def device_id(self, address) -> int:
+        """Small integer id for a device address, assigned on first use."""
+        device = self.devices.get(address)
+        if device is None:
+            device = self.devices[address] = len(self.devices)
+        return device
+
+    def append(self, timestamp: float, speed: float, force: float, address=None):
+        """Stores one punch in O(1), folding the evicted row into the summaries first."""
+        if self.total >= self.capacity:
+            self.fold(self.total - self.capacity + 1)
+        self.recent.append((timestamp, speed, force, self.device_id(address)))
+
+    def fold(self, upto: int):
+        """Adds the punches from folded up to (not including) upto to the summaries."""
+        if upto <= self.folded:
+            return
+        rows = self.since(self.folded)[:upto - self.folded]
+        for field, buckets in self.summaries.items():
+            buckets.extend(rows[field])
+
+    def window(self, n: int = None) -> np.ndarray:
+        """Zero-copy view of the newest n punches (all retained ones by default)."""
+        return self.recent.window(n)
+
+    def since(self, index: int) -> np.ndarray:
+        """View of the retained punches whose punch number is >= index."""
+        return self.recent.window(max(self.total - index, 0))
+
+    def clear(self):
+        self.recent.clear()
+        for buckets in self.summaries.values():
+            buckets.clear()
+        self.devices.clear()
+
+    def nbytes(self) -> int:
+        """Memory held by the store's buffers; constant for its lifetime."""
+        return self.recent.buffer.nbytes + sum(buckets.nbytes()
+                                               for buckets in self.summaries.values())
@@ -0,0 +1,88 @@
+import numpy as np
+from punch_store import MirroredRing
+
+# Layout of the firmware's RawPacket / RawSample structs (little-endian, packed)
+RAW_HEADER_DTYPE = np.dtype([('seq', '<u2'), ('count', 'u1'), ('flags', 'u1')])
+# Samples the firmware packs into one notification
+RAW_SAMPLES_PER_PACKET = 19
+RAW_SAMPLE_DTYPE = np.dtype([
+    ('t_ms', '<u4'),
+    ('ax', '<i2'),
+    ('ay', '<i2'),
+    ('az', '<i2'),
+    ('fsr', '<u2'),
+])
+
+# Raw acceleration is sent in milli-g
+ACCEL_SCALE = 1 / 1000
+# FSR circuit constants, as in the firmware
+FSR_V_IN = 5.0
+FSR_ADC_MAX = 1023.0
+FSR_FORCE_GAIN = 196.4092
+
+# About ten minutes of samples at 100 Hz
+RAW_BUFFER_CAPACITY = 65536
+
+
+def fsr_force(fsr: np.ndarray) -> np.ndarray:
+    """Converts raw FSR ADC readings to Newtons, vectorized."""
+    v_out = fsr.astype(np.float32) * (FSR_V_IN / FSR_ADC_MAX)
+    return FSR_FORCE_GAIN * v_out * v_out
+
+
+class RawSampleBuffer:
+    """Preallocated ring of raw IMU/FSR samples fed one packet at a time.
+
+    decode() views the packet payload with numpy.frombuffer and copies it
+    into the ring with a slice assignment, so no per-sample Python objects
+    are created.
+    """
+
+    def __init__(self, capacity: int = RAW_BUFFER_CAPACITY):
+        self.ring = MirroredRing(capacity, RAW_SAMPLE_DTYPE)
+        self.packets = 0
+        self.lost_packets = 0
+        self._next_seq = None
+
+    def __len__(self):
+        return len(self.ring)
+
+    @property
+    def total(self) -> int:
+        return self.ring.total
+
+    def decode(self, data) -> int:
+        """Decodes one notification into the ring. Returns the number of samples."""
+        if len(data) < RAW_HEADER_DTYPE.itemsize:
+            raise ValueError(f"Raw packet too short: {len(data)} bytes")
+        header = np.frombuffer(data, RAW_HEADER_DTYPE, count=1)[0]
+        count = int(header['count'])
+        if RAW_HEADER_DTYPE.itemsize + count * RAW_SAMPLE_DTYPE.itemsize > len(data):
+            raise ValueError(f"Raw packet claims {count} samples but has {len(data)} bytes")
+        seq = int(header['seq'])
+        if self._next_seq is not None:
+            gap = (seq - self._next_seq) % 0x10000
+            # A large gap means a duplicate or a firmware restart, not a loss
+            if gap < 0x8000:
+                self.lost_packets += gap
+        self._next_seq = (seq + 1) % 0x10000
+        self.packets += 1
+        self.ring.extend(np.frombuffer(data, RAW_SAMPLE_DTYPE, count=count,
+                                       offset=RAW_HEADER_DTYPE.itemsize))
+        return count
+
+    def samples(self, n: int = None) -> np.ndarray:
+        """Zero-copy view of the newest n raw samples."""
+        return self.ring.window(n)
+
+    def since(self, index: int) -> np.ndarray:
+        """View of the retained samples whose sample number is >= index."""
+        return self.ring.window(max(self.ring.total - index, 0))
+
+    def reset_sequence(self):
+        """Forgets the expected sequence number, e.g. after a reconnect."""
+        self._next_seq = None
+
+    def clear(self):
+        self.ring.clear()
+        self._next_seq = None
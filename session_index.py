@@ -0,0 +1,148 @@
+"""(device, timestamp) index over a directory of session logs.
+
+Every session file gets a sidecar `<session>.idx` holding its record
+positions sorted by device and then timestamp, and the directory gets an
+`index.json` manifest with each file's size, time span and per-device
+blocks of the sidecar. A query skips files and devices from the manifest
+alone, binary-searches the time range inside each device block, and reads
+only the matching records from the memory-mapped log.
+
+Sidecars are rebuilt when their session file has grown, so the session
+being recorded can be queried too. If the directory is read-only the index
+is kept in memory only.
+"""
+import glob
+import json
+import os
+import numpy as np
+from session_log import SESSION_DIR, SESSION_SUFFIX, Session
+
+INDEX_FILE = "index.json"
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+INDEX_DTYPE = np.dtype([('timestamp', '<f8'), ('position', '<u8')])
+# Records read from a session per yielded chunk
+CHUNK_RECORDS = 65536
+
+
+class SessionIndex:
+    """Manifest plus per-session sidecars for one session directory."""
+
+    def __init__(self, directory: str = SESSION_DIR):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, INDEX_FILE)
+        self.entries = self._load_manifest()
+        # Sidecars that could not be written, kept in memory instead
+        self._memory = {}
+        self.refresh()
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('version') != INDEX_VERSION:
+            return {}
+        return manifest['sessions']
+
+    def refresh(self):
+        """Indexes new or grown session files and forgets deleted ones."""
+        names = {os.path.basename(path) for path in
+                 glob.glob(os.path.join(self.directory, "*" + SESSION_SUFFIX))}
+        changed = False
+        for name in sorted(names):
+            entry = self.entries.get(name)
+            path = os.path.join(self.directory, name)
+            if (entry is None or entry['size'] != os.path.getsize(path)
+                    or not os.path.exists(path + INDEX_SUFFIX)):
+                self.entries[name] = self._build(path)
+                changed = True
+        for name in set(self.entries) - names:
+            del self.entries[name]
+            changed = True
+        if changed:
+            self._save_manifest()
+
+    def _build(self, path: str) -> dict:
+        """Sorts one session's records by (device, timestamp) and writes its sidecar."""
+        # Taken first so records appended while indexing trigger a rebuild
+        size = os.path.getsize(path)
+        session = Session(path)
+        records = session.records
+        timestamps = np.asarray(records['timestamp'])
+        devices = np.asarray(records['device']).astype(np.int64)
+        order = np.lexsort((timestamps, devices))
+        index = np.empty(len(order), dtype=INDEX_DTYPE)
+        index['timestamp'] = timestamps[order]
+        index['position'] = order
+        sorted_devices = devices[order]
+        starts = np.flatnonzero(np.diff(sorted_devices, prepend=-1)) if len(order) else []
+        ends = np.append(starts[1:], len(order)) if len(order) else []
+        blocks = {
+            str(int(sorted_devices[lo])): [int(lo), int(hi), float(index['timestamp'][lo]),
+                                           float(index['timestamp'][hi - 1])]
+            for lo, hi in zip(starts, ends)
+        }
+        try:
+            with open(path + INDEX_SUFFIX, 'wb') as f:
+                np.save(f, index)
+        except OSError:
+            self._memory[os.path.basename(path)] = index
+        return {
+            'size': size,
+            'start': session.start,
+            'first': float(timestamps.min()) if len(timestamps) else session.start,
+            'last': float(timestamps.max()) if len(timestamps) else session.start,
+            'devices': blocks,
+        }
+
+    def _save_manifest(self):
+        tmp = self.manifest_path + ".tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({'version': INDEX_VERSION, 'sessions': self.entries}, f)
+            os.replace(tmp, self.manifest_path)
+        except OSError:
+            pass
+
+    def _load_index(self, name: str) -> np.ndarray:
+        if name in self._memory:
+            return self._memory[name]
+        return np.load(os.path.join(self.directory, name + INDEX_SUFFIX), mmap_mode='r')
+
+    def devices(self) -> set:
+        """Ids of every device that has records in the directory."""
+        return {int(device) for entry in self.entries.values() for device in entry['devices']}
+
+    def select(self, devices=None, since: float = None, until: float = None,
+               chunk_records: int = CHUNK_RECORDS):
+        """Yields (session name, device, records) chunks matching the query.
+
+        devices is an iterable of device ids (None for all), since is
+        inclusive and until exclusive. Chunks come grouped by session, then
+        device, in time order within each group.
+        """
+        wanted = None if devices is None else {str(device) for device in devices}
+        for name in sorted(self.entries):
+            entry = self.entries[name]
+            if since is not None and entry['last'] < since:
+                continue
+            if until is not None and entry['first'] >= until:
+                continue
+            blocks = [(device, block) for device, block in sorted(entry['devices'].items())
+                      if (wanted is None or device in wanted)
+                      and (since is None or block[3] >= since)
+                      and (until is None or block[2] < until)]
+            if not blocks:
+                continue
+            records = Session(os.path.join(self.directory, name)).records
+            index = self._load_index(name)
+            for device, (lo, hi, _, _) in blocks:
+                timestamps = index['timestamp'][lo:hi]
+                first = lo + (np.searchsorted(timestamps, since, 'left') if since is not None else 0)
+                last = lo + (np.searchsorted(timestamps, until, 'left') if until is not None
+                             else hi - lo)
+                for start in range(first, last, chunk_records):
+                    positions = index['position'][start:min(start + chunk_records, last)]
+                    yield name, int(device), records[positions]
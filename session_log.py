@@ -0,0 +1,274 @@
+import glob
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+from raw_stream import RAW_SAMPLE_DTYPE
+
+# Default directory for recorded sessions
+SESSION_DIR = "sessions"
+SESSION_SUFFIX = ".sslog"
+# Raw IMU/FSR samples of a session recorded with --raw, next to its .sslog
+RAW_SUFFIX = ".sslraw"
+DEVICES_FILE = "devices.json"
+
+# File header: magic, format version, session start (unix time)
+MAGIC = b"SSLOG\0"
+RAW_MAGIC = b"SSRAW\0"
+VERSION = 1
+HEADER = struct.Struct('<6sHd')
+
+# One fixed-width record per BLE notification
+RECORD = struct.Struct('<dIB3xf')
+RECORD_DTYPE = np.dtype({
+    'names': ['timestamp', 'device', 'kind', 'value'],
+    'formats': ['<f8', '<u4', 'u1', '<f4'],
+    'offsets': [0, 8, 12, 16],
+    'itemsize': RECORD.size,
+})
+
+# One fixed-width row per raw sample: the glove's device id, then the
+# firmware's RawSample fields
+RAW_RECORD_DTYPE = np.dtype([('device', '<u4')] + RAW_SAMPLE_DTYPE.descr)
+
+# Record kinds
+KIND_SPEED = 1
+KIND_FORCE = 2
+
+# Writer batching: flush after this many records or this many seconds
+FLUSH_RECORDS = 256
+FLUSH_INTERVAL = 1.0
+
+
+# Marks raw sample batches in the writer queue
+_RAW = object()
+
+
+def device_id(address) -> int:
+    """Stable 32-bit id for a device address."""
+    return zlib.crc32(str(address).encode()) if address is not None else 0
+
+
+class SessionWriter:
+    """Append-only session log written from a background thread.
+
+    record() only enqueues, so it is safe to call from BLE callbacks on the
+    event loop. The writer thread packs records in batches and fsyncs once
+    per batch. The file is created here, so an unwritable directory fails
+    before anything is recorded. With raw=True the raw IMU/FSR samples
+    passed to record_raw() go to a RAW_SUFFIX file next to the log.
+    """
+
+    def __init__(self, directory: str = SESSION_DIR, start: float = None, raw: bool = False):
+        self.directory = directory
+        self.start = start if start is not None else time.time()
+        name = time.strftime("session-%Y%m%d-%H%M%S", time.localtime(self.start))
+        self.path = os.path.join(directory, name + SESSION_SUFFIX)
+        suffix = 1
+        while os.path.exists(self.path):
+            self.path = os.path.join(directory, f"{name}-{suffix}{SESSION_SUFFIX}")
+            suffix += 1
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'xb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, self.start))
+        self.raw_path = None
+        self._raw_file = None
+        if raw:
+            self.raw_path = os.path.splitext(self.path)[0] + RAW_SUFFIX
+            self._raw_file = open(self.raw_path, 'xb')
+            self._raw_file.write(HEADER.pack(RAW_MAGIC, VERSION, self.start))
+        self.records_written = 0
+        self.raw_samples_written = 0
+        self.batches_written = 0
+        self._queue = queue.SimpleQueue()
+        self._devices = {}
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, kind: int, value: float, address=None, timestamp: float = None):
+        """Queues one notification for writing; never blocks."""
+        self._queue.put((timestamp if timestamp is not None else time.time(),
+                         address, kind, value))
+
+    def record_raw(self, samples: np.ndarray, address=None):
+        """Queues RAW_SAMPLE_DTYPE rows for the raw file; copies them, never blocks."""
+        if self._raw_file is None:
+            raise ValueError("SessionWriter was created without raw=True")
+        self._queue.put((_RAW, address, samples.tobytes()))
+
+    def close(self):
+        """Flushes everything queued so far and stops the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            self._write_batches()
+        finally:
+            self._file.close()
+            if self._raw_file is not None:
+                self._raw_file.close()
+
+    def _write_batches(self):
+        batch = bytearray()
+        raw_batch = bytearray()
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = ()
+            if item is None:
+                running = False
+            elif item:
+                if item[0] is _RAW:
+                    _, address, data = item
+                    rows = np.empty(len(data) // RAW_SAMPLE_DTYPE.itemsize,
+                                    dtype=RAW_RECORD_DTYPE)
+                    rows['device'] = self._device_id(address)
+                    samples = np.frombuffer(data, RAW_SAMPLE_DTYPE)
+                    for name in RAW_SAMPLE_DTYPE.names:
+                        rows[name] = samples[name]
+                    raw_batch += rows.tobytes()
+                else:
+                    timestamp, address, kind, value = item
+                    batch += RECORD.pack(timestamp, self._device_id(address), kind, value)
+                if (len(batch) < FLUSH_RECORDS * RECORD.size
+                        and len(raw_batch) < FLUSH_RECORDS * RAW_RECORD_DTYPE.itemsize
+                        and time.monotonic() < deadline):
+                    continue
+            if batch:
+                self._flush(self._file, batch)
+                self.records_written += len(batch) // RECORD.size
+                self.batches_written += 1
+                batch = bytearray()
+            if raw_batch:
+                self._flush(self._raw_file, raw_batch)
+                self.raw_samples_written += len(raw_batch) // RAW_RECORD_DTYPE.itemsize
+                raw_batch = bytearray()
+            deadline = time.monotonic() + FLUSH_INTERVAL
+
+    @staticmethod
+    def _flush(f, data: bytearray):
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _device_id(self, address) -> int:
+        device = self._devices.get(address)
+        if device is None:
+            device = self._devices[address] = device_id(address)
+            self._save_device(device, address)
+        return device
+
+    def _save_device(self, device, address):
+        """Adds the device to the directory's id -> address table."""
+        path = os.path.join(self.directory, DEVICES_FILE)
+        devices = load_devices(self.directory)
+        devices[device] = address
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({str(k): v for k, v in devices.items()}, f, indent=2)
+        os.replace(tmp, path)
+
+
+def load_devices(directory: str = SESSION_DIR) -> dict:
+    """Device id -> address table for a session directory."""
+    path = os.path.join(directory, DEVICES_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {int(k): v for k, v in json.load(f).items()}
+
+
+class Session:
+    """One memory-mapped session file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.start = read_header(path, MAGIC)
+        self.records = map_records(path, RECORD_DTYPE)
+        raw_path = os.path.splitext(path)[0] + RAW_SUFFIX
+        self.raw_path = raw_path if os.path.exists(raw_path) else None
+        self._raw = None
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def raw(self) -> np.ndarray:
+        """RAW_RECORD_DTYPE rows recorded with --raw, mapped on first use; empty without."""
+        if self._raw is None:
+            if self.raw_path is None:
+                self._raw = np.zeros(0, dtype=RAW_RECORD_DTYPE)
+            else:
+                read_header(self.raw_path, RAW_MAGIC)
+                self._raw = map_records(self.raw_path, RAW_RECORD_DTYPE)
+        return self._raw
+
+    def raw_samples(self, device: int) -> np.ndarray:
+        """One glove's raw samples as RAW_SAMPLE_DTYPE rows, in arrival order."""
+        raw = self.raw[self.raw['device'] == device]
+        samples = np.empty(len(raw), dtype=RAW_SAMPLE_DTYPE)
+        for name in RAW_SAMPLE_DTYPE.names:
+            samples[name] = raw[name]
+        return samples
+
+
+def read_header(path: str, magic: bytes) -> float:
+    """Checks a session file's header and returns the session start."""
+    with open(path, 'rb') as f:
+        found, version, start = HEADER.unpack(f.read(HEADER.size))
+    if found != magic or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} session log.")
+    return start
+
+
+def map_records(path: str, dtype: np.dtype) -> np.ndarray:
+    """Memory-maps the fixed-width rows after the header."""
+    # A crash can leave a partial record at the end; it is ignored
+    count = (os.path.getsize(path) - HEADER.size) // dtype.itemsize
+    if not count:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=HEADER.size, shape=(count,))
+
+
+class SessionReader:
+    """Memory-maps every session in a directory, optionally limited to a time range."""
+
+    def __init__(self, directory: str = SESSION_DIR, since: float = None, until: float = None):
+        self.directory = directory
+        self.devices = load_devices(directory)
+        self.sessions = []
+        for path in sorted(glob.glob(os.path.join(directory, "*" + SESSION_SUFFIX))):
+            session = Session(path)
+            if until is not None and session.start > until:
+                continue
+            if since is not None and len(session) and session.records['timestamp'][-1] < since:
+                continue
+            self.sessions.append(session)
+        self.since = since
+        self.until = until
+
+    def __len__(self):
+        return sum(len(session) for session in self.sessions)
+
+    def records(self, kind: int = None) -> np.ndarray:
+        """All matching records as one array, in time order."""
+        parts = [session.records for session in self.sessions if len(session)]
+        if not parts:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        records = np.concatenate(parts)
+        mask = np.ones(len(records), dtype=bool)
+        if self.since is not None:
+            mask &= records['timestamp'] >= self.since
+        if self.until is not None:
+            mask &= records['timestamp'] <= self.until
+        if kind is not None:
+            mask &= records['kind'] == kind
+        return records if mask.all() else records[mask]
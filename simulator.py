@@ -0,0 +1,190 @@
+import asyncio
+import random
+import numpy as np
+from gloves import BLEManager
+from metrics import NULL_METRICS
+from punch_analysis import MOTION_SUSTAIN, analyze_samples
+from raw_stream import RAW_HEADER_DTYPE, RAW_SAMPLES_PER_PACKET
+from session_log import KIND_FORCE, KIND_SPEED, SessionReader
+
+# Delay between a punch's speed and force notifications, as sent by the firmware
+FORCE_AFTER_SPEED = 0.005
+# Event kind of a raw sample packet; not a session log kind
+RAW_PACKET = 'raw'
+# Events streamed between yields to the loop when running as fast as possible
+YIELD_EVERY = 64
+# Pause replayed between consecutive recorded sessions, however far apart they were
+REPLAY_SESSION_GAP = 1.0
+
+
+def synthetic_punches(count: int, punch_rate: float = 1.0, seed: int = None):
+    """Generates (offset_seconds, kind, value) events for count punches."""
+    rng = random.Random(seed)
+    t = 0.0
+    for _ in range(count):
+        t += rng.expovariate(punch_rate)
+        speed = max(rng.gauss(5.0, 1.5), 0.1)
+        force = max(rng.gauss(150.0, 80.0), 0.0)
+        yield t, KIND_SPEED, speed
+        yield t + FORCE_AFTER_SPEED, KIND_FORCE, force
+
+
+def raw_punches(count: int, seed: int = None):
+    """Events of a glove streaming raw samples of synthetic punches of random types.
+
+    Raw packets are sent once their last sample is taken, and each punch's
+    speed and force once MOTION_SUSTAIN of stillness has ended it, with the
+    values the host-side analysis finds in the same samples.
+    """
+    from punch_classifier import synthetic_session
+    samples, _, _ = synthetic_session(count, seed)
+    t = samples['t_ms'] / 1000
+    events = []
+    for seq, start in enumerate(range(0, len(samples), RAW_SAMPLES_PER_PACKET)):
+        packet = samples[start:start + RAW_SAMPLES_PER_PACKET]
+        header = np.array([(seq % 0x10000, len(packet), 0)], dtype=RAW_HEADER_DTYPE)
+        events.append((float(t[start + len(packet) - 1]), RAW_PACKET,
+                       header.tobytes() + packet.tobytes()))
+    for punch in analyze_samples(samples):
+        reported = float(punch['end']) + MOTION_SUSTAIN
+        events.append((reported, KIND_SPEED, float(punch['peak_speed'])))
+        events.append((reported + FORCE_AFTER_SPEED, KIND_FORCE, float(punch['peak_force'])))
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def recorded_punches(sessions, gap: float = REPLAY_SESSION_GAP) -> dict:
+    """Turns session log records into (offset_seconds, kind, value) events per device.
+
+    Offsets are measured from the start of the first session on one clock,
+    so gloves recorded together keep their relative timing. The idle time
+    between sessions is collapsed to gap.
+    """
+    events = {}
+    base = 0.0
+    for records in sessions:
+        if not len(records):
+            continue
+        timestamps = records['timestamp']
+        offsets = timestamps - timestamps.min() + base
+        for device in np.unique(records['device']):
+            mine = records['device'] == device
+            events.setdefault(int(device), []).extend(zip(
+                offsets[mine].tolist(), records['kind'][mine].tolist(),
+                records['value'][mine].tolist()))
+        base = float(offsets.max()) + gap
+    return events
+
+
+class SimulatedGlove(BLEManager):
+    """Stand-in for a BLE glove that pushes packets through the BLEManager callbacks.
+
+    rate scales time: 1.0 is real time, 10.0 is ten times faster and 0 sends
+    as fast as the loop allows.
+    """
+
+    def __init__(self, device_name, raw_queue, device_address, events, rate=1.0, recorder=None,
+                 metrics=NULL_METRICS, protocol=None, raw_stream=False):
+        super().__init__(device_name, raw_queue, device_address, recorder, metrics,
+                         raw_stream, protocol)
+        self.events = events
+        self.rate = rate
+        self.sent = 0
+        self.task = None
+
+    async def connect(self):
+        print(f"Connected to simulated {self.device_name} ({self.device_address}).")
+        self.task = asyncio.create_task(self.stream())
+
+    async def stream(self):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        # Events are encoded with the protocol's format for their session log kind
+        characteristics = dict(self.protocol.by_record)
+        raw = [c for c in self.protocol.characteristics if c.decoder == 'raw_samples']
+        if raw and self.raw_samples is not None:
+            characteristics[RAW_PACKET] = raw[0]
+        for offset, kind, value in self.events:
+            if self.rate > 0:
+                delay = start + offset / self.rate - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif self.sent % YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+            characteristic = characteristics.get(kind)
+            if kind == RAW_PACKET:
+                if characteristic is not None:
+                    self.on_notify(characteristic, characteristic.uuid, value)
+            elif characteristic is not None:
+                self.on_notify(characteristic, characteristic.uuid,
+                               characteristic.struct.pack(value))
+            self.sent += 1
+
+    async def disconnect(self):
+        if self.task:
+            self.task.cancel()
+
+
+class SimulatedHub:
+    """Drop-in replacement for GloveHub that streams synthetic or recorded sessions."""
+
+    def __init__(self, device_name, raw_queue, sources: dict, rate=1.0, recorder=None,
+                 metrics=NULL_METRICS, protocol=None, raw_stream=False):
+        self.device_name = device_name
+        self.raw_queue = raw_queue
+        # address -> iterable of (offset_seconds, kind, value)
+        self.sources = sources
+        self.rate = rate
+        self.recorder = recorder
+        self.metrics = metrics
+        self.protocol = protocol
+        self.raw_stream = raw_stream
+        self.managers = []
+
+    @classmethod
+    def synthetic(cls, device_name, raw_queue, gloves=1, punches=100, punch_rate=1.0,
+                  rate=1.0, seed=None, recorder=None, metrics=NULL_METRICS, protocol=None,
+                  raw_stream=False):
+        sources = {}
+        for i in range(gloves):
+            glove_seed = None if seed is None else seed + i
+            # Raw sessions keep their own pace; punch_rate does not apply to them
+            sources[f"SIM:{i:02d}"] = (raw_punches(punches, glove_seed) if raw_stream
+                                       else synthetic_punches(punches, punch_rate, glove_seed))
+        return cls(device_name, raw_queue, sources, rate, recorder, metrics, protocol,
+                   raw_stream)
+
+    @classmethod
+    def replay(cls, device_name, raw_queue, directory, rate=1.0, recorder=None,
+               metrics=NULL_METRICS, protocol=None):
+        reader = SessionReader(directory)
+        sessions = sorted(reader.sessions, key=lambda session: session.start)
+        sources = {}
+        for device, events in recorded_punches(session.records for session in sessions).items():
+            sources[reader.devices.get(device, f"REPLAY:{device:08x}")] = events
+        return cls(device_name, raw_queue, sources, rate, recorder, metrics, protocol)
+
+    async def scan(self, min_gloves: int = 1, window: float = None) -> list:
+        return list(self.sources)
+
+    async def connect_all(self, addresses):
+        for address in addresses:
+            glove = SimulatedGlove(self.device_name, self.raw_queue, address,
+                                   self.sources[address], self.rate, self.recorder,
+                                   self.metrics, self.protocol, self.raw_stream)
+            await glove.connect()
+            self.managers.append(glove)
+        if not self.managers:
+            raise ConnectionError("No simulated gloves to stream.")
+
+    async def wait_finished(self):
+        """Returns once every simulated glove has sent all of its events."""
+        await asyncio.gather(*(glove.task for glove in self.managers))
+
+    def connection_stats(self) -> dict:
+        # Simulated links never drop
+        return {}
+
+    async def disconnect_all(self):
+        for glove in self.managers:
+            await glove.disconnect()
@@ -0,0 +1,74 @@
+"""Startup phase timing.
+
+Times are measured from the moment this module is first imported, which
+main.py does before anything else; interpreter start-up itself is not
+included (use `python -X importtime main.py` for that). Phases may be
+marked from any thread.
+"""
+import contextlib
+import importlib
+import json
+import sys
+import threading
+import time
+
+ORIGIN = time.perf_counter()
+
+
+class StartupTimer:
+    """Records when startup milestones are reached and how long imports take."""
+
+    def __init__(self, origin: float = ORIGIN):
+        self.origin = origin
+        # name -> seconds since origin, first occurrence only
+        self.marks = {}
+        # name -> seconds spent
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name: str):
+        """Records that a milestone was reached; later repeats are ignored."""
+        elapsed = time.perf_counter() - self.origin
+        with self._lock:
+            self.marks.setdefault(name, elapsed)
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Times a block and marks its end."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - start
+            self.mark(name)
+
+    def import_module(self, name: str):
+        """importlib.import_module, timed as 'import <name>' the first time."""
+        if name in sys.modules:
+            return sys.modules[name]
+        with self.phase(f"import {name}"):
+            return importlib.import_module(name)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            marks = sorted(self.marks.items(), key=lambda item: item[1])
+            return {
+                'marks_ms': {name: elapsed * 1000 for name, elapsed in marks},
+                'durations_ms': {name: seconds * 1000 for name, seconds in self.durations.items()},
+            }
+
+    def report(self):
+        snap = self.snapshot()
+        print("Startup:")
+        for name, elapsed in snap['marks_ms'].items():
+            duration = snap['durations_ms'].get(name)
+            took = f" (took {duration:.1f} ms)" if duration is not None else ""
+            print(f"  {elapsed:8.1f} ms  {name}{took}")
+
+    def write(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+STARTUP = StartupTimer()
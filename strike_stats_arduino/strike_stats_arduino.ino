@@ -4,6 +4,12 @@
 #define IMU_SERVICE_UUID "119"
 #define SPEED_CHARACTERISTIC_UUID   "77777777-7777-7777-7777-a77777777777"
 #define FORCE_CHARACTERISTIC_UUID   "77777777-7777-7777-7777-b77777777777"
+#define RAW_CHARACTERISTIC_UUID     "77777777-7777-7777-7777-c77777777777"
+
+// High-rate raw sample streaming (set to 0 to disable)
+#define RAW_STREAM_ENABLED 1
+// 4-byte header + 19 samples * 12 bytes = 232 bytes, fits a 247-byte ATT MTU
+#define RAW_SAMPLES_PER_PACKET 19
 
 #define MOTION_ACCEL_THRESHOLD 8
 #define FORCE_CLEANSE_THRESHOLD 5
@@ -36,11 +42,32 @@ BLEService imuService(IMU_SERVICE_UUID);
 BLEFloatCharacteristic speedCharacteristic(SPEED_CHARACTERISTIC_UUID, BLERead | BLENotify);
 BLEFloatCharacteristic forceCharacteristic(FORCE_CHARACTERISTIC_UUID, BLERead | BLENotify);
 
+#if RAW_STREAM_ENABLED
+// Little-endian wire format, decoded on the host with numpy.frombuffer
+struct __attribute__((packed)) RawSample {
+  uint32_t t_ms;       // millis() at sampling time
+  int16_t ax, ay, az;  // acceleration in milli-g, before cleansing
+  uint16_t fsr;        // raw FSR ADC reading (0-1023)
+};
+
+struct __attribute__((packed)) RawPacket {
+  uint16_t seq;        // increments per packet, lets the host count losses
+  uint8_t count;       // valid samples in this packet
+  uint8_t flags;       // reserved
+  RawSample samples[RAW_SAMPLES_PER_PACKET];
+};
+
+RawPacket rawPacket;
+BLECharacteristic rawCharacteristic(RAW_CHARACTERISTIC_UUID, BLERead | BLENotify, sizeof(RawPacket));
+#endif
+
 const int ledPin = LED_BUILTIN;
 bool send_flag = false;
 
 void sendData();
 void resetPunch();
+void streamRawSample(float ax_g, float ay_g, float az_g, int fsr);
+void resetRawStream();
 
 void setup() {
   Serial.begin(9600);
@@ -71,6 +98,10 @@ void setup() {
 
   imuService.addCharacteristic(speedCharacteristic);
   imuService.addCharacteristic(forceCharacteristic);
+#if RAW_STREAM_ENABLED
+  imuService.addCharacteristic(rawCharacteristic);
+  resetRawStream();
+#endif
 
   BLE.addService(imuService);
 
@@ -91,6 +122,10 @@ void loop() {
     digitalWrite(ledPin, HIGH);
 
     resetPunch();
+#if RAW_STREAM_ENABLED
+    // Each connection starts a new packet sequence without the last link's partial packet
+    resetRawStream();
+#endif
     unsigned long startTime = millis(), endTime, motion_start_time;
 
     while (central.connected()) {
@@ -101,6 +136,10 @@ void loop() {
 
       if (IMU.accelerationAvailable() && IMU.gyroscopeAvailable()) {
         IMU.readAcceleration(ax, ay, az_raw);
+#if RAW_STREAM_ENABLED
+        // Only fresh readings, streamed before they are cleansed and scaled below
+        streamRawSample(ax, ay, az_raw, sensorValue);
+#endif
       }
 
       // remove az shift
@@ -213,6 +252,33 @@ void sendData() {
   forceCharacteristic.writeValue(currentMaxForce);
 }
 
+#if RAW_STREAM_ENABLED
+void streamRawSample(float ax_g, float ay_g, float az_g, int fsr) {
+  if (!rawCharacteristic.subscribed())
+    return;
+
+  RawSample &sample = rawPacket.samples[rawPacket.count++];
+  sample.t_ms = millis();
+  sample.ax = (int16_t)(ax_g * 1000);
+  sample.ay = (int16_t)(ay_g * 1000);
+  sample.az = (int16_t)(az_g * 1000);
+  sample.fsr = (uint16_t)fsr;
+
+  // Send only full packets so the BLE stack sees one notification per 19 samples
+  if (rawPacket.count == RAW_SAMPLES_PER_PACKET) {
+    rawCharacteristic.writeValue((const uint8_t *)&rawPacket, sizeof(RawPacket));
+    rawPacket.seq++;
+    rawPacket.count = 0;
+  }
+}
+
+void resetRawStream() {
+  rawPacket.seq = 0;
+  rawPacket.count = 0;
+  rawPacket.flags = 0;
+}
+#endif
+
 void resetPunch() {
   currentMaxSpeed = 0.0;
   currentMaxForce = 0.0;
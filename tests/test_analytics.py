@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from analytics import CURVE_INTERVAL, CURVE_POINTS, QuantileSketch, SessionAnalytics
+
+
+def true_quantile(values, q):
+    return float(np.sort(values)[int(q * (len(values) - 1))])
+
+
+@pytest.mark.parametrize('q', [0.0, 0.1, 0.5, 0.9, 0.99, 1.0])
+def test_quantiles_are_within_the_relative_accuracy(q):
+    values = np.random.default_rng(0).lognormal(mean=1.0, sigma=1.0, size=20000)
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+    assert sketch.quantile(q) == pytest.approx(true_quantile(values, q), rel=0.01)
+
+
+def test_empty_sketch_reports_zero():
+    assert QuantileSketch().quantile(0.5) == 0.0
+
+
+def test_zeros_are_counted_below_every_bucket():
+    sketch = QuantileSketch()
+    for value in [0.0] * 30 + [5.0] * 70:
+        sketch.add(value)
+    assert sketch.zero_count == 30
+    assert sketch.quantile(0.2) == 0.0
+    assert sketch.quantile(0.5) == pytest.approx(5.0, rel=0.01)
+
+
+def test_never_reports_above_the_maximum():
+    sketch = QuantileSketch(relative_accuracy=0.05)
+    for value in np.linspace(1.0, 3.0, 50):
+        sketch.add(value)
+    assert sketch.max == 3.0
+    assert all(sketch.quantile(q) <= 3.0 for q in np.linspace(0.0, 1.0, 21))
+
+
+def test_bucket_count_is_bounded_by_folding_the_lowest():
+    sketch = QuantileSketch(relative_accuracy=0.01, max_buckets=32)
+    values = np.geomspace(1e-3, 1e3, 5000)
+    for value in values:
+        sketch.add(value)
+    assert len(sketch.counts) == 32
+    assert sum(sketch.counts.values()) == 5000
+    # Only the low end lost accuracy
+    assert sketch.quantile(0.99) == pytest.approx(true_quantile(values, 0.99), rel=0.01)
+
+
+def test_fatigue_curve_keeps_only_the_recent_points():
+    analytics = SessionAnalytics()
+    # One punch a minute for a day
+    for minute in range(24 * 60):
+        analytics.add(minute * CURVE_INTERVAL, 5.0, 100.0)
+    curve = analytics.snapshot()['curve']
+    assert len(curve) == CURVE_POINTS
+    assert curve[-1]['start'] == (24 * 60 - 1) * CURVE_INTERVAL
+    assert [point['start'] for point in curve] == sorted(point['start'] for point in curve)
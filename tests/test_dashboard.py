@@ -0,0 +1,150 @@
+import asyncio
+import json
+import dashboard
+from dashboard import CLIENT_QUEUE_SIZE, DashboardServer
+
+
+async def start_server():
+    server = DashboardServer(asyncio.Queue(), '127.0.0.1', 0)
+    await server.start()
+    return server
+
+
+async def read_event(reader):
+    """(event name, parsed data) of the next server-sent event; comments are skipped."""
+    name, data = 'message', None
+    while True:
+        line = (await asyncio.wait_for(reader.readline(), 5)).decode()
+        if not line:
+            raise ConnectionError("stream closed")
+        line = line.rstrip('\n')
+        if line.startswith('event: '):
+            name = line[len('event: '):]
+        elif line.startswith('data: '):
+            data = json.loads(line[len('data: '):])
+        elif not line and data is not None:
+            return name, data
+
+
+async def connect_viewer(server):
+    reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+    writer.write(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    await writer.drain()
+    status = await reader.readline()
+    assert b"200" in status
+    while (await reader.readline()) != b"\r\n":
+        pass
+    name, snapshot = await read_event(reader)
+    assert name == 'snapshot'
+    return reader, writer, snapshot
+
+
+async def request(server, method, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return head.split(b"\r\n")[0], body
+
+
+async def wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_batch_is_encoded_once_and_fanned_out_to_every_viewer():
+    async def scenario():
+        server = await start_server()
+        try:
+            viewers = [await connect_viewer(server) for _ in range(3)]
+            await wait_for(lambda: len(server.clients) == 3)
+            server.put(('punch', (1.0, 5.0, 120.0, 'A')))
+            server.put(('previous_max_speed', 5.0))
+            server.put(('punch', (2.0, 6.0, 150.0, 'A')))
+            batches = [await read_event(reader) for reader, _, _ in viewers]
+            assert server.batches == 1
+            for name, batch in batches:
+                assert name == 'message'
+                assert [key for key, _ in batch] == ['punch', 'previous_max_speed', 'punch']
+            for _, writer, _ in viewers:
+                writer.close()
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_slow_viewer_is_dropped_without_blocking_and_resyncs_from_snapshot():
+    async def scenario():
+        server = await start_server()
+        try:
+            slow_reader, slow_writer, _ = await connect_viewer(server)
+            await wait_for(lambda: len(server.clients) == 1)
+            # Batches published back to back, before the viewer's task can run
+            for i in range(CLIENT_QUEUE_SIZE + 1):
+                server.put(('punch', (float(i), 5.0, 100.0, 'A')))
+                server.flush()
+            assert server.viewers_dropped == 1
+            assert not server.clients
+            # The dropped viewer's stream ends and its browser reconnects
+            while await asyncio.wait_for(slow_reader.read(65536), 5):
+                pass
+            slow_writer.close()
+            _, writer, snapshot = await connect_viewer(server)
+            assert snapshot['punch_count'] == CLIENT_QUEUE_SIZE + 1
+            assert snapshot['punches'][-1][0] == CLIENT_QUEUE_SIZE
+            writer.close()
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_and_summary_reflect_state_and_reset_is_forwarded():
+    async def scenario():
+        server = await start_server()
+        try:
+            server.put(('punch', (1.0, 5.0, 120.0, 'A')))
+            server.put(('historical_max_force', 120.0))
+            server.put(('summary', {'athletes': {}}))
+            await wait_for(lambda: server.batches == 1)
+            status, body = await request(server, 'GET', '/summary')
+            assert b"200" in status
+            state = json.loads(body)
+            assert state['punch_count'] == 1
+            assert state['historical_max_force'] == 120.0
+            assert state['summary'] == {'athletes': {}}
+            status, _ = await request(server, 'POST', '/reset')
+            assert b"204" in status
+            assert server.command_queue.get_nowait() == ('reset', None)
+            status, _ = await request(server, 'GET', '/nope')
+            assert b"404" in status
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_batches_are_rate_limited(monkeypatch):
+    monkeypatch.setattr(dashboard, 'MAX_BATCHES_PER_SEC', 10)
+
+    async def scenario():
+        server = await start_server()
+        try:
+            server.put(('previous_max_speed', 1.0))
+            await wait_for(lambda: server.batches == 1)
+            # Within the next frame, later messages wait and share one batch
+            for value in (2.0, 3.0, 4.0):
+                server.put(('previous_max_speed', value))
+            assert server.flush_handle is not None
+            await wait_for(lambda: server.batches == 2)
+            assert server.state.values['previous_max_speed'] == 4.0
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,31 @@
+import numpy as np
+from export import pair_punches
+from session_log import KIND_FORCE, KIND_SPEED, RECORD_DTYPE
+
+
+def records(*kinds_and_values):
+    return np.array([(float(i), 1, kind, value) for i, (kind, value) in enumerate(kinds_and_values)],
+                    dtype=RECORD_DTYPE)
+
+
+def pairs(recs):
+    timestamps, speed, force = pair_punches(recs)
+    return list(zip(timestamps.tolist(), speed.tolist(), force.tolist()))
+
+
+def test_speed_is_paired_with_the_force_that_follows():
+    assert pairs(records((KIND_SPEED, 5.0), (KIND_FORCE, 100.0),
+                         (KIND_SPEED, 6.0), (KIND_FORCE, 200.0))) == [
+        (0.0, 5.0, 100.0), (2.0, 6.0, 200.0)]
+
+
+def test_unpaired_speed_has_zero_force_and_unpaired_force_zero_speed():
+    assert pairs(records((KIND_SPEED, 5.0), (KIND_SPEED, 6.0), (KIND_FORCE, 200.0),
+                         (KIND_FORCE, 300.0), (KIND_SPEED, 7.0))) == [
+        (0.0, 5.0, 0.0), (1.0, 6.0, 200.0), (3.0, 0.0, 300.0), (4.0, 7.0, 0.0)]
+
+
+def test_leading_force_and_empty_input():
+    assert pairs(records((KIND_FORCE, 50.0), (KIND_SPEED, 4.0))) == [
+        (0.0, 0.0, 50.0), (1.0, 4.0, 0.0)]
+    assert pairs(records()) == []
@@ -0,0 +1,36 @@
+import matplotlib
+matplotlib.use('Agg')
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from graphs import BlitGraph, ForceGraph, SpeedGraph
+from punch_store import PunchStore
+
+
+def axes():
+    figure = Figure(figsize=(4, 3), dpi=50)
+    return figure, figure.add_subplot(111), FigureCanvasAgg(figure)
+
+
+def test_graph_missing_an_override_fails_when_built():
+    class Partial(BlitGraph):
+        def extend_artists(self, first):
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        Partial(*axes(), PunchStore(), 'speed')
+
+
+def test_graphs_follow_the_store_across_folds():
+    store = PunchStore(capacity=300)
+    speed = SpeedGraph(*axes(), store, '#88C0D0')
+    force = ForceGraph(*axes(), store, ('#A3BE8C', '#EBCB8B', '#BF616A'))
+    for i in range(320):
+        store.append(float(i), 1.0 + i % 5, 50.0 + i % 7 * 60, 'A')
+        speed.append(1)
+        force.append(1)
+    assert speed.raw_start == force.raw_start == store.folded > 0
+    assert len(force.bars) == store.total - force.raw_start
+    # Doubling keeps full redraws logarithmic in the history, plus one per fold
+    assert speed.frame_stats()['full_redraws'] < 20
+    assert speed.ax.get_xlim()[1] >= store.total - 0.5
@@ -0,0 +1,50 @@
+import asyncio
+import time
+import ingest
+from ingest import DataProcessor
+
+
+class Channel:
+    def __init__(self):
+        self.items = []
+
+    def put(self, item, t_origin=None):
+        self.items.append(item)
+
+    def sent(self, key):
+        return [value for k, value in self.items if k == key]
+
+
+def feed_punches(count, interval, settle):
+    """Runs count punches through a DataProcessor back to back and returns its channel."""
+    channel = Channel()
+
+    async def run():
+        processor = DataProcessor(asyncio.Queue(), channel, asyncio.Queue())
+        for i in range(count):
+            processor.handle_sample('previous_max_speed', 5.0, time.perf_counter(), 'A')
+            processor.handle_sample('previous_max_force', 100.0, time.perf_counter(), 'A')
+        await asyncio.sleep(interval + settle)
+        return processor
+
+    return channel, asyncio.run(run())
+
+
+def test_throttled_analytics_are_sent_at_the_end_of_the_interval(monkeypatch):
+    monkeypatch.setattr(ingest, 'ANALYTICS_INTERVAL', 0.05)
+    channel, _ = feed_punches(5, 0.05, 0.05)
+    analytics = channel.sent('analytics')
+    # One immediate send, then one trailing send with the final state
+    assert len(analytics) == 2
+    assert analytics[0]['punches'] == 1
+    assert analytics[-1]['punches'] == 5
+
+
+def test_throttled_summary_is_sent_at_the_end_of_the_interval(monkeypatch):
+    monkeypatch.setattr(ingest, 'ANALYTICS_INTERVAL', 0.05)
+    channel, processor = feed_punches(5, 0.05, 0.05)
+    summaries = channel.sent('summary')
+    assert len(summaries) == 2
+    assert summaries[0]['gloves']['A']['punch_count'] == 1
+    assert summaries[-1] == processor.summary()
+    assert summaries[-1]['athletes']['A']['punch_count'] == 5
@@ -0,0 +1,85 @@
+import threading
+from multiprocessing import shared_memory
+import pytest
+from isolation import LENGTH, RING_HEADER_SIZE, SharedRing
+
+
+@pytest.fixture
+def make_ring():
+    rings = []
+
+    def make(size, overflow='drop-oldest'):
+        ring = SharedRing.create(size, threading.Lock(), overflow)
+        rings.append(ring)
+        return ring
+
+    yield make
+    for ring in rings:
+        ring.close(unlink=True)
+
+
+def message(i: int) -> bytes:
+    return bytes([i]) * 8
+
+
+# Room for exactly four 8-byte messages with their length prefixes
+FOUR = 4 * (LENGTH.size + 8)
+
+
+def test_messages_are_read_in_order_once(make_ring):
+    ring = make_ring(FOUR)
+    for i in range(3):
+        assert ring.write(message(i))
+    assert ring.read_all() == [message(i) for i in range(3)]
+    assert ring.read_all() == []
+    assert ring.counters() == {'bytes_used': 0, 'written': 3, 'pending': 0,
+                               'dropped': 0, 'oversize': 0}
+
+
+def test_drop_oldest_discards_unread_messages(make_ring):
+    ring = make_ring(FOUR)
+    for i in range(6):
+        assert ring.write(message(i))
+    counters = ring.counters()
+    assert (counters['written'], counters['dropped'], counters['pending']) == (6, 2, 4)
+    assert ring.read_all() == [message(i) for i in range(2, 6)]
+
+
+def test_drop_newest_keeps_unread_messages(make_ring):
+    ring = make_ring(FOUR, 'drop-newest')
+    results = [ring.write(message(i)) for i in range(6)]
+    assert results == [True] * 4 + [False] * 2
+    counters = ring.counters()
+    assert (counters['written'], counters['dropped'], counters['pending']) == (4, 2, 4)
+    assert ring.read_all() == [message(i) for i in range(4)]
+
+
+def test_oversize_messages_are_counted_not_written(make_ring):
+    ring = make_ring(FOUR)
+    assert not ring.write(bytes(FOUR))
+    assert ring.counters()['oversize'] == 1
+    assert ring.read_all() == []
+
+
+def test_messages_wrap_around_the_end_of_the_buffer(make_ring):
+    # Sizes that do not divide the capacity split messages across the end
+    ring = make_ring(50)
+    expected = []
+    for i in range(40):
+        payload = bytes([i]) * (i % 13 + 1)
+        ring.write(payload)
+        expected.append(payload)
+        if i % 3 == 2:
+            assert ring.read_all() == expected
+            expected = []
+    assert ring.read_all() == expected
+
+
+def test_unknown_overflow_policy_is_rejected():
+    shm = shared_memory.SharedMemory(create=True, size=RING_HEADER_SIZE + FOUR)
+    try:
+        with pytest.raises(ValueError):
+            SharedRing(shm, threading.Lock(), 'block')
+    finally:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from lod import LodBuckets
+
+
+def reference(values, starts, widths):
+    """min, max and mean of values over each bucket, computed directly."""
+    spans = [values[s:s + w] for s, w in zip(starts, widths)]
+    return ([span.min() for span in spans], [span.max() for span in spans],
+            [span.mean() for span in spans])
+
+
+@pytest.mark.parametrize('chunk', [1, 3, 4, 7, 100])
+def test_extend_in_any_chunking_matches_direct_buckets(chunk):
+    values = np.random.default_rng(chunk).normal(size=150)
+    lod = LodBuckets(max_buckets=8, min_width=4)
+    for i in range(0, len(values), chunk):
+        lod.extend(values[i:i + chunk])
+    starts, widths, mins, maxs, means = lod.buckets()
+    assert starts[0] == 0
+    assert widths.sum() == len(values) == lod.next_index
+    expected = reference(values, starts, widths)
+    assert mins.tolist() == pytest.approx(expected[0])
+    assert maxs.tolist() == pytest.approx(expected[1])
+    assert means.tolist() == pytest.approx(expected[2])
+
+
+def test_full_buckets_merge_pairwise_and_double_the_width():
+    lod = LodBuckets(max_buckets=4, min_width=2)
+    lod.extend(np.arange(6.0))
+    assert (lod.closed, lod.width) == (3, 2)
+    # The fourth bucket fills the slots and is merged with the others
+    lod.extend(np.arange(6.0, 8.0))
+    assert (lod.closed, lod.width) == (2, 4)
+    starts, widths, mins, maxs, means = lod.buckets()
+    assert starts.tolist() == [0, 4]
+    assert mins.tolist() == [0, 4]
+    assert maxs.tolist() == [3, 7]
+    assert means.tolist() == [1.5, 5.5]
+
+
+def test_bucket_count_stays_bounded():
+    lod = LodBuckets(max_buckets=16, min_width=1)
+    lod.extend(np.ones(100000))
+    starts, widths, mins, maxs, means = lod.buckets()
+    assert len(starts) <= 16 + 1
+    assert widths.sum() == 100000
+    assert means.tolist() == [1.0] * len(means)
+
+
+def test_open_bucket_is_reported_last_with_its_own_width():
+    lod = LodBuckets(max_buckets=4, min_width=4)
+    lod.extend(np.array([1.0, 2.0, 3.0, 4.0, 10.0, 20.0]))
+    starts, widths, mins, maxs, means = lod.buckets()
+    assert starts.tolist() == [0, 4]
+    assert widths.tolist() == [4, 2]
+    assert means.tolist() == [2.5, 15.0]
+
+
+def test_empty_and_cleared():
+    lod = LodBuckets(max_buckets=4, min_width=2)
+    assert all(len(column) == 0 for column in lod.buckets())
+    lod.extend(np.arange(20.0))
+    lod.clear()
+    assert all(len(column) == 0 for column in lod.buckets())
+    assert (lod.width, lod.next_index) == (2, 0)
+
+
+def test_odd_bucket_count_is_rejected():
+    with pytest.raises(ValueError):
+        LodBuckets(max_buckets=5)
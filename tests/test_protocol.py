@@ -0,0 +1,51 @@
+import struct
+import pytest
+from protocol import DEFAULT_PROTOCOL, Characteristic, Field, Protocol, load_protocol
+
+
+def test_default_protocol_decodes_speed():
+    protocol = load_protocol()
+    speed = protocol.by_uuid[DEFAULT_PROTOCOL['characteristics'][0]['uuid']]
+    event = speed.decode(struct.pack('<f', 4.5))
+    assert event.speed == 4.5
+    assert speed.value(event) == 4.5
+
+
+def test_out_of_range_value_is_rejected():
+    force = load_protocol().by_record[2]
+    with pytest.raises(ValueError):
+        force.decode(struct.pack('<f', -1.0))
+    with pytest.raises(struct.error):
+        force.decode(b"\x00")
+
+
+def test_multi_field_characteristic_cannot_be_recorded():
+    fields = [Field('speed'), Field('force')]
+    with pytest.raises(ValueError, match="single-field"):
+        Characteristic('punch', "1234", '<ff', fields, record='speed')
+    # Without record it decodes to a tuple for the DataProcessor
+    punch = Characteristic('punch', "1234", '<ff', fields)
+    assert punch.value(punch.decode(struct.pack('<ff', 1.0, 2.0))) == (1.0, 2.0)
+
+
+def test_raw_samples_cannot_be_recorded():
+    with pytest.raises(ValueError, match="single-field"):
+        Characteristic('raw', "1234", decoder='raw_samples', record='speed')
+
+
+def test_duplicate_uuid_is_rejected():
+    speed = Characteristic('a', "ABCD", '<f', [Field('a')])
+    other = Characteristic('b', "abcd", '<f', [Field('b')])
+    with pytest.raises(ValueError):
+        Protocol("Gloves", [speed, other])
+
+
+@pytest.mark.parametrize('format', ['<4s', 'c', '<fp'])
+def test_non_numeric_format_is_rejected(format):
+    with pytest.raises(ValueError, match="non-numeric"):
+        Characteristic('name', "1234", format, [Field('a')])
+
+
+def test_padding_and_counts_are_accepted():
+    pair = Characteristic('pair', "1234", '<2x2h', [Field('a'), Field('b')])
+    assert pair.decode(struct.pack('<2x2h', 3, -4)) == (3, -4)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from punch_analysis import (G_VALUE, AnalysisConfig, StreamingPunchDetector, analyze_recording,
+                            analyze_samples, integrate_speed, segment)
+from punch_classifier import synthetic_session
+
+FIELDS = ['start', 'end', 'peak_speed', 'peak_force']
+
+
+@pytest.fixture(scope='module')
+def session():
+    samples, onsets, _ = synthetic_session(40, seed=5)
+    return samples, onsets
+
+
+def test_segment_merges_runs_closer_than_the_sustain():
+    t = np.arange(20) * 0.1
+    magnitude = np.zeros(20)
+    # Runs at 0.2-0.3 s and 0.6 s are 0.3 s apart, the one at 1.5 s is 0.9 s later
+    magnitude[[2, 3, 6, 15, 16]] = 10.0
+    starts, ends = segment(t, magnitude, AnalysisConfig(motion_sustain=0.5))
+    assert starts.tolist() == [2, 15]
+    assert ends.tolist() == [7, 17]
+
+
+def test_segment_without_motion():
+    starts, ends = segment(np.arange(5) * 0.1, np.zeros(5))
+    assert len(starts) == len(ends) == 0
+
+
+def test_integrate_speed_peaks_mid_punch_and_is_zero_outside():
+    t = np.arange(40) * 0.01
+    accel = np.zeros((40, 3), dtype=np.float32)
+    accel[:, 2] = 1.0  # gravity only
+    # 2 g forward for 0.1 s, then 2 g back: velocity rises and returns to
+    # rest, so there is no drift to remove (the first sample starts at rest)
+    accel[10:21, 0] = 2.0
+    accel[21:31, 0] = -2.0
+    speed = integrate_speed(t, accel, np.array([10]), np.array([31]))
+    assert speed[:10].max() == 0 and speed[31:].max() == 0
+    assert speed.argmax() == 20
+    assert speed.max() == pytest.approx(2.0 * G_VALUE * 0.1, rel=1e-4)
+
+
+def test_synthetic_punches_are_found(session):
+    samples, onsets = session
+    punches = analyze_samples(samples)
+    assert len(punches) == len(onsets)
+    assert np.abs(punches['start'] - onsets).max() < 0.2
+
+
+@pytest.mark.parametrize('chunk', [7, 50, 333])
+def test_streaming_matches_whole_session(session, chunk):
+    samples, _ = session
+    whole = analyze_samples(samples)
+    detector = StreamingPunchDetector()
+    streamed = [detector.feed(samples[i:i + chunk]) for i in range(0, len(samples), chunk)]
+    streamed = np.concatenate(streamed)
+    assert len(streamed) == len(whole)
+    for field in FIELDS:
+        assert streamed[field] == pytest.approx(whole[field], rel=1e-5), field
+
+
+def test_recording_with_a_clock_restart_is_analyzed_in_runs(session):
+    samples, _ = session
+    whole = analyze_samples(samples)
+    punches = analyze_recording(np.concatenate((samples, samples)))
+    assert len(punches) == 2 * len(whole)
+    assert punches['start'][len(whole):].tolist() == whole['start'].tolist()
+    assert (punches['start_index'][len(whole):] == whole['start_index'] + len(samples)).all()
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from punch_analysis import analyze_samples
+from punch_classifier import (PunchTypeClassifier, evaluate, load_model, stream_labelled,
+                              synthetic_session, train_synthetic)
+
+
+def test_live_use_needs_a_trained_model(tmp_path):
+    with pytest.raises(FileNotFoundError, match="punch_classifier.py train"):
+        load_model(str(tmp_path / "missing.npz"))
+
+
+@pytest.fixture(scope='module')
+def model():
+    return train_synthetic(400, seed=0)
+
+
+@pytest.fixture(scope='module')
+def labelled():
+    return synthetic_session(60, seed=2)
+
+
+@pytest.mark.parametrize('chunk,batch_size', [(7, 1), (50, 8), (333, 32), (5000, 4)])
+def test_every_punch_is_classified_exactly_once(model, labelled, chunk, batch_size):
+    samples, _, _ = labelled
+    classifier, results = asyncio.run(stream_labelled(model, samples, chunk, 2, batch_size))
+    starts = sorted(start for start, _ in results)
+    assert starts == analyze_samples(samples)['start'].tolist()
+    # drain() left nothing behind
+    assert not classifier.pending and not classifier.in_flight
+    assert all(not glove.busy and not glove.backlog for glove in classifier.gloves.values())
+
+
+def test_gloves_are_detected_independently(model, labelled):
+    samples, _, _ = labelled
+    results = []
+
+    async def run():
+        classifier = PunchTypeClassifier(
+            model, lambda device, label, confidence, punch: results.append(
+                (device, punch['start'])), workers=2, batch_size=8)
+        try:
+            # Interleaved chunks of two gloves, the second one lagging behind
+            # with a different chunk size
+            right = 0
+            for start in range(0, len(samples), 40):
+                classifier.feed('L', samples[start:start + 40])
+                if start >= 200:
+                    classifier.feed('R', samples[right:right + 25])
+                    right += 25
+                await asyncio.sleep(0)
+            classifier.feed('R', samples[right:])
+            await classifier.drain()
+        finally:
+            classifier.close()
+
+    asyncio.run(run())
+    expected = analyze_samples(samples)['start'].tolist()
+    for device in ('L', 'R'):
+        assert sorted(start for glove, start in results if glove == device) == expected
+
+
+def test_synthetic_accuracy_stays_above_the_floor(model, capsys):
+    samples, onsets, labels = synthetic_session(200, seed=1)
+    assert evaluate(model, samples, onsets, labels, chunk=5, workers=2, batch_size=32) >= 0.9
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from punch_store import PUNCH_DTYPE, MirroredRing, PunchStore
+
+INT_DTYPE = np.dtype([('value', 'i8')])
+
+
+def rows(start, stop):
+    return np.array([(i,) for i in range(start, stop)], dtype=INT_DTYPE)
+
+
+def values(ring, n=None):
+    return ring.window(n)['value'].tolist()
+
+
+def test_append_keeps_newest_rows_in_order():
+    ring = MirroredRing(4, INT_DTYPE)
+    for i in range(10):
+        ring.append((i,))
+    assert len(ring) == 4
+    assert ring.total == 10
+    assert values(ring) == [6, 7, 8, 9]
+    assert values(ring, 2) == [8, 9]
+
+
+def test_window_is_a_view():
+    ring = MirroredRing(4, INT_DTYPE)
+    ring.extend(rows(0, 3))
+    assert np.shares_memory(ring.window(), ring.buffer)
+
+
+@pytest.mark.parametrize('chunks', [[3, 3, 3], [1, 4, 2, 5], [7], [2, 9, 1], [4, 4, 4]])
+def test_extend_matches_append(chunks):
+    appended = MirroredRing(4, INT_DTYPE)
+    extended = MirroredRing(4, INT_DTYPE)
+    start = 0
+    for size in chunks:
+        block = rows(start, start + size)
+        for row in block:
+            appended.append(row)
+        extended.extend(block)
+        start += size
+        assert extended.total == appended.total == start
+        assert values(extended) == values(appended)
+
+
+def test_since_selects_by_punch_number():
+    store = PunchStore(capacity=8)
+    for i in range(12):
+        store.append(float(i), float(i), 10.0 * i, 'A')
+    assert store.since(9)['speed'].tolist() == [9, 10, 11]
+    # Punches 0-3 were evicted
+    assert store.since(0)['speed'].tolist() == list(range(4, 12))
+    assert store.window().dtype == PUNCH_DTYPE
+
+
+def test_evicted_punches_are_folded_into_summaries():
+    store = PunchStore(capacity=8)
+    for i in range(40):
+        store.append(float(i), float(i), 2.0 * i, 'A')
+    assert store.folded == 40 - 8
+    speed = store.summaries['speed']
+    starts, widths, mins, maxs, means = speed.buckets()
+    assert widths.sum() == 32
+    assert mins[0] == 0 and maxs[0] == 15
+    assert means[0] == pytest.approx(7.5)
+    assert store.summaries['force'].buckets()[3][0] == 30
+
+
+def test_memory_stays_flat():
+    store = PunchStore(capacity=64)
+    before = store.nbytes()
+    for i in range(10000):
+        store.append(float(i), 1.0, 1.0, i % 3)
+    assert store.nbytes() == before
+    assert len(store) == 64
+
+
+def test_clear_resets_rows_summaries_and_devices():
+    store = PunchStore(capacity=4)
+    for i in range(10):
+        store.append(float(i), 1.0, 1.0, 'A')
+    store.clear()
+    assert store.total == 0 and len(store) == 0
+    assert store.folded == 0
+    assert store.devices == {}
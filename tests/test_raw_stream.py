@@ -0,0 +1,69 @@
+import struct
+import numpy as np
+import pytest
+from raw_stream import RAW_SAMPLES_PER_PACKET, RawSampleBuffer, fsr_force
+
+# The firmware's packed RawPacket and RawSample structs
+PACKET_HEADER = struct.Struct('<HBB')
+SAMPLE = struct.Struct('<Ihhhh')
+
+
+def packet(seq, first_t=0, count=RAW_SAMPLES_PER_PACKET, slots=RAW_SAMPLES_PER_PACKET):
+    """A notification as the firmware writes it: the whole struct, count valid samples."""
+    data = PACKET_HEADER.pack(seq, count, 0)
+    for i in range(slots):
+        t = first_t + i * 10
+        data += SAMPLE.pack(t, i - 5, 2 * i, 1000, 100 + i) if i < count else bytes(SAMPLE.size)
+    return data
+
+
+def test_samples_are_decoded_field_by_field():
+    buffer = RawSampleBuffer(capacity=64)
+    assert buffer.decode(packet(0, first_t=500)) == RAW_SAMPLES_PER_PACKET
+    samples = buffer.samples()
+    assert samples['t_ms'].tolist() == [500 + i * 10 for i in range(RAW_SAMPLES_PER_PACKET)]
+    assert samples['ax'].tolist() == [i - 5 for i in range(RAW_SAMPLES_PER_PACKET)]
+    assert samples['az'].tolist() == [1000] * RAW_SAMPLES_PER_PACKET
+    assert samples['fsr'][-1] == 100 + RAW_SAMPLES_PER_PACKET - 1
+
+
+def test_only_the_valid_samples_of_a_partial_packet_are_kept():
+    buffer = RawSampleBuffer(capacity=64)
+    assert buffer.decode(packet(0, count=4)) == 4
+    assert len(buffer) == 4
+    assert buffer.total == 4
+
+
+def test_skipped_sequence_numbers_count_as_lost_packets():
+    buffer = RawSampleBuffer(capacity=256)
+    for seq in (0, 1, 4, 5):
+        buffer.decode(packet(seq))
+    assert (buffer.packets, buffer.lost_packets) == (4, 2)
+    # The sequence wraps around at 16 bits
+    buffer.reset_sequence()
+    buffer.decode(packet(0xFFFF))
+    buffer.decode(packet(1))
+    assert buffer.lost_packets == 3
+
+
+def test_duplicates_and_restarts_are_not_losses():
+    buffer = RawSampleBuffer(capacity=256)
+    buffer.decode(packet(100))
+    # A duplicate and a restarted sequence both jump back, a gap >= 0x8000
+    buffer.decode(packet(100))
+    buffer.decode(packet(0))
+    assert buffer.lost_packets == 0
+    buffer.decode(packet(1))
+    assert buffer.lost_packets == 0
+
+
+@pytest.mark.parametrize('data', [b'\x00\x00', PACKET_HEADER.pack(0, 3, 0) + bytes(SAMPLE.size)])
+def test_short_packets_are_rejected(data):
+    buffer = RawSampleBuffer(capacity=64)
+    with pytest.raises(ValueError):
+        buffer.decode(data)
+    assert buffer.packets == 0 and len(buffer) == 0
+
+
+def test_fsr_force_matches_the_firmware_formula():
+    assert fsr_force(np.array([0, 1023])).tolist() == pytest.approx([0.0, 196.4092 * 25.0])
@@ -0,0 +1,92 @@
+import os
+import numpy as np
+import pytest
+import session_log
+from raw_stream import RAW_SAMPLE_DTYPE
+from session_log import (KIND_FORCE, KIND_SPEED, RECORD, SessionReader, SessionWriter,
+                         device_id, load_devices)
+
+
+def write_session(directory, start, records):
+    writer = SessionWriter(str(directory), start=start)
+    for timestamp, kind, value, address in records:
+        writer.record(kind, value, address, timestamp)
+    writer.close()
+    return writer
+
+
+def test_records_round_trip_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_log, 'FLUSH_RECORDS', 4)
+    records = [(1000.0 + i, KIND_SPEED if i % 2 == 0 else KIND_FORCE, float(i),
+                'AA:BB' if i < 5 else 'CC:DD') for i in range(10)]
+    writer = write_session(tmp_path, 1000.0, records)
+    assert writer.records_written == 10
+    assert writer.batches_written == 3
+    read = SessionReader(str(tmp_path)).records()
+    assert read['timestamp'].tolist() == [r[0] for r in records]
+    assert read['kind'].tolist() == [r[1] for r in records]
+    assert read['value'].tolist() == [r[2] for r in records]
+    assert read['device'].tolist() == [device_id(r[3]) for r in records]
+    assert load_devices(str(tmp_path)) == {device_id('AA:BB'): 'AA:BB',
+                                           device_id('CC:DD'): 'CC:DD'}
+
+
+def test_partial_trailing_record_is_ignored(tmp_path):
+    writer = write_session(tmp_path, 1000.0, [(1000.0, KIND_SPEED, 5.0, 'A'),
+                                              (1001.0, KIND_FORCE, 100.0, 'A')])
+    with open(writer.path, 'ab') as f:
+        # A crash in the middle of a record
+        f.write(bytes(RECORD.size // 2))
+    assert SessionReader(str(tmp_path)).records()['value'].tolist() == [5.0, 100.0]
+
+
+def test_since_and_until_filter_sessions_and_records(tmp_path):
+    write_session(tmp_path, 1000.0, [(1000.0 + i, KIND_SPEED, float(i), 'A') for i in range(5)])
+    write_session(tmp_path, 5000.0, [(5000.0 + i, KIND_FORCE, float(i), 'A') for i in range(5)])
+    reader = SessionReader(str(tmp_path), since=1002.0, until=5001.0)
+    assert len(reader.sessions) == 2
+    assert reader.records()['timestamp'].tolist() == [1002.0, 1003.0, 1004.0, 5000.0, 5001.0]
+    assert reader.records(KIND_FORCE)['timestamp'].tolist() == [5000.0, 5001.0]
+    assert len(SessionReader(str(tmp_path), since=2000.0).sessions) == 1
+    assert len(SessionReader(str(tmp_path), until=2000.0).sessions) == 1
+
+
+def test_sessions_started_in_the_same_second_get_distinct_files(tmp_path):
+    first = write_session(tmp_path, 1000.0, [])
+    second = write_session(tmp_path, 1000.0, [])
+    assert first.path != second.path
+    assert len(SessionReader(str(tmp_path)).sessions) == 2
+
+
+def test_raw_samples_round_trip_per_glove(tmp_path):
+    samples = np.zeros(50, dtype=RAW_SAMPLE_DTYPE)
+    samples['t_ms'] = np.arange(50) * 10
+    samples['ax'] = np.arange(50) - 25
+    samples['fsr'] = np.arange(50)
+    writer = SessionWriter(str(tmp_path), start=1000.0, raw=True)
+    for i in range(0, 50, 19):
+        writer.record_raw(samples[i:i + 19], 'A')
+        writer.record_raw(samples[i:i + 19][::-1], 'B')
+    writer.record(KIND_SPEED, 5.0, 'A', 1000.0)
+    writer.close()
+    assert writer.raw_samples_written == 100
+    session, = SessionReader(str(tmp_path)).sessions
+    assert session.raw_samples(device_id('A')).tolist() == samples.tolist()
+    assert len(session.raw_samples(device_id('B'))) == 50
+    assert len(session.records) == 1
+
+
+def test_sessions_without_raw_samples(tmp_path):
+    writer = write_session(tmp_path, 1000.0, [(1000.0, KIND_SPEED, 5.0, 'A')])
+    assert writer.raw_path is None
+    with pytest.raises(ValueError):
+        writer.record_raw(np.zeros(1, dtype=RAW_SAMPLE_DTYPE))
+    session, = SessionReader(str(tmp_path)).sessions
+    assert len(session.raw) == 0
+
+
+def test_unwritable_directory_fails_on_creation(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    with pytest.raises(OSError):
+        SessionWriter(os.path.join(str(blocker), "sessions"))
@@ -0,0 +1,23 @@
+import numpy as np
+from session_log import KIND_FORCE, KIND_SPEED, RECORD_DTYPE
+from simulator import recorded_punches
+
+
+def session(*records):
+    return np.array(list(records), dtype=RECORD_DTYPE)
+
+
+def test_gloves_share_one_clock_and_gaps_between_sessions_collapse():
+    first = session((1000.0, 1, KIND_SPEED, 5.0), (1000.5, 2, KIND_SPEED, 6.0),
+                    (1001.0, 1, KIND_FORCE, 100.0))
+    # Recorded a day later
+    second = session((87400.0, 2, KIND_FORCE, 200.0), (87402.0, 1, KIND_SPEED, 7.0))
+    events = recorded_punches([first, second], gap=1.0)
+    assert events[1] == [(0.0, KIND_SPEED, 5.0), (1.0, KIND_FORCE, 100.0),
+                         (4.0, KIND_SPEED, 7.0)]
+    assert events[2] == [(0.5, KIND_SPEED, 6.0), (2.0, KIND_FORCE, 200.0)]
+
+
+def test_empty_sessions_are_skipped():
+    assert recorded_punches([session(), session((5.0, 3, KIND_SPEED, 1.0))]) == {
+        3: [(0.0, KIND_SPEED, 1.0)]}
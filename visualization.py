@@ -1,13 +1,28 @@
 import tkinter as tk
 from tkinter import ttk
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from collections import deque
+import os
 import queue
+import threading
+import time
+from display import FRAME_BUDGET, MAX_FPS
+from metrics import NULL_METRICS, STAGE_SCREEN
+from punch_store import PunchStore
+from startup import STARTUP
+
+# Refresh interval of the metrics overlay and of the render stats in the metrics
+OVERLAY_REFRESH_MS = 1000
+# How often the window checks whether the graphs module has finished importing
+GRAPHS_POLL_MS = 20
+
 
 class Visualizer:
-    def __init__(self, update_queue: queue.Queue, command_queue: queue.Queue):
+    def __init__(self, update_queue: queue.Queue, command_queue: queue.Queue,
+                 metrics=NULL_METRICS, overlay: bool = False):
         self.update_queue = update_queue
         self.command_queue = command_queue
+        self.metrics = metrics
+        self.overlay = overlay
 
         # Initialize data variables
         self.punch_count = 0
@@ -15,8 +30,23 @@ class Visualizer:
         self.previous_max_force = 0.0
         self.historical_max_speed = 0.0
         self.historical_max_force = 0.0
-        self.speed_history = []
-        self.force_history = []
+        # Latest SessionAnalytics snapshot from the DataProcessor
+        self.analytics = None
+        # Latest (punch type, confidence) from --classify
+        self.punch_type = None
+
+        # Batched rendering state
+        self.history = PunchStore()
+        self.pending_punches = []
+        self.graphs_reset = False
+        self.dirty = set()
+        self.render_pending = False
+        self.last_render = 0.0
+        self.render_times = deque(maxlen=MAX_FPS * 2)
+        self.renders = 0
+        self.first_render = None
+        # BLE arrival times of the messages in the pending batch (metrics only)
+        self.pending_origins = []
 
         # Initialize main window
         self.root = tk.Tk()
@@ -29,8 +59,17 @@ class Visualizer:
         # Create UI elements
         self.create_ui_elements()
 
-        # Start periodic update
-        self.root.after(100, self.update_ui)
+        # Producers call wake() from other threads. It writes a byte to a
+        # pipe that Tk watches, so the asyncio thread never waits on Tk and
+        # nothing polls while idle
+        self.wake_read, self.wake_write = os.pipe()
+        os.set_blocking(self.wake_write, False)
+        self.root.tk.createfilehandler(self.wake_read, tk.READABLE, self.on_wake)
+        # Messages queued before wake() was hooked up are drained on start
+        self.root.after_idle(self.update_ui)
+        self.root.after_idle(lambda: STARTUP.mark('window shown'))
+
+        self.load_graphs()
 
     def create_frames(self):
         # Create a grid layout for better balance
@@ -100,10 +139,20 @@ class Visualizer:
             activeforeground=accent_color, relief='flat', borderwidth=0)
         self.reset_button.pack(anchor='e', padx=10, pady=10)
 
+        # Optional live metrics overlay
+        if self.overlay:
+            self.overlay_label = tk.Label(
+                self.top_right_frame, text="", font=("Segoe UI", 9),
+                bg=bg_color, fg=accent_color, justify='right')
+            self.overlay_label.pack(anchor='e', padx=10)
+        if self.metrics.enabled:
+            self.root.after(OVERLAY_REFRESH_MS, self.refresh_metrics)
+
         # Second frame (Middle): Latest and Max Stats
         # Use a grid layout for better balance
         self.frame_middle.columnconfigure(0, weight=1, uniform='middle')
         self.frame_middle.columnconfigure(1, weight=1, uniform='middle')
+        self.frame_middle.columnconfigure(2, weight=1, uniform='middle')
 
         # Latest Stats
         self.latest_stats_frame = tk.Frame(self.frame_middle, bg=bg_color)
@@ -143,6 +192,89 @@ class Visualizer:
             bg=bg_color, fg=text_color)
         self.max_force_label.pack(anchor='w', pady=5)
 
+        # Session Stats
+        self.session_stats_frame = tk.Frame(self.frame_middle, bg=bg_color)
+        self.session_stats_frame.grid(row=0, column=2, sticky='nsew', padx=10)
+
+        self.session_label = tk.Label(
+            self.session_stats_frame, text="Session Stats", font=label_font,
+            bg=bg_color, fg=accent_color)
+        self.session_label.pack(anchor='w')
+
+        self.rate_label = tk.Label(
+            self.session_stats_frame, text="Rate: 0 punches/min", font=label_font,
+            bg=bg_color, fg=text_color)
+        self.rate_label.pack(anchor='w', pady=5)
+
+        self.fatigue_label = tk.Label(
+            self.session_stats_frame, text="Fatigue: -", font=label_font,
+            bg=bg_color, fg=text_color)
+        self.fatigue_label.pack(anchor='w', pady=5)
+
+        self.punch_type_label = tk.Label(
+            self.session_stats_frame, text="Last punch: -", font=label_font,
+            bg=bg_color, fg=text_color)
+        self.punch_type_label.pack(anchor='w', pady=5)
+
+        # Force intensity colors, one per FORCE_LEVELS band
+        self.intensity_colors = {
+            'low': '#A3BE8C',    # Soft green
+            'medium': '#EBCB8B', # Soft yellow
+            'high': '#BF616A'    # Soft red
+        }
+
+        # Third and fourth frames (Bottom): the graphs need matplotlib, which
+        # is imported in the background; until then these frames show a note
+        self.speed_graph = None
+        self.force_graph = None
+        self.graphs_placeholders = []
+        for frame in (self.frame_bottom_left, self.frame_bottom_right):
+            placeholder = tk.Label(frame, text="Loading graphs...", font=label_font,
+                                   bg=bg_color, fg=accent_color)
+            placeholder.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+            self.graphs_placeholders.append(placeholder)
+
+        self.primary_color = primary_color
+        self.text_color = text_color
+        self.bg_color = bg_color
+
+    def load_graphs(self):
+        """Imports matplotlib and the graphs module on a background thread."""
+        self.graphs_module = None
+        self.graphs_error = None
+
+        def load():
+            try:
+                STARTUP.import_module('matplotlib.backends.backend_tkagg')
+                self.graphs_module = STARTUP.import_module('graphs')
+            except Exception as e:
+                self.graphs_error = e
+
+        self.graphs_loader = threading.Thread(target=load, name="graphs-import", daemon=True)
+        self.graphs_loader.start()
+        self.root.after(GRAPHS_POLL_MS, self.poll_graphs)
+
+    def poll_graphs(self):
+        if self.graphs_loader.is_alive():
+            self.root.after(GRAPHS_POLL_MS, self.poll_graphs)
+        elif self.graphs_module is None:
+            print(f"Graphs unavailable: {self.graphs_error}")
+            for placeholder in self.graphs_placeholders:
+                placeholder.config(text="Graphs unavailable")
+        else:
+            with STARTUP.phase('create graphs'):
+                self.create_graphs()
+
+    def create_graphs(self):
+        """Builds both figures (on the Tk thread) and draws the punches received so far."""
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        graphs = self.graphs_module
+        bg_color = self.bg_color
+        text_color = self.text_color
+        for placeholder in self.graphs_placeholders:
+            placeholder.destroy()
+
         # Third frame (Bottom Left): Line graph of speed
         self.figure_speed = Figure(figsize=(5, 4), dpi=100, facecolor=bg_color)
         self.ax_speed = self.figure_speed.add_subplot(111)
@@ -155,6 +287,9 @@ class Visualizer:
         self.figure_speed.subplots_adjust(left=0.15, right=0.95, top=0.9, bottom=0.15)
 
         self.canvas_speed = FigureCanvasTkAgg(self.figure_speed, master=self.frame_bottom_left)
+        self.speed_graph = graphs.SpeedGraph(
+            self.figure_speed, self.ax_speed, self.canvas_speed, self.history,
+            self.primary_color)
         self.canvas_speed.draw()
         self.canvas_speed.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
@@ -170,18 +305,16 @@ class Visualizer:
         self.figure_force.subplots_adjust(left=0.15, right=0.95, top=0.9, bottom=0.15)
 
         self.canvas_force = FigureCanvasTkAgg(self.figure_force, master=self.frame_bottom_right)
+        self.force_graph = graphs.ForceGraph(
+            self.figure_force, self.ax_force, self.canvas_force, self.history,
+            (self.intensity_colors['low'], self.intensity_colors['medium'],
+             self.intensity_colors['high']))
         self.canvas_force.draw()
         self.canvas_force.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
-        # Store colors for later use
-        self.intensity_colors = {
-            'low': '#A3BE8C',    # Soft green
-            'medium': '#EBCB8B', # Soft yellow
-            'high': '#BF616A'    # Soft red
-        }
-        self.primary_color = primary_color
-        self.text_color = text_color
-        self.bg_color = bg_color
+        # Catch up with the punches that arrived while matplotlib was loading
+        self.speed_graph.append(len(self.history))
+        self.force_graph.append(len(self.history))
 
     def reset_data(self):
         # Send reset command to the command_queue
@@ -194,102 +327,194 @@ class Visualizer:
         self.previous_max_force = 0.0
         self.historical_max_speed = 0.0
         self.historical_max_force = 0.0
-        self.speed_history.clear()
-        self.force_history.clear()
-
-        # Reset UI elements
-        self.punch_count_label.config(text="Punch Count: 0")
-        self.latest_speed_label.config(text="Speed: 0.0 m/s")
-        self.latest_force_label.config(text="Force: 0.0 N")
-        self.max_speed_label.config(text="Speed: 0.0 m/s")
-        self.max_force_label.config(text="Force: 0.0 N")
-        self.punch_meter['value'] = 0
-
-        self.update_speed_graph()
-        self.update_force_graph()
+        self.analytics = None
+        self.punch_type = None
+        # Punches queued before the reset must not reach the graphs
+        self.metrics.drop('reset', len(self.pending_punches))
+        self.pending_punches.clear()
+        self.graphs_reset = True
+        self.dirty.update(('count', 'latest_speed', 'latest_force', 'max_speed', 'max_force',
+                           'analytics', 'punch_type'))
+
+    def apply_update(self, key, value):
+        """Applies one queued message to the model and marks what needs rendering."""
+        if key == 'reset':
+            self.handle_reset()
+        elif key == 'previous_max_speed':
+            self.previous_max_speed = value
+            self.dirty.add('latest_speed')
+        elif key == 'previous_max_force':
+            self.previous_max_force = value
+            self.dirty.add('latest_force')
+        elif key == 'punch':
+            self.pending_punches.append(value)
+            self.punch_count = self.punch_count + 1
+            self.dirty.add('count')
+        elif key == 'historical_max_speed':
+            self.historical_max_speed = value
+            self.dirty.add('max_speed')
+        elif key == 'historical_max_force':
+            self.historical_max_force = value
+            self.dirty.add('max_force')
+        elif key == 'analytics':
+            self.analytics = value
+            self.dirty.add('analytics')
+        elif key == 'punch_type':
+            _, punch_type, confidence, _ = value
+            self.punch_type = (punch_type, confidence)
+            self.dirty.add('punch_type')
 
     def update_ui(self):
+        """Drains everything pending into one batch and schedules a single render."""
         try:
-            while True:
-                data = self.update_queue.get_nowait()
-                key, value = data
-
-                if key == 'reset':
-                    self.handle_reset()
-                elif key == 'previous_max_speed':
-                    self.previous_max_speed = value
-                    self.latest_speed_label.config(
-                        text=f"Speed: {self.previous_max_speed:.2f} m/s")
-                    self.speed_history.append(self.previous_max_speed)
-                    self.update_speed_graph()
-                    self.punch_count = self.punch_count + 1
-                    self.punch_count_label.config(text=f"Punch Count: {self.punch_count}")
-                    # Update the punch meter
-                    self.punch_meter['value'] = min(self.punch_count, 50)  # Example scaling
-
-                elif key == 'previous_max_force':
-                    self.previous_max_force = value
-                    self.latest_force_label.config(
-                        text=f"Force: {self.previous_max_force:.2f} N")
-                    self.force_history.append(self.previous_max_force)
-                    self.update_force_graph()
-                elif key == 'historical_max_speed':
-                    self.historical_max_speed = value
-                    self.max_speed_label.config(
-                        text=f"Speed: {self.historical_max_speed:.2f} m/s")
-                elif key == 'historical_max_force':
-                    self.historical_max_force = value
-                    self.max_force_label.config(
-                        text=f"Force: {self.historical_max_force:.2f} N")
-                # elif key == 'count':
-                #     self.punch_count = value
-                #     self.punch_count_label.config(text=f"Punch Count: {self.punch_count}")
-                #     # Update the punch meter
-                #     self.punch_meter['value'] = min(self.punch_count, 50)  # Example scaling
+            if self.metrics.enabled:
+                self.metrics.depth('ui', self.update_queue.qsize())
+                while True:
+                    (key, value), t_origin = self.update_queue.get_with_origin_nowait()
+                    if t_origin is not None:
+                        self.pending_origins.append(t_origin)
+                    self.apply_update(key, value)
+            else:
+                while True:
+                    key, value = self.update_queue.get_nowait()
+                    self.apply_update(key, value)
         except queue.Empty:
             pass
         except Exception as e:
             print(f"Error in UI update: {e}")
-
-        # Schedule the next update
-        self.root.after(100, self.update_ui)
-
-    def update_speed_graph(self):
-        self.ax_speed.clear()
-        self.ax_speed.plot(
-            self.speed_history, color=self.primary_color, linewidth=2, marker='o', linestyle='-')
-        self.ax_speed.set_title("Speed per Punch", color=self.text_color, fontsize=14)
-        self.ax_speed.set_xlabel("Punch Number", color=self.text_color)
-        self.ax_speed.set_ylabel("Speed (m/s)", color=self.text_color)
-        self.ax_speed.tick_params(axis='x', colors=self.text_color)
-        self.ax_speed.tick_params(axis='y', colors=self.text_color)
-        self.ax_speed.set_facecolor(self.bg_color)
-        self.figure_speed.set_facecolor(self.bg_color)
-        self.canvas_speed.draw()
-
-    def update_force_graph(self):
-        self.ax_force.clear()
-        x = list(range(len(self.force_history)))
-        y = self.force_history
-        colors = [self.get_force_color(force) for force in y]
-        self.ax_force.bar(x, y, color=colors)
-        self.ax_force.set_title("Force per Punch", color=self.text_color, fontsize=14)
-        self.ax_force.set_xlabel("Punch Number", color=self.text_color)
-        self.ax_force.set_ylabel("Force (N)", color=self.text_color)
-        self.ax_force.tick_params(axis='x', colors=self.text_color)
-        self.ax_force.tick_params(axis='y', colors=self.text_color)
-        self.ax_force.set_facecolor(self.bg_color)
-        self.figure_force.set_facecolor(self.bg_color)
-        self.canvas_force.draw()
-
-    def get_force_color(self, force):
-        # Determine color based on force intensity
-        if force < 100:
-            return self.intensity_colors['low']    # Low intensity
-        elif force < 300:
-            return self.intensity_colors['medium']  # Medium intensity
+        self.schedule_render()
+
+    def schedule_render(self):
+        """Renders now, or at the next frame slot if the frame rate cap was hit."""
+        if self.render_pending or not (self.dirty or self.graphs_reset
+                                       or self.pending_punches):
+            return
+        wait = self.last_render + 1.0 / MAX_FPS - time.perf_counter()
+        if wait > 0:
+            self.render_pending = True
+            self.root.after(int(wait * 1000) + 1, self.render)
         else:
-            return self.intensity_colors['high']   # High intensity
+            self.render()
+
+    def render(self):
+        """Pushes the accumulated batch to the widgets, touching each one once."""
+        self.render_pending = False
+        self.last_render = time.perf_counter()
+        self.render_times.append(self.last_render)
+        self.renders += 1
+        if self.first_render is None:
+            self.first_render = self.last_render
+        dirty = self.dirty
+        if 'count' in dirty:
+            self.punch_count_label.config(text=f"Punch Count: {self.punch_count}")
+            # Update the punch meter
+            self.punch_meter['value'] = min(self.punch_count, 50)  # Example scaling
+        if 'latest_speed' in dirty:
+            self.latest_speed_label.config(text=f"Speed: {self.previous_max_speed:.2f} m/s")
+        if 'latest_force' in dirty:
+            self.latest_force_label.config(text=f"Force: {self.previous_max_force:.2f} N")
+        if 'max_speed' in dirty:
+            self.max_speed_label.config(text=f"Speed: {self.historical_max_speed:.2f} m/s")
+        if 'max_force' in dirty:
+            self.max_force_label.config(text=f"Force: {self.historical_max_force:.2f} N")
+        if 'analytics' in dirty:
+            self.render_analytics()
+        if 'punch_type' in dirty:
+            if self.punch_type is None:
+                self.punch_type_label.config(text="Last punch: -")
+            else:
+                punch_type, confidence = self.punch_type
+                self.punch_type_label.config(text=f"Last punch: {punch_type} ({confidence:.0%})")
+        dirty.clear()
+
+        if self.graphs_reset:
+            self.history.clear()
+            if self.speed_graph is not None:
+                self.speed_graph.reset()
+                self.force_graph.reset()
+            self.graphs_reset = False
+        for punch in self.pending_punches:
+            self.history.append(*punch)
+        # Before the graphs exist punches only go to the history
+        if self.speed_graph is not None:
+            self.speed_graph.append(len(self.pending_punches))
+            self.force_graph.append(len(self.pending_punches))
+        self.pending_punches = []
+
+        if self.pending_origins:
+            now = time.perf_counter()
+            for t_origin in self.pending_origins:
+                self.metrics.observe(STAGE_SCREEN, now - t_origin)
+            self.pending_origins = []
+
+    def render_analytics(self):
+        analytics = self.analytics
+        if analytics is None:
+            self.rate_label.config(text="Rate: 0 punches/min")
+            self.fatigue_label.config(text="Fatigue: -")
+            return
+        self.rate_label.config(text=f"Rate: {analytics['punches_per_minute']:.0f} punches/min")
+        fatigue = analytics['fatigue']
+        decay = max(fatigue['speed_decay'], fatigue['force_decay'])
+        status = "fatigued" if fatigue['fatigued'] else "fresh"
+        self.fatigue_label.config(text=f"Fatigue: {status} ({decay:.0%} drop)")
+
+    def refresh_metrics(self):
+        render = self.render_stats()
+        self.metrics.set_render(render)
+        if self.overlay:
+            frame = render['speed'] or {'mean_ms': 0.0, 'max_ms': 0.0}
+            self.overlay_label.config(
+                text=f"{render['fps']:.0f} fps | frame {frame['mean_ms']:.1f} ms "
+                     f"max {frame['max_ms']:.1f} ms | {self.metrics.overlay_text()}")
+        self.root.after(OVERLAY_REFRESH_MS, self.refresh_metrics)
+
+    def fps(self) -> float:
+        """Renders per second over the last second."""
+        cutoff = time.perf_counter() - 1.0
+        return sum(1 for t in self.render_times if t >= cutoff)
+
+    def wake(self):
+        """Thread-safe, non-blocking request to drain the update queue on the Tk thread."""
+        # No Tk calls here: from another thread they wait for the Tk thread
+        try:
+            os.write(self.wake_write, b'\0')
+        except BlockingIOError:
+            # A full pipe already holds a pending wake-up
+            pass
+
+    def on_wake(self, fd, mask):
+        os.read(fd, 4096)
+        self.update_ui()
+
+    def render_stats(self) -> dict:
+        """Frame rate and frame-time statistics for both graphs."""
+        elapsed = self.last_render - self.first_render if self.renders > 1 else 0.0
+        stats = {'fps': self.fps(), 'renders': self.renders,
+                 'mean_fps': (self.renders - 1) / elapsed if elapsed else 0.0,
+                 'speed': {}, 'force': {}}
+        if self.speed_graph is not None:
+            stats['speed'] = self.speed_graph.frame_stats()
+            stats['force'] = self.force_graph.frame_stats()
+        return stats
+
+    def report(self):
+        """Prints the frame rate and graph frame times, and stores them in the metrics."""
+        render = self.render_stats()
+        self.metrics.set_render(render)
+        print(f"Render: {render['renders']} frames ({render['mean_fps']:.1f} fps, "
+              f"cap {MAX_FPS})")
+        for name in ('speed', 'force'):
+            frame = render[name]
+            if frame:
+                print(f"{name.capitalize()} graph: mean {frame['mean_ms']:.2f} ms / "
+                      f"max {frame['max_ms']:.2f} ms per frame, {frame['over_budget']} of "
+                      f"{frame['frames']} over the {FRAME_BUDGET * 1000:.0f} ms budget, "
+                      f"{frame['full_redraws']} full redraws")
 
     def start(self):
-        self.root.mainloop()
\ No newline at end of file
+        try:
+            self.root.mainloop()
+        finally:
+            # The pipe stays open: producers may still call wake() until they stop
+            self.root.tk.deletefilehandler(self.wake_read)
\ No newline at end of file